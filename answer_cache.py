@@ -0,0 +1,128 @@
+import os
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+class SemanticAnswerCache:
+    """질문 임베딩의 코사인 유사도로 이전 답변을 재사용하는 캐시 클래스
+
+    항목은 컬렉션 버전과 함께 저장되며, 버전이 바뀌면 이전 항목은 조회되지 않고 제거됩니다.
+    """
+
+    def __init__(self,
+                 similarity_threshold: float = 0.95,
+                 max_entries: int = 1000,
+                 ttl_seconds: Optional[float] = 3600.0):
+
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _purge(self, collection_version: int):
+        """만료되었거나 다른 컬렉션 버전의 항목을 제거합니다."""
+        now = time.monotonic()
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry['collection_version'] != collection_version
+            or (entry['expires_at'] is not None and entry['expires_at'] <= now)
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._matrix = None
+
+    def lookup(self, query_embedding, collection_version: int) -> Optional[Dict]:
+        """가장 유사한 이전 질문이 임계값 이상이면 저장된 답변을 반환합니다."""
+        with self._lock:
+            self._purge(collection_version)
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.vstack([self._entries[k]['embedding'] for k in self._matrix_keys])
+
+            scores = self._matrix @ self._normalize(query_embedding)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+
+            if similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            entry = self._entries[key]
+            return {
+                'question': entry['question'],
+                'answer': entry['answer'],
+                'relevant_documents': [dict(doc) for doc in entry['relevant_documents']],
+                'context_used': entry['context_used'],
+                'similarity': similarity
+            }
+
+    def store(self, question: str, query_embedding, answer: str,
+              relevant_documents: List[Dict], context_used: str, collection_version: int):
+        """질문과 답변을 캐시에 저장합니다."""
+        with self._lock:
+            self._purge(collection_version)
+            self._entries[self._next_key] = {
+                'question': question,
+                'embedding': self._normalize(query_embedding),
+                'answer': answer,
+                'relevant_documents': [dict(doc) for doc in relevant_documents],
+                'context_used': context_used,
+                'collection_version': collection_version,
+                'expires_at': time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        """모든 항목을 삭제합니다."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def get_stats(self) -> Dict:
+        """캐시 적중률 통계를 반환합니다."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'similarity_threshold': self.similarity_threshold
+            }
+
+def create_answer_cache_from_env() -> Optional[SemanticAnswerCache]:
+    """ANSWER_CACHE_THRESHOLD 환경변수가 설정된 경우 답변 캐시를 생성합니다."""
+    threshold = os.getenv("ANSWER_CACHE_THRESHOLD")
+    if not threshold:
+        return None
+    return SemanticAnswerCache(
+        similarity_threshold=float(threshold),
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    )
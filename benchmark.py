@@ -0,0 +1,503 @@
+"""성능 벤치마크 스크립트
+
+사용법:
+    python benchmark.py chunking --pages 500
+    python benchmark.py sessions --sessions 32 --turns 5
+    python benchmark.py startup
+    python benchmark.py quantization --synthetic 50000
+    python benchmark.py embedding --sentences 1000 --threads 4
+    python benchmark.py service --clients 16 --requests 50
+    python benchmark.py e2e --output bench_results.json [--baseline 이전결과.json]
+"""
+import os
+import re
+import argparse
+import sys
+import json
+import hashlib
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from chunker import TextChunker
+
+_SAMPLE_SENTENCES = [
+    "주택담보대출의 LTV 한도는 규제지역에서 70%입니다.",
+    "청년 전세자금 대출은 연 2.1% 금리로 지원된다.",
+    "신청 기간은 매년 3월부터 5월까지예요.",
+    "무주택 세대주로서 소득 요건을 충족해야 합니다.",
+    "주택법 제54조에 따라 공급 기준이 정해진다.",
+    "신혼부부 특별공급은 혼인 기간 7년 이내인 경우에 해당합니다.",
+]
+_SAMPLE_BULLETS = ["- 무주택 세대주", "1) 소득 요건 충족", "가. 자산 기준 이하", "※ 세부 기준은 공고문 참조"]
+
+def make_synthetic_pages(num_pages: int, lines_per_page: int = 30, seed: int = 0) -> List[str]:
+    """정책 문서와 비슷한 형태의 합성 페이지 목록을 생성합니다."""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(num_pages):
+        lines = []
+        for _ in range(lines_per_page):
+            if rng.random() < 0.2:
+                lines.append(rng.choice(_SAMPLE_BULLETS))
+            else:
+                lines.append(" ".join(rng.choice(_SAMPLE_SENTENCES) for _ in range(rng.randint(1, 4))))
+        pages.append("\n".join(lines))
+    return pages
+
+def make_adversarial_text(num_blocks: int = 200, run_length: int = 2000) -> str:
+    """마침표 직후에 경계 없는 긴 구간이 이어지는 텍스트 (표/목차 추출 결과와 비슷한 형태)"""
+    return "".join("제1조. " + "가" * run_length for _ in range(num_blocks))
+
+def _legacy_chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200,
+                       max_iterations: Optional[int] = None) -> Optional[List[str]]:
+    """비교용: 이전 PDFProcessor.chunk_text 구현. 반복 횟수가 max_iterations를 넘으면 None을 반환합니다."""
+    chunks = []
+    start = 0
+    iterations = 0
+    while start < len(text):
+        iterations += 1
+        if max_iterations is not None and iterations > max_iterations:
+            return None
+        end = start + chunk_size
+        if end < len(text):
+            last_period = text.rfind('.', start, end)
+            last_newline = text.rfind('\n', start, end)
+            cut_point = max(last_period, last_newline)
+            if cut_point > start:
+                end = cut_point + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end - overlap
+        if start >= len(text):
+            break
+    return chunks
+
+def _timed(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def bench_chunking(args):
+    pages = make_synthetic_pages(args.pages)
+    text = "\n".join(pages)
+    print(f"문서: {args.pages}페이지, {len(text):,} 문자")
+
+    cases = [
+        ("legacy (chars)", lambda: _legacy_chunk_text(text, args.chunk_size, args.overlap)),
+        ("TextChunker (chars)", lambda: TextChunker(args.chunk_size, args.overlap).chunk_pages(pages)),
+    ]
+    if args.tokens:
+        token_chunker = TextChunker(args.token_chunk_size, args.token_overlap, length_unit="tokens")
+        cases.append(("TextChunker (tokens)", lambda: token_chunker.chunk_pages(pages)))
+
+    _print_chunking_table(text, cases, args.repeat)
+
+    # 경계가 시작 위치 바로 뒤에만 있는 경우: 이전 구현은 시작 위치가 뒤로 밀려 끝나지 않음
+    adversarial = make_adversarial_text()
+    print(f"\n비정상 입력: {len(adversarial):,} 문자")
+    # 정상이라면 필요한 반복 횟수의 10배를 넘으면 진행하지 못하는 것으로 판단
+    max_iterations = 10 * len(adversarial) // max(args.chunk_size - args.overlap, 1)
+    _print_chunking_table(adversarial, [
+        ("legacy (chars)", lambda: _legacy_chunk_text(adversarial, args.chunk_size, args.overlap, max_iterations)),
+        ("TextChunker (chars)", lambda: TextChunker(args.chunk_size, args.overlap).chunk_text(adversarial)),
+    ], 1)
+
+def _print_chunking_table(text: str, cases, repeat: int):
+    print(f"{'구현':<24}{'청크 수':>10}{'시간(ms)':>12}{'MB/s':>10}")
+    megabytes = len(text.encode("utf-8")) / 1e6
+    for name, func in cases:
+        seconds, chunks = _timed(func, repeat)
+        if chunks is None:
+            print(f"{name:<24}{'중단':>10}{seconds * 1000:>12.1f}{'-':>10}  (반복 횟수 상한 초과: 진행하지 못함)")
+            continue
+        print(f"{name:<24}{len(chunks):>10}{seconds * 1000:>12.1f}{megabytes / seconds:>10.1f}")
+
+def _pseudo_embeddings(texts: List[str], dim: int = 32) -> np.ndarray:
+    """텍스트 해시를 시드로 만든 결정적인 난수 벡터 (모델 대용)"""
+    seeds = [int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) for text in texts]
+    return np.vstack([np.random.default_rng(seed).normal(size=dim) for seed in seeds]).astype(np.float32)
+
+class _StubLLM:
+    """OpenAI 클라이언트 대용: 일정 지연 후 프롬프트에 나타난 세션 표식을 그대로 답합니다."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        time.sleep(self.latency)
+        prompt = " ".join(message['content'] for message in messages)
+        markers = sorted(set(re.findall(r"<세션 (\d+)>", prompt)))
+        content = "확인한 세션: " + ", ".join(f"<세션 {m}>" for m in markers)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def bench_sessions(args):
+    with tempfile.TemporaryDirectory(prefix="rag-sessions-") as workspace:
+        _run_sessions(args, workspace)
+
+def _run_sessions(args, workspace: str):
+    from rag_chatbot import RAGChatbot
+    from embedding_manager import EmbeddingManager
+    from benchmark_e2e import HashingEncoder
+
+    # 실제 EmbeddingManager와 벡터 저장소로 검색 (임베딩은 지정하지 않으면 오프라인 해싱 임베더)
+    manager = EmbeddingManager(
+        model_name=args.model or "benchmark-hashing",
+        db_path=os.path.join(workspace, "db"),
+        cache_dir=os.path.join(workspace, "embedding_cache"),
+        index_backend=args.vector_backend
+    )
+    if not args.model:
+        manager.embedding_model = HashingEncoder()
+    chunker = TextChunker()
+    texts = [chunk for page in make_synthetic_pages(args.pages, seed=2) for chunk in chunker.chunk_text(page)]
+    manager.upsert_documents(
+        texts=texts,
+        metadata=[{'source_url': f"https://example.com/{i // 20}.pdf", 'chunk_index': i % 20}
+                  for i in range(len(texts))],
+        ids=[f"chunk-{i}" for i in range(len(texts))]
+    )
+
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    chatbot = RAGChatbot(manager)
+    chatbot.client = _StubLLM(args.llm_ms / 1000)
+    print(f"코퍼스 {len(texts)}개 청크 ({args.vector_backend}, {args.model or '해싱 임베더'}), "
+          f"LLM 지연 {args.llm_ms}ms, 세션당 {args.turns}턴")
+    print(f"{'동시 세션':>10}{'요청 수':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'검색 p50':>10}"
+          f"{'처리량(/s)':>12}{'혼선':>8}")
+
+    levels = sorted({1, 4, 16, args.sessions} & set(range(1, args.sessions + 1)))
+    for level in levels:
+        sessions = [chatbot.create_session() for _ in range(level)]
+        latencies: List[float] = []
+        retrievals: List[float] = []
+        crosstalk = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(level)
+
+        def run(index: int):
+            session = sessions[index]
+            start_barrier.wait()
+            for turn in range(args.turns):
+                started = time.perf_counter()
+                result = session.chat(f"<세션 {index}> {turn}번째 질문: 전세자금 대출 조건은?")
+                elapsed = time.perf_counter() - started
+                # 답변에는 자기 세션의 표식만 있어야 함 (다른 세션의 히스토리가 섞이면 혼선)
+                seen = set(re.findall(r"<세션 (\d+)>", result['answer']))
+                with lock:
+                    latencies.append(elapsed)
+                    retrievals.append(result.get('timings', {}).get('retrieval', 0.0))
+                    if seen != {str(index)}:
+                        crosstalk.append((index, turn, sorted(seen)))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(run, range(level)))
+        wall = time.perf_counter() - started
+
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"{level:>10}{len(latencies):>10}{p50:>10.1f}{p95:>10.1f}{np.median(retrievals) * 1000:>10.1f}"
+              f"{len(latencies) / wall:>12.1f}{len(crosstalk):>8}")
+        for index, turn, seen in crosstalk[:5]:
+            print(f"  혼선: 세션 {index}, {turn}턴에서 세션 {seen}의 내용이 보임")
+    chatbot.close()
+
+_HEAVY_MODULES = ["sentence_transformers", "torch", "chromadb", "faiss", "openai", "bs4", "httpx", "PyPDF2"]
+
+_STARTUP_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+def _run_startup_case(body: str, repeat: int):
+    """새 인터프리터에서 body를 실행한 시간의 중앙값과 로드된 무거운 모듈 목록을 반환합니다."""
+    script = _STARTUP_SCRIPT.format(body=body, modules=_HEAVY_MODULES)
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"))
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    timings, loaded = [], []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            return None, completed.stderr.strip().splitlines()[-1:]
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded = result["loaded"]
+    return float(np.median(timings)), loaded
+
+def bench_startup(args):
+    cases = [
+        ("import main", "import main"),
+        ("CLI 준비 (생성 + 문서 수 조회)",
+         "import main\nbot = main.HousingPolicyChatbot()\nbot.embedding_manager.get_collection_info()"),
+    ]
+    if args.with_model:
+        cases.append(("첫 질의 준비 (warm_up)",
+                      "import main\nbot = main.HousingPolicyChatbot()\nbot.warm_up(background=False)"))
+    # 비교용: 이전처럼 모든 무거운 모듈을 시작 시 import하는 비용
+    cases.append(("참고: 무거운 모듈 즉시 import",
+                  "\n".join(f"try:\n    import {m}\nexcept ImportError:\n    pass" for m in _HEAVY_MODULES)))
+
+    print(f"{'단계':<32}{'시간(ms)':>10}  로드된 무거운 모듈")
+    for name, body in cases:
+        seconds, loaded = _run_startup_case(body, args.repeat)
+        if seconds is None:
+            print(f"{name:<32}{'실패':>10}  {' '.join(loaded)}")
+            continue
+        print(f"{name:<32}{seconds * 1000:>10.1f}  {', '.join(loaded) or '-'}")
+
+def make_synthetic_embeddings(count: int, dim: int, num_queries: int, seed: int = 0):
+    """군집 구조가 있는 합성 임베딩과, 코퍼스 벡터 근처의 질의 임베딩을 생성합니다."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 50, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.6 * rng.normal(size=(count, dim)).astype(np.float32)
+    queries = vectors[rng.integers(count, size=num_queries)] + 0.6 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    return vectors, queries
+
+def _corpus_embeddings(num_queries: int):
+    """저장된 코퍼스의 청크 임베딩과, 무작위 청크의 앞부분으로 만든 질의 임베딩을 반환합니다."""
+    from embedding_manager import EmbeddingManager
+
+    manager = EmbeddingManager()
+    documents = [doc for _, docs in manager.vector_store.iter_documents() for doc in docs if doc]
+    if not documents:
+        return None, None
+    queries = [doc[:80] for doc in random.Random(0).sample(documents, min(num_queries, len(documents)))]
+    return manager.encode_texts(documents), manager.encode_texts(queries)
+
+def bench_quantization(args):
+    from vector_store import CompactVectorStore
+
+    if args.synthetic:
+        vectors, queries = make_synthetic_embeddings(args.synthetic, args.dim, args.queries)
+        print(f"합성 코퍼스: {len(vectors):,}개 벡터, {vectors.shape[1]}차원, 질의 {len(queries)}개")
+    else:
+        vectors, queries = _corpus_embeddings(args.queries)
+        if vectors is None:
+            print("저장된 문서가 없습니다. --synthetic N으로 합성 코퍼스를 사용하세요.")
+            return
+        print(f"코퍼스: {len(vectors):,}개 청크, {vectors.shape[1]}차원, 질의 {len(queries)}개")
+
+    # 기준: float32 전체 정확 검색
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    normalized_queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    k = args.k
+    exact = [set(np.argsort(-(normalized @ q), kind="stable")[:k].tolist()) for q in normalized_queries]
+
+    cases = [("none", 1), ("float16", 1), ("float16", args.rescore_factor),
+             ("int8", 1), ("int8", args.rescore_factor)]
+    print(f"{'양자화':<10}{'재채점':>8}{'메모리(MB)':>12}{'할당(MB)':>10}{'압축률':>8}{'디스크(MB)':>12}"
+          f"{f'recall@{k}':>12}{'p50(ms)':>10}")
+    ids = [str(i) for i in range(len(vectors))]
+    for quantization, rescore_factor in cases:
+        with tempfile.TemporaryDirectory() as directory:
+            store = CompactVectorStore(directory, "benchmark", quantization=quantization,
+                                       rescore_factor=rescore_factor, persist_interval=float("inf"))
+            for start in range(0, len(vectors), 5000):
+                end = start + 5000
+                store.upsert(ids[start:end], vectors[start:end], [""] * len(ids[start:end]),
+                             [{}] * len(ids[start:end]))
+
+            recalls, latencies = [], []
+            for query, expected in zip(queries, exact):
+                started = time.perf_counter()
+                hits = store.query(query, k)[0]
+                latencies.append(time.perf_counter() - started)
+                recalls.append(len({int(hit[0]) for hit in hits} & expected) / k)
+
+            # 메모리는 ID 배열과 여유 공간까지 포함한 실제 크기, 디스크는 float32 원본을 포함한 크기
+            usage = store.memory_usage()
+            store.persist()
+            disk = store.disk_usage()
+            print(f"{quantization:<10}{'x' + str(rescore_factor) if rescore_factor > 1 else '-':>8}"
+                  f"{usage['bytes'] / 1e6:>12.2f}{usage['allocated_bytes'] / 1e6:>10.2f}"
+                  f"{usage['compression']:>8.2f}{disk['bytes'] / 1e6:>12.2f}"
+                  f"{np.mean(recalls):>12.4f}{np.percentile(latencies, 50) * 1000:>10.2f}")
+            store.reset()
+            store.conn.close()
+
+def bench_embedding(args):
+    from embedding_backends import create_encoder
+
+    # 합성 페이지의 줄을 문장으로 사용 (짧은 목록 항목부터 여러 문장이 이어진 줄까지 길이가 다양함)
+    lines = [line for page in make_synthetic_pages(args.sentences // 30 + 1, seed=1) for line in page.split("\n")]
+    sentences = lines[:args.sentences]
+    print(f"문장 {len(sentences)}개, 배치 {args.batch_size}, 스레드 {args.threads or '자동'}")
+    print(f"{'백엔드':<12}{'로드(s)':>10}{'문장/초':>10}{'최소 코사인':>14}{'평균 코사인':>14}")
+
+    reference = None
+    for backend in args.backends.split(","):
+        started = time.perf_counter()
+        try:
+            encoder = create_encoder(args.model, backend, batch_size=args.batch_size,
+                                     num_threads=args.threads or None, model_dir=args.model_dir)
+        except Exception as e:
+            print(f"{backend:<12}{'실패':>10}  {e}")
+            continue
+        load_seconds = time.perf_counter() - started
+        encoder.encode(sentences[:args.batch_size])
+
+        seconds, embeddings = _timed(lambda: encoder.encode(sentences), args.repeat)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if reference is None:
+            # 첫 번째 백엔드(기본값 torch)를 기준으로 수치 차이를 비교
+            reference = embeddings
+        cosine = np.sum(embeddings * reference, axis=1)
+        print(f"{backend:<12}{load_seconds:>10.1f}{len(sentences) / seconds:>10.1f}"
+              f"{cosine.min():>14.5f}{cosine.mean():>14.5f}")
+
+class _StubEncoder:
+    """임베딩 모델 대용: 호출마다 고정 비용과 텍스트당 비용만큼 지연됩니다.
+
+    실제 모델처럼 한 번에 한 호출만 실행됩니다 (CPU 추론은 코어를 모두 사용하므로).
+    """
+
+    def __init__(self, call_ms: float, per_text_ms: float):
+        self.call_seconds = call_ms / 1000
+        self.per_text_seconds = per_text_ms / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        with self._lock:
+            self.calls += 1
+            time.sleep(self.call_seconds + self.per_text_seconds * len(texts))
+        return _pseudo_embeddings(texts)
+
+def bench_service(args):
+    from embedding_service import EmbeddingServer, EmbeddingClient
+
+    if args.model:
+        from embedding_backends import create_encoder
+        encoder = create_encoder(args.model, args.backend)
+        encoder.encode(["warm up"])
+    else:
+        encoder = _StubEncoder(args.call_ms, args.per_text_ms)
+    queries = [f"{i}번 질문: " + sentence for i in range(args.requests) for sentence in _SAMPLE_SENTENCES[:1]]
+
+    def run_clients(encode) -> tuple:
+        latencies = []
+        lock = threading.Lock()
+
+        def run(client_index: int):
+            for query in queries:
+                started = time.perf_counter()
+                encode(f"[{client_index}] {query}")
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            list(pool.map(run, range(args.clients)))
+        wall = time.perf_counter() - started
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        return len(latencies) / wall, p50, p95
+
+    print(f"클라이언트 {args.clients}개 x 요청 {args.requests}개 (쿼리 하나씩 임베딩)")
+    print(f"{'방식':<28}{'처리량(/s)':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'모델 호출':>10}")
+
+    calls_before = getattr(encoder, 'calls', 0)
+    throughput, p50, p95 = run_clients(lambda text: encoder.encode([text]))
+    calls = getattr(encoder, 'calls', 0) - calls_before
+    print(f"{'직접 호출 (배치 1)':<28}{throughput:>12.1f}{p50:>10.1f}{p95:>10.1f}{calls or '-':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "embedding.sock")
+        server = EmbeddingServer(encoder, socket_path, args.model or "stub", args.backend,
+                                 args.max_batch_size, args.max_wait_ms)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = EmbeddingClient(socket_path)
+            throughput, p50, p95 = run_clients(lambda text: client.encode([text]))
+            stats = client.info()['stats']
+            name = f"서비스 (최대 대기 {args.max_wait_ms:g}ms)"
+            print(f"{name:<28}{throughput:>12.1f}{p50:>10.1f}{p95:>10.1f}{stats['batches']:>10}"
+                  f"  평균 배치 {stats['mean_batch_size']}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="주택정책 챗봇 성능 벤치마크")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chunking = subparsers.add_parser("chunking", help="텍스트 청크 분할 처리량")
+    chunking.add_argument("--pages", type=int, default=500)
+    chunking.add_argument("--chunk-size", type=int, default=1000)
+    chunking.add_argument("--overlap", type=int, default=200)
+    chunking.add_argument("--tokens", action="store_true", help="tiktoken 토큰 단위도 측정")
+    chunking.add_argument("--token-chunk-size", type=int, default=400)
+    chunking.add_argument("--token-overlap", type=int, default=80)
+    chunking.add_argument("--repeat", type=int, default=3)
+    chunking.set_defaults(func=bench_chunking)
+
+    sessions = subparsers.add_parser("sessions", help="동시 채팅 세션 격리와 요청 지연 시간")
+    sessions.add_argument("--sessions", type=int, default=32)
+    sessions.add_argument("--turns", type=int, default=5)
+    sessions.add_argument("--pages", type=int, default=200, help="검색 코퍼스로 쓸 합성 페이지 수")
+    sessions.add_argument("--vector-backend", default="compact", help="chroma, faiss 또는 compact")
+    sessions.add_argument("--model", default="", help="지정하면 해싱 임베더 대신 실제 임베딩 모델 사용")
+    sessions.add_argument("--llm-ms", type=float, default=50.0)
+    sessions.set_defaults(func=bench_sessions)
+
+    startup = subparsers.add_parser("startup", help="CLI 시작 시간과 지연 import 확인")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--with-model", action="store_true", help="임베딩 모델 로드(warm_up)까지 측정")
+    startup.set_defaults(func=bench_startup)
+
+    quantization = subparsers.add_parser("quantization", help="양자화 임베딩 저장소의 메모리와 재현율")
+    quantization.add_argument("--synthetic", type=int, default=0,
+                              help="저장된 코퍼스 대신 N개의 합성 벡터 사용")
+    quantization.add_argument("--dim", type=int, default=384)
+    quantization.add_argument("--queries", type=int, default=200)
+    quantization.add_argument("--k", type=int, default=5)
+    quantization.add_argument("--rescore-factor", type=int, default=4)
+    quantization.set_defaults(func=bench_quantization)
+
+    embedding = subparsers.add_parser("embedding", help="임베딩 추론 백엔드별 처리량과 수치 차이")
+    embedding.add_argument("--backends", default="torch,onnx,onnx-int8")
+    embedding.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    embedding.add_argument("--model-dir", default="onnx_models")
+    embedding.add_argument("--sentences", type=int, default=1000)
+    embedding.add_argument("--batch-size", type=int, default=32)
+    embedding.add_argument("--threads", type=int, default=0, help="0이면 백엔드 기본값")
+    embedding.add_argument("--repeat", type=int, default=3)
+    embedding.set_defaults(func=bench_embedding)
+
+    service = subparsers.add_parser("service", help="공유 임베딩 서비스의 마이크로 배치 효과")
+    service.add_argument("--clients", type=int, default=16)
+    service.add_argument("--requests", type=int, default=50, help="클라이언트당 요청 수")
+    service.add_argument("--model", default="", help="지정하면 스텁 대신 실제 모델 사용")
+    service.add_argument("--backend", default="torch")
+    service.add_argument("--call-ms", type=float, default=8.0, help="스텁 모델의 호출당 고정 지연")
+    service.add_argument("--per-text-ms", type=float, default=0.3, help="스텁 모델의 텍스트당 지연")
+    service.add_argument("--max-batch-size", type=int, default=64)
+    service.add_argument("--max-wait-ms", type=float, default=5.0)
+    service.set_defaults(func=bench_service)
+
+    from benchmark_e2e import add_arguments as add_e2e_arguments
+    add_e2e_arguments(subparsers.add_parser("e2e", help="오프라인 종단 간 벤치마크 (수집, 검색, 대화, 메모리)"))
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""오프라인 종단 간 벤치마크
+
+네트워크 없이 다음을 측정하고 결과를 JSON으로 저장합니다.
+  - 합성 한국어 보도자료 PDF 수집 처리량 (페이지/초, 청크/초, 단계별 처리량)
+  - 검색(search_similar)과 전체 chat()의 지연 시간 백분위수, chat()의 단계별 지연 시간
+  - 최대 RSS (메인 프로세스, 추출 자식 프로세스)
+
+PDF 다운로드와 OpenAI API는 로컬 스텁 서버(127.0.0.1)가 대신합니다. 기본값은 운영 경로와 같은
+임베딩 모델과 벡터 저장소(VECTOR_BACKEND, 기본 chroma)이며, 모델을 받을 수 없는 환경에서는
+--hashing-embedder로 문자 바이그램 해싱 임베더를 사용할 수 있습니다.
+tiktoken 인코딩을 불러올 수 없으면 토큰 수는 문자 수 기반 추정으로 계산되며, 결과에 기록됩니다.
+
+사용법:
+    python benchmark.py e2e --documents 40 --pages 8 --output bench_results.json
+    python benchmark.py e2e --baseline bench_results.json --tolerance 0.15
+    python benchmark.py e2e --hashing-embedder --vector-backend compact   # 오프라인
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import platform
+import resource
+import tempfile
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from benchmark import make_synthetic_pages, _SAMPLE_SENTENCES
+
+_TITLES = ["수도권 주택공급 확대 방안", "청년·신혼부부 주거지원 강화", "전세사기 피해 지원 대책",
+           "주택담보대출 규제 합리화", "공공임대주택 공급 계획", "부동산 시장 안정화 방안"]
+
+# ----------------------------------------------------------------------------
+# 합성 PDF
+# ----------------------------------------------------------------------------
+
+def _to_unicode_cmap(characters: List[str]) -> bytes:
+    """글리프 코드(UTF-16 코드 단위)를 같은 유니코드 문자로 대응시키는 ToUnicode CMap"""
+    entries = [f"<{ord(c):04X}> <{ord(c):04X}>" for c in sorted(characters)]
+    blocks = []
+    for start in range(0, len(entries), 100):
+        block = entries[start:start + 100]
+        blocks.append(f"{len(block)} beginbfchar\n" + "\n".join(block) + "\nendbfchar")
+    return ("/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def /CMapType 2 def\n"
+            "1 begincodespacerange <0000> <FFFF> endcodespacerange\n"
+            + "\n".join(blocks) +
+            "\nendcmap CMapName currentdict /CMap defineresource pop end end").encode("ascii")
+
+def write_text_pdf(path: str, pages: List[str], font_size: int = 10, leading: int = 14):
+    """페이지별 텍스트로 PDF를 만듭니다.
+
+    한글 글꼴은 포함하지 않고 Identity-H 인코딩과 ToUnicode CMap만 두므로, 화면 표시는
+    뷰어에 따라 다르지만 텍스트 추출 결과는 원래 텍스트와 같습니다.
+    """
+    objects: List[Optional[bytes]] = []
+
+    def add(body: Optional[bytes]) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_id = add(None)
+    characters = {c for text in pages for c in text if c != "\n" and ord(c) <= 0xFFFF}
+    cmap = _to_unicode_cmap(list(characters))
+    to_unicode = add(b"<< /Length %d >>\nstream\n" % len(cmap) + cmap + b"\nendstream")
+    descriptor = add(b"<< /Type /FontDescriptor /FontName /SyntheticGothic /Flags 4 "
+                     b"/FontBBox [0 -200 1000 900] /ItalicAngle 0 /Ascent 900 /Descent -200 "
+                     b"/CapHeight 700 /StemV 80 >>")
+    cid_font = add(b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /SyntheticGothic "
+                   b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                   b"/FontDescriptor %d 0 R /DW 1000 /CIDToGIDMap /Identity >>" % descriptor)
+    font = add(b"<< /Type /Font /Subtype /Type0 /BaseFont /SyntheticGothic /Encoding /Identity-H "
+               b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (cid_font, to_unicode))
+
+    page_ids = []
+    for text in pages:
+        operations = [b"BT /F1 %d Tf %d TL 40 800 Td" % (font_size, leading)]
+        for line in text.split("\n"):
+            encoded = "".join(c for c in line if ord(c) <= 0xFFFF).encode("utf-16-be")
+            operations.append(b"<" + encoded.hex().upper().encode("ascii") + b"> Tj T*")
+        operations.append(b"ET")
+        content = zlib.compress(b"\n".join(operations))
+        stream = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                            % (pages_id, font, stream)))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+def _wrap(text: str, width: int = 42) -> str:
+    lines = []
+    for line in text.split("\n"):
+        while len(line) > width:
+            cut = line.rfind(" ", 0, width)
+            cut = cut if cut > 0 else width
+            lines.append(line[:cut])
+            line = line[cut:].lstrip()
+        lines.append(line)
+    return "\n".join(lines)
+
+def make_press_release(index: int, num_pages: int) -> List[str]:
+    """보도자료 형식(머리말, 본문 페이지)의 합성 페이지 목록을 만듭니다."""
+    rng = random.Random(index)
+    body = make_synthetic_pages(num_pages, lines_per_page=24, seed=index)
+    header = (f"국토교통부 보도자료\n보도일시: 2024. {rng.randint(1, 12)}. {rng.randint(1, 28)}.\n"
+              f"제목: {rng.choice(_TITLES)} ({index + 1}차)\n담당부서: 주택정책과\n")
+    pages = [header + body[0]] + body[1:]
+    return [_wrap(page) for page in pages]
+
+def make_queries(count: int, seed: int = 0) -> List[str]:
+    """검색/대화 측정용 질문 목록 (모두 달라서 쿼리/검색 캐시에 걸리지 않음)"""
+    rng = random.Random(seed)
+    templates = ["{}에 대해 알려주세요.", "{} 관련 기준은 무엇인가요?", "{}는 언제부터 적용되나요?"]
+    return [f"[{i}] " + rng.choice(templates).format(rng.choice(_SAMPLE_SENTENCES).rstrip(".다요"))
+            for i in range(count)]
+
+# ----------------------------------------------------------------------------
+# 임베더와 스텁 서버
+# ----------------------------------------------------------------------------
+
+class HashingEncoder:
+    """문자 바이그램을 해싱해 고정 차원 벡터로 만드는 오프라인 임베더 (모델 다운로드 불필요)"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = re.sub(r"\s+", " ", text)
+            for i in range(len(text) - 1):
+                code = zlib.crc32(text[i:i + 2].encode("utf-8"))
+                vectors[row, code % self.dim] += 1.0 if code & 0x80000000 else -1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """GET /pdfs/<이름>으로 PDF를, POST /v1/chat/completions로 OpenAI 호환 응답을 제공합니다."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, extra_headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        name = os.path.basename(self.path)
+        path = os.path.join(self.server.pdf_dir, name)
+        if not self.path.startswith("/pdfs/") or not os.path.isfile(path):
+            self._send(404, b"not found", "text/plain")
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        self._send(200, body, "application/pdf", {"ETag": f'"{zlib.crc32(body):08x}"'})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, b"{}", "application/json")
+            return
+
+        time.sleep(self.server.llm_latency)
+        prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+        words = ["주택정책", "지원", "대상은", "무주택", "세대주이며", "신청은", "공고문을", "참고하세요."]
+        answer = " ".join(words[i % len(words)] for i in range(self.server.answer_words))
+        # 한국어 텍스트는 대략 2자당 1토큰으로 추정
+        usage = {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(answer) // 2}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-benchmark", "created": int(time.time()), "model": request.get("model", "stub")}
+
+        if not request.get("stream"):
+            body = dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+            ])
+            self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        pieces = [piece + " " for piece in answer.split(" ")]
+        for i, piece in enumerate(pieces):
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            chunk = dict(base, object="chat.completion.chunk",
+                         choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        final = dict(base, object="chat.completion.chunk",
+                     choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.close_connection = True
+
+class StubServer(ThreadingHTTPServer):
+    """PDF 파일 서버와 OpenAI 호환 채팅 API를 겸하는 로컬 스텁 서버"""
+
+    daemon_threads = True
+
+    def __init__(self, pdf_dir: str, llm_latency: float = 0.0, answer_words: int = 60):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.pdf_dir = pdf_dir
+        self.llm_latency = llm_latency
+        self.answer_words = answer_words
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+# ----------------------------------------------------------------------------
+# 측정과 비교
+# ----------------------------------------------------------------------------
+
+def _latency_summary(seconds: List[float]) -> Dict:
+    if not seconds:
+        return {}
+    milliseconds = np.array(seconds) * 1000
+    p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+    return {'count': len(seconds), 'mean_ms': round(float(milliseconds.mean()), 3),
+            'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+def _peak_rss_mb() -> Dict:
+    # Linux는 KB, macOS는 바이트 단위
+    unit = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit, 1)
+    }
+
+def run_suite(args) -> Dict:
+    """합성 코퍼스로 수집, 검색, 대화를 차례로 측정하고 결과 사전을 반환합니다."""
+    from pdf_processor import PDFProcessor
+    from embedding_manager import EmbeddingManager
+    from ingestion import IncrementalIngestor
+    from ingestion_pipeline import IngestionPipeline
+
+    metrics: Dict = {}
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workspace:
+        corpus_dir = os.path.join(workspace, "corpus")
+        os.makedirs(corpus_dir)
+        started = time.perf_counter()
+        for index in range(args.documents):
+            write_text_pdf(os.path.join(corpus_dir, f"release_{index:04d}.pdf"),
+                           make_press_release(index, args.pages))
+        corpus_bytes = sum(os.path.getsize(os.path.join(corpus_dir, name)) for name in os.listdir(corpus_dir))
+        print(f"합성 코퍼스: 문서 {args.documents}개 x {args.pages}페이지, "
+              f"{corpus_bytes / 1e6:.1f}MB ({time.perf_counter() - started:.1f}초)")
+
+        with StubServer(corpus_dir, args.llm_ms / 1000, args.answer_words) as server:
+            # 스텁 서버로만 통신하도록 OpenAI 클라이언트와 프록시 설정을 바꿈
+            os.environ["OPENAI_API_KEY"] = "benchmark"
+            os.environ["OPENAI_BASE_URL"] = f"{server.base_url}/v1"
+            os.environ["NO_PROXY"] = ",".join(filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"]))
+
+            manager = EmbeddingManager(
+                model_name="benchmark-hashing" if args.hashing_embedder else args.model,
+                db_path=os.path.join(workspace, "db"),
+                cache_dir=os.path.join(workspace, "embedding_cache"),
+                index_backend=args.vector_backend
+            )
+            if args.hashing_embedder:
+                manager.embedding_model = HashingEncoder()
+            manager.warm_up()
+
+            # 1. 수집: 다운로드 → 추출/청킹 → 임베딩
+            processor = PDFProcessor(download_dir=os.path.join(workspace, "pdfs"),
+                                     download_workers=args.download_workers)
+            pipeline = IngestionPipeline(processor, manager, IncrementalIngestor(processor, manager),
+                                         download_workers=args.download_workers,
+                                         extract_workers=args.extract_workers or None,
+                                         embed_batch_size=args.embed_batch_size)
+            urls = [f"{server.base_url}/pdfs/release_{index:04d}.pdf" for index in range(args.documents)]
+            started = time.perf_counter()
+            report = pipeline.run(urls)
+            seconds = time.perf_counter() - started
+            summary = report['summary']
+            metrics['ingest'] = {
+                'documents': summary['documents'],
+                'failed': summary['failed'],
+                'pages': args.documents * args.pages,
+                'chunks': summary['chunks'],
+                'seconds': round(seconds, 3),
+                'pages_per_sec': round(args.documents * args.pages / seconds, 2),
+                'chunks_per_sec': round(summary['chunks'] / seconds, 2),
+                'stages': report['stages']
+            }
+            print(f"수집: {summary['chunks']}개 청크, {seconds:.2f}초, "
+                  f"{metrics['ingest']['pages_per_sec']} 페이지/초, {metrics['ingest']['chunks_per_sec']} 청크/초")
+
+            # 2. 검색 지연 시간 (모든 질문이 달라 캐시에 걸리지 않음)
+            queries = make_queries(args.queries)
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                manager.search_similar(query, n_results=6)
+                latencies.append(time.perf_counter() - started)
+            metrics['retrieval'] = _latency_summary(latencies)
+            print(f"검색: p50 {metrics['retrieval']['p50_ms']}ms, p95 {metrics['retrieval']['p95_ms']}ms")
+
+            # 3. 전체 chat() 지연 시간 (질문마다 새 대화 메모리)
+            from rag_chatbot import RAGChatbot
+            chatbot = RAGChatbot(manager)
+            latencies, failures, stages, tokens = [], 0, {}, 0
+            for query in make_queries(args.queries, seed=1):
+                started = time.perf_counter()
+                result = chatbot.chat(query, conversation_history=chatbot.create_memory())
+                latencies.append(time.perf_counter() - started)
+                failures += result['answer'].startswith("죄송합니다")
+                for stage, seconds in result.get('timings', {}).items():
+                    stages.setdefault(stage, []).append(seconds)
+                tokens += result.get('usage', {}).get('total_tokens', 0)
+            # tiktoken이 없으면 컨텍스트 예산을 추정 토큰 수로 계산하므로 결과 비교 시 구분
+            token_counting = "tiktoken" if chatbot.context_builder.token_counter.encoding else "estimate"
+            metrics['chat'] = dict(_latency_summary(latencies), failures=failures,
+                                   llm_latency_ms=args.llm_ms, total_tokens=tokens, token_counting=token_counting,
+                                   stages={stage: _latency_summary(values) for stage, values in stages.items()})
+            print(f"대화: p50 {metrics['chat']['p50_ms']}ms, p95 {metrics['chat']['p95_ms']}ms "
+                  f"(LLM 스텁 지연 {args.llm_ms}ms, 실패 {failures}건, 토큰 계산 {token_counting})")
+            print("  단계별 p50: " + ", ".join(f"{stage} {summary['p50_ms']}ms"
+                                            for stage, summary in metrics['chat']['stages'].items()))
+
+    metrics['peak_rss_mb'] = _peak_rss_mb()
+    print(f"최대 RSS: {metrics['peak_rss_mb']['self']}MB (추출 프로세스 {metrics['peak_rss_mb']['children']}MB)")
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'config': {key: value for key, value in vars(args).items() if key != "func"},
+        'metrics': metrics
+    }
+
+# (지표 경로, 높을수록 좋은지)
+_COMPARED_METRICS = [
+    (("ingest", "pages_per_sec"), True),
+    (("ingest", "chunks_per_sec"), True),
+    (("retrieval", "p50_ms"), False),
+    (("retrieval", "p95_ms"), False),
+    (("chat", "p50_ms"), False),
+    (("chat", "p95_ms"), False),
+    (("peak_rss_mb", "self"), False),
+]
+
+def compare_results(current: Dict, baseline: Dict,
+                    tolerance: float) -> List[Tuple[str, Optional[float], Optional[float], Optional[float], bool]]:
+    """두 결과의 주요 지표를 비교해 (지표, 기준값, 현재값, 변화율, 회귀 여부) 목록을 반환합니다.
+
+    변화율은 나빠진 방향이 양수이며, tolerance(예: 0.1 = 10%)를 넘으면 회귀로 판단합니다.
+    어느 한쪽에 지표가 없으면 (단계를 건너뛰었거나 실패한 경우) 변화율 없이 회귀로 판단합니다.
+    """
+    rows = []
+    for path, higher_is_better in _COMPARED_METRICS:
+        before = baseline.get('metrics', {}).get(path[0], {}).get(path[1])
+        after = current.get('metrics', {}).get(path[0], {}).get(path[1])
+        if before is None or after is None:
+            rows.append((".".join(path), before, after, None, True))
+            continue
+        worse = before - after if higher_is_better else after - before
+        if before:
+            change = worse / before
+        else:
+            change = float("inf") if worse > 0 else 0.0
+        rows.append((".".join(path), before, after, change, change > tolerance))
+    return rows
+
+def _format_value(value: Optional[float], width: int, spec: str) -> str:
+    return ("없음" if value is None else format(value, spec)).rjust(width)
+
+def bench_e2e(args):
+    result = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_results(result, baseline, args.tolerance)
+        print(f"\n기준 결과와 비교 ({args.baseline}, 허용 {args.tolerance:.0%})")
+        changed = [key for key in ("model", "hashing_embedder", "vector_backend")
+                   if baseline.get('config', {}).get(key) != result['config'].get(key)]
+        if changed:
+            print(f"주의: 기준 결과와 설정이 다릅니다 ({', '.join(changed)})")
+        print(f"{'지표':<26}{'기준':>12}{'현재':>12}{'악화':>10}")
+        for name, before, after, change, regressed in rows:
+            status = '  지표 없음' if change is None else ('  회귀' if regressed else '')
+            print(f"{name:<26}{_format_value(before, 12, '.2f')}{_format_value(after, 12, '.2f')}"
+                  f"{_format_value(change, 10, '+.1%')}{status}")
+        if any(row[4] for row in rows):
+            sys.exit(1)
+
+def add_arguments(parser):
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=8, help="문서당 페이지 수")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2", help="임베딩 모델")
+    parser.add_argument("--hashing-embedder", action="store_true",
+                        help="모델 대신 오프라인 해싱 임베더 사용 (모델을 받을 수 없는 환경)")
+    parser.add_argument("--vector-backend", default=os.getenv("VECTOR_BACKEND", "chroma"),
+                        help="chroma, faiss 또는 compact")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--extract-workers", type=int, default=0, help="0이면 CPU 코어 수")
+    parser.add_argument("--embed-batch-size", type=int, default=256)
+    parser.add_argument("--llm-ms", type=float, default=20.0, help="스텁 LLM 응답 지연")
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default="", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="회귀로 판단하는 악화 비율")
+    parser.set_defaults(func=bench_e2e)
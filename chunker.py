@@ -0,0 +1,283 @@
+import os
+import bisect
+import logging
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, Union
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 경계 강도 (높을수록 우선)
+_STRENGTH_LINE = 1        # 일반 줄바꿈
+_STRENGTH_SENTENCE = 2    # 한국어 종결어미(다./요.), 공백 앞의 마침표/물음표/느낌표, 전각 마침표
+_STRENGTH_BULLET = 3      # 다음 줄이 목록 항목("-", "•", "1.", "1)", "가.", "(1)" 등)으로 시작
+_STRENGTH_PARAGRAPH = 3   # 빈 줄
+
+# 문자 분류표 (BMP 범위 코드 포인트 → 비트 플래그)
+_SPACE, _PUNCT, _ENDING, _BULLET, _MARK_PUNCT, _DIGIT, _HANGUL_MARK = 1, 2, 4, 8, 16, 32, 64
+_CHAR_FLAGS = np.zeros(0x10000, dtype=np.uint8)
+for _chars, _flag in ((" \t\n\r\u3000", _SPACE), (".!?", _PUNCT), ("다요", _ENDING),
+                      ("-•·▪○●□■◦※▶", _BULLET), (".)", _MARK_PUNCT), ("0123456789", _DIGIT)):
+    for _c in _chars:
+        _CHAR_FLAGS[ord(_c)] |= _flag
+# 목록 기호로 쓰이는 가~하
+_CHAR_FLAGS[0xAC00:0xD559] |= _HANGUL_MARK
+
+# 스트리밍 시 버퍼 끝에서 이만큼(문자) 떨어진 청크까지만 확정 (경계 판정과 토큰화가 뒤 텍스트에 영향받지 않도록)
+_STREAM_LOOKAHEAD = 64
+
+class TextChunker:
+    """페이지 문자열 목록을 문장/목록 경계에 맞춰 청크로 나누는 클래스
+
+    경계 후보를 한 번에 계산한 뒤 앞으로만 이동하며 자르므로 전체 길이에 선형이고,
+    매 청크마다 시작 위치가 반드시 앞으로 나아갑니다. 크기와 겹침은 문자 수("chars") 또는
+    tiktoken 토큰 수("tokens")로 지정합니다. iter_chunks()는 페이지를 하나씩 받아 일정 크기의
+    버퍼만 유지하며 청크와 페이지 범위를 생성합니다.
+    """
+
+    def __init__(self,
+                 chunk_size: int = 1000,
+                 overlap: int = 200,
+                 length_unit: str = "chars",
+                 encoding_name: str = "cl100k_base",
+                 min_chunk_ratio: float = 0.5):
+
+        if chunk_size <= 0:
+            raise ValueError("chunk_size는 0보다 커야 합니다.")
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError(f"지원하지 않는 길이 단위: {length_unit}")
+
+        self.chunk_size = chunk_size
+        self.overlap = max(0, min(overlap, chunk_size - 1))
+        self.length_unit = length_unit
+        self.encoding_name = encoding_name
+        self.min_chunk_ratio = min_chunk_ratio
+        # 스트리밍 시 이 길이(문자)만큼 모이면 청크를 확정
+        self.stream_buffer_chars = chunk_size * (8 if length_unit == "chars" else 32)
+        self._encoding = None
+
+    def _get_encoding(self):
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return self._encoding
+
+    def _unit_offsets(self, text: str) -> Optional[List[int]]:
+        """토큰 단위일 때 각 토큰의 시작 문자 위치를 반환합니다. 문자 단위면 None입니다."""
+        if self.length_unit == "chars":
+            return None
+        encoding = self._get_encoding()
+        tokens = np.asarray(encoding.encode_ordinary(text), dtype=np.int64)
+        if len(tokens) == 0:
+            return []
+
+        # 고유 토큰의 바이트 길이만 조회한 뒤 누적합으로 토큰별 바이트 시작 위치 계산
+        unique, inverse = np.unique(tokens, return_inverse=True)
+        unique_lengths = np.array([len(encoding.decode_single_token_bytes(int(t))) for t in unique],
+                                  dtype=np.int64)
+        byte_starts = np.concatenate(([0], np.cumsum(unique_lengths[inverse])[:-1]))
+
+        # UTF-8 바이트 위치 → 해당 바이트가 속한 문자 위치
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        char_of_byte = np.cumsum((data & 0xC0) != 0x80) - 1
+        return char_of_byte[byte_starts].tolist()
+
+    @staticmethod
+    def _find_boundaries(text: str) -> Tuple[List[int], List[int]]:
+        """자를 수 있는 위치(이 위치 앞에서 자름)와 강도를 위치 순서대로 반환합니다.
+
+        문자 코드 배열에 대한 벡터 연산으로 한 번에 계산합니다.
+        """
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        flags = _CHAR_FLAGS[np.minimum(codes, 0xFFFF)]
+
+        def shifted(array, n, fill):
+            # n칸 뒤의 값 (범위를 벗어나면 fill)
+            return np.concatenate((array[n:], np.full(min(n, len(array)), fill, dtype=array.dtype)))
+
+        def has(array, flag):
+            return (array & flag) != 0
+
+        # 텍스트 끝은 공백으로 취급
+        nxt, nxt2, nxt3 = shifted(flags, 1, _SPACE), shifted(flags, 2, 0), shifted(flags, 3, 0)
+        next_codes, next2_codes = shifted(codes, 1, 0), shifted(codes, 2, 0)
+        prev = np.concatenate((np.zeros(1, dtype=np.uint8), flags[:-1]))
+
+        newline = codes == 0x0A
+        sentence = (
+            (has(flags, _PUNCT) & has(nxt, _SPACE))
+            | ((codes == 0x2E) & has(prev, _ENDING))
+            | (codes == 0x3002)
+        )
+        paragraph = newline & (
+            (next_codes == 0x0A) | (((next_codes == 0x20) | (next_codes == 0x09)) & (next2_codes == 0x0A))
+        )
+        list_mark = (
+            has(nxt, _BULLET)
+            | (has(nxt, _DIGIT) & (has(nxt2, _MARK_PUNCT) | (has(nxt2, _DIGIT) & has(nxt3, _MARK_PUNCT))))
+            | (has(nxt, _HANGUL_MARK) & has(nxt2, _MARK_PUNCT))
+            | ((next_codes == 0x28) & has(nxt2, _DIGIT | _HANGUL_MARK))
+        )
+        bullet = newline & list_mark
+
+        strengths = np.zeros(len(codes), dtype=np.int8)
+        strengths[newline] = _STRENGTH_LINE
+        strengths[sentence] = _STRENGTH_SENTENCE
+        strengths[bullet] = _STRENGTH_BULLET
+        strengths[paragraph] = _STRENGTH_PARAGRAPH
+
+        indices = np.flatnonzero(strengths)
+        return (indices + 1).tolist(), strengths[indices].tolist()
+
+    def chunk_pages(self, pages: Iterable[Union[str, Tuple[int, str]]]) -> List[str]:
+        """페이지 문자열 목록을 청크 목록으로 나눕니다."""
+        return [chunk['text'] for chunk in self.iter_chunks(pages)]
+
+    def chunk_text(self, text: str) -> List[str]:
+        """하나의 문자열을 청크 목록으로 나눕니다."""
+        return self.chunk_pages([text])
+
+    def iter_chunks(self, pages: Iterable[Union[str, Tuple[int, str]]]) -> Iterator[Dict]:
+        """페이지를 하나씩 받아 {'text', 'page_start', 'page_end'} 청크를 생성하는 대로 반환합니다.
+
+        pages는 페이지 문자열 또는 (페이지 번호, 문자열) 쌍의 이터러블입니다. 아직 확정되지 않은
+        텍스트만 버퍼에 남기므로 문서 크기와 관계없이 메모리 사용량이 일정합니다.
+        """
+        text = ""                   # 아직 청크로 내보내지 않은 텍스트
+        parts: List[str] = []       # text 뒤에 이어 붙일 페이지들
+        parts_length = 0
+        page_starts: List[int] = []  # text + parts 기준 각 페이지의 시작 위치
+        page_numbers: List[int] = []
+
+        for page_number, page_text in self._numbered_pages(pages):
+            if not page_text.strip():
+                continue
+            if text or parts:
+                parts.append("\n")
+                parts_length += 1
+            page_starts.append(len(text) + parts_length)
+            page_numbers.append(page_number)
+            parts.append(page_text)
+            parts_length += len(page_text)
+
+            if len(text) + parts_length < self.stream_buffer_chars:
+                continue
+
+            text += "".join(parts)
+            parts, parts_length = [], 0
+            spans, resume = self._spans(text, final=False)
+            yield from self._with_pages(text, spans, page_starts, page_numbers)
+
+            # 확정된 부분을 버퍼에서 제거
+            first_page = max(bisect.bisect_right(page_starts, resume) - 1, 0)
+            page_starts = [max(start - resume, 0) for start in page_starts[first_page:]]
+            page_numbers = page_numbers[first_page:]
+            text = text[resume:]
+
+        text += "".join(parts)
+        spans, _ = self._spans(text, final=True)
+        yield from self._with_pages(text, spans, page_starts, page_numbers)
+
+    @staticmethod
+    def _numbered_pages(pages: Iterable[Union[str, Tuple[int, str]]]) -> Iterator[Tuple[int, str]]:
+        for i, page in enumerate(pages, 1):
+            if isinstance(page, tuple):
+                yield page
+            else:
+                yield i, page
+
+    @staticmethod
+    def _with_pages(text: str, spans: List[Tuple[int, int]],
+                    page_starts: List[int], page_numbers: List[int]) -> Iterator[Dict]:
+        for start, end in spans:
+            raw = text[start:end]
+            chunk = raw.strip()
+            first = start + (len(raw) - len(raw.lstrip()))
+            last = first + len(chunk) - 1
+            yield {
+                'text': chunk,
+                'page_start': page_numbers[bisect.bisect_right(page_starts, first) - 1],
+                'page_end': page_numbers[bisect.bisect_right(page_starts, last) - 1]
+            }
+
+    def chunk_spans(self, text: str) -> List[Tuple[int, int]]:
+        """청크의 (시작, 끝) 문자 위치 목록을 반환합니다. 공백뿐인 구간은 제외합니다."""
+        return self._spans(text, final=True)[0]
+
+    def _spans(self, text: str, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        """청크 구간 목록과, 확정하지 못하고 남은 텍스트의 시작 위치를 반환합니다.
+
+        final이 False이면 최대 길이가 텍스트 끝 근처에 닿는 청크는 뒤 텍스트가 더 들어와야
+        정해지므로 만들지 않고 그 시작 위치를 돌려줍니다.
+        """
+        length = len(text)
+        if length == 0:
+            return [], 0
+
+        offsets = self._unit_offsets(text)
+        if offsets is not None and not offsets:
+            return [], length
+
+        def to_unit(position: int) -> int:
+            # 문자 위치가 속한 단위 번호
+            if offsets is None:
+                return position
+            return max(bisect.bisect_right(offsets, position) - 1, 0)
+
+        def to_char(unit: int) -> int:
+            if offsets is None:
+                return min(unit, length)
+            return offsets[unit] if unit < len(offsets) else length
+
+        boundaries, strengths = self._find_boundaries(text)
+        min_units = max(1, int(self.chunk_size * self.min_chunk_ratio))
+
+        spans = []
+        start = 0
+        while start < length:
+            start_unit = to_unit(start)
+            limit = max(to_char(start_unit + self.chunk_size), start + 1)
+
+            if not final and limit + _STREAM_LOOKAHEAD >= length:
+                return spans, start
+            if limit >= length:
+                end = length
+            else:
+                # 최소 길이 이후 ~ 최대 길이 사이에서 가장 강한(같으면 가장 뒤의) 경계를 선택
+                lower = max(to_char(start_unit + min_units), start + 1)
+                lo = bisect.bisect_left(boundaries, lower)
+                hi = bisect.bisect_right(boundaries, limit)
+                end = limit
+                best_strength = 0
+                for i in range(hi - 1, lo - 1, -1):
+                    if strengths[i] > best_strength:
+                        best_strength = strengths[i]
+                        end = boundaries[i]
+                        if best_strength == _STRENGTH_PARAGRAPH:
+                            break
+
+            if text[start:end].strip():
+                spans.append((start, end))
+            if end >= length:
+                break
+
+            # 겹침 구간의 시작을 다음 경계에 맞추되, 항상 이전 시작보다 뒤로 이동
+            next_start = end
+            if self.overlap:
+                overlap_start = to_char(max(to_unit(end) - self.overlap, 0))
+                i = bisect.bisect_left(boundaries, overlap_start)
+                if i < len(boundaries) and boundaries[i] < end:
+                    overlap_start = boundaries[i]
+                if overlap_start > start:
+                    next_start = overlap_start
+            start = next_start
+
+        return spans, length
+
+def create_chunker_from_env() -> TextChunker:
+    """CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_UNIT 환경변수로 청커를 생성합니다."""
+    return TextChunker(
+        chunk_size=int(os.getenv("CHUNK_SIZE", "1000")),
+        overlap=int(os.getenv("CHUNK_OVERLAP", "200")),
+        length_unit=os.getenv("CHUNK_UNIT", "chars")
+    )
@@ -0,0 +1,286 @@
+import os
+import logging
+import threading
+import numpy as np
+from typing import List, Dict, Optional, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT = "관련 문서를 찾을 수 없습니다."
+
+# 인코딩 이름 → tiktoken 인코딩 (불러오지 못했으면 None, 프로세스당 한 번만 시도)
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+def _load_encoding(encoding_name: str):
+    with _encodings_lock:
+        if encoding_name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                # 오프라인이거나 인코딩 파일을 받을 수 없는 경우 매 호출마다 다시 받지 않도록 실패를 기억
+                logger.warning(f"tiktoken 인코딩({encoding_name})을 불러올 수 없어 문자 수 기반 추정을 사용합니다: {e}")
+                _encodings[encoding_name] = None
+        return _encodings[encoding_name]
+
+def _estimate_char_tokens(char: str) -> float:
+    # cl100k_base 기준으로 ASCII는 약 4자당 1토큰, 한글 등은 대체로 1자당 1토큰 이상
+    return 0.25 if ord(char) < 128 else 1.0
+
+class TokenCounter:
+    """tiktoken으로 토큰 수를 세고 자르는 클래스
+
+    인코딩을 불러올 수 없으면 문자 수로 토큰 수를 넉넉하게 추정합니다 (ASCII 4자당 1토큰, 그 밖의 문자는 1자당 1토큰).
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+
+    @property
+    def encoding(self):
+        return _load_encoding(self.encoding_name)
+
+    def count(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode_ordinary(text))
+        ascii_chars = sum(1 for char in text if ord(char) < 128)
+        return -(-ascii_chars // 4) + len(text) - ascii_chars
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """text를 앞에서부터 max_tokens 토큰까지만 남깁니다."""
+        encoding = self.encoding
+        if encoding is not None:
+            return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+        used = 0.0
+        for position, char in enumerate(text):
+            used += _estimate_char_tokens(char)
+            if used > max_tokens:
+                return text[:position]
+        return text
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 16) -> Optional[str]:
+    """first의 끝과 second의 앞이 겹치면 겹친 부분을 한 번만 포함해 합친 문자열을 반환합니다.
+
+    청크 겹침은 앞 청크의 꼬리가 다음 청크의 머리와 같은 형태이므로, second의 앞부분이
+    나타나는 first 안의 위치를 찾아 그 위치부터 끝까지가 second의 접두사와 일치하는지 확인합니다.
+    겹침이 min_overlap 문자보다 짧으면 None을 반환합니다.
+    """
+    if len(first) < min_overlap or len(second) < min_overlap:
+        return None
+
+    probe = second[:min_overlap]
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while position != -1:
+        tail = first[position:]
+        if second.startswith(tail):
+            return first + second[len(tail):]
+        position = first.find(probe, position + 1)
+
+    # second가 first 안에 통째로 포함된 경우
+    if second in first:
+        return first
+    return None
+
+class ContextBuilder:
+    """검색된 청크로 토큰 예산 안의 프롬프트 컨텍스트를 만드는 클래스
+
+    1. 유사도 임계값을 넘거나 키워드가 일치한 청크만 남깁니다.
+    2. 같은 문서에서 이웃한 청크(chunk_index가 연속)는 겹친 텍스트를 한 번만 남기고 합치고,
+       내용이 같은 청크는 하나만 남깁니다.
+    3. 최대 한계 관련성(MMR)으로 관련성이 높으면서 서로 다른 구절부터 고릅니다.
+       청크 임베딩은 embedding_lookup으로 저장소에 있는 벡터를 가져오고, 없는 청크만 embed_fn으로 계산합니다.
+    4. tiktoken으로 센 토큰 수가 max_tokens를 넘지 않을 때까지 구절을 채웁니다.
+       (tiktoken 인코딩을 불러올 수 없으면 문자 수 기반 추정을 사용)
+    """
+
+    def __init__(self,
+                 max_tokens: int = 2000,
+                 min_similarity: float = 0.5,
+                 mmr_lambda: float = 0.7,
+                 embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 encoding_name: str = "cl100k_base",
+                 embedding_lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None):
+
+        self.max_tokens = max_tokens
+        self.min_similarity = min_similarity
+        self.mmr_lambda = mmr_lambda
+        self.embed_fn = embed_fn
+        self.embedding_lookup = embedding_lookup
+        self.encoding_name = encoding_name
+        self.token_counter = TokenCounter(encoding_name)
+
+    def count_tokens(self, text: str) -> int:
+        return self.token_counter.count(text)
+
+    @staticmethod
+    def _document_key(metadata: Dict) -> Optional[str]:
+        return metadata.get('source_url') or metadata.get('filename')
+
+    def _merge_neighbours(self, documents: List[Dict]) -> List[Dict]:
+        """같은 문서의 연속된 청크를 구절 하나로 합치고, 내용이 같은 청크는 하나만 남깁니다."""
+        passages: List[Dict] = []
+        seen_texts = set()
+        by_position = {}
+
+        # 문서 안 위치 순서로 처리해야 이웃 청크를 차례로 이어 붙일 수 있음
+        def position(doc: Dict):
+            metadata = doc.get('metadata') or {}
+            index = metadata.get('chunk_index')
+            return (self._document_key(metadata) or "", index if index is not None else -1)
+
+        for doc in sorted(documents, key=position):
+            text = (doc.get('document') or "").strip()
+            if not text or text in seen_texts:
+                continue
+            seen_texts.add(text)
+
+            metadata = doc.get('metadata') or {}
+            key = self._document_key(metadata)
+            index = metadata.get('chunk_index')
+
+            previous = by_position.get((key, index - 1)) if key is not None and index is not None else None
+            merged = merge_overlapping(previous['text'], text) if previous is not None else None
+            if previous is not None:
+                if merged is None:
+                    merged = previous['text'] + "\n" + text
+                previous['text'] = merged
+                previous['chunks'].append(text)
+                previous['chunk_ids'].append(doc.get('id'))
+                previous['similarity'] = max(previous['similarity'], doc.get('similarity', 0))
+                previous['lexical_score'] = max(previous['lexical_score'], doc.get('lexical_score', 0))
+                if metadata.get('page_start') is not None:
+                    if previous['page_start'] is None:
+                        previous['page_start'], previous['page_end'] = metadata['page_start'], metadata['page_end']
+                    else:
+                        previous['page_start'] = min(previous['page_start'], metadata['page_start'])
+                        previous['page_end'] = max(previous['page_end'], metadata['page_end'])
+                by_position[(key, index)] = previous
+                continue
+
+            passage = {
+                'text': text,
+                'chunks': [text],
+                'chunk_ids': [doc.get('id')],
+                'similarity': doc.get('similarity', 0),
+                'lexical_score': doc.get('lexical_score', 0),
+                'page_start': metadata.get('page_start'),
+                'page_end': metadata.get('page_end')
+            }
+            passages.append(passage)
+            if key is not None and index is not None:
+                by_position[(key, index)] = passage
+
+        return passages
+
+    def _chunk_embeddings(self, passages: List[Dict]) -> Optional[np.ndarray]:
+        """구절들의 청크 임베딩을 순서대로 반환합니다. 저장된 벡터가 없는 청크만 embed_fn으로 계산합니다."""
+        ids = [chunk_id for passage in passages for chunk_id in passage['chunk_ids']]
+        texts = [chunk for passage in passages for chunk in passage['chunks']]
+        stored = self.embedding_lookup([i for i in ids if i is not None]) if self.embedding_lookup else {}
+        missing = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+        if missing and self.embed_fn is None:
+            return None
+
+        vectors = [stored.get(chunk_id) for chunk_id in ids]
+        if missing:
+            for i, vector in zip(missing, np.asarray(self.embed_fn([texts[i] for i in missing]), dtype=np.float32)):
+                vectors[i] = vector
+        vectors = np.vstack(vectors).astype(np.float32, copy=False)
+        # 저장소 벡터와 새로 계산한 벡터의 크기를 맞추기 위해 청크마다 정규화
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _passage_embeddings(self, passages: List[Dict]) -> Optional[np.ndarray]:
+        """구절 임베딩을 구성 청크 임베딩의 평균으로 계산합니다."""
+        if (self.embed_fn is None and self.embedding_lookup is None) or len(passages) < 2:
+            return None
+        try:
+            vectors = self._chunk_embeddings(passages)
+            if vectors is None:
+                return None
+            embeddings = []
+            offset = 0
+            for passage in passages:
+                count = len(passage['chunks'])
+                embeddings.append(vectors[offset:offset + count].mean(axis=0))
+                offset += count
+            embeddings = np.vstack(embeddings)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            return embeddings / np.maximum(norms, 1e-12)
+        except Exception as e:
+            logger.warning(f"MMR용 임베딩 계산 실패, 관련도 순서를 사용합니다: {e}")
+            return None
+
+    def _mmr_order(self, passages: List[Dict]) -> List[Dict]:
+        """최대 한계 관련성(MMR) 순서로 구절을 정렬합니다."""
+        relevance = np.array([p['similarity'] for p in passages], dtype=np.float32)
+        embeddings = self._passage_embeddings(passages)
+        if embeddings is None:
+            return [passages[i] for i in np.argsort(-relevance, kind="stable")]
+
+        similarity = embeddings @ embeddings.T
+        remaining = list(range(len(passages)))
+        max_redundancy = np.full(len(passages), -np.inf, dtype=np.float32)
+        order = []
+        while remaining:
+            candidates = np.array(remaining)
+            redundancy = np.where(np.isfinite(max_redundancy[candidates]), max_redundancy[candidates], 0.0)
+            scores = self.mmr_lambda * relevance[candidates] - (1 - self.mmr_lambda) * redundancy
+            chosen = int(candidates[int(np.argmax(scores))])
+            order.append(chosen)
+            remaining.remove(chosen)
+            max_redundancy = np.maximum(max_redundancy, similarity[chosen])
+        return [passages[i] for i in order]
+
+    @staticmethod
+    def _label(passage: Dict) -> str:
+        label = f"유사도: {passage['similarity']:.2f}"
+        if passage['page_start'] is not None:
+            pages = f"{passage['page_start']}-{passage['page_end']}" \
+                if passage['page_end'] != passage['page_start'] else f"{passage['page_start']}"
+            label += f", 페이지: {pages}"
+        return label
+
+    def build(self, documents: List[Dict]) -> str:
+        """검색된 문서들로 토큰 예산 안의 컨텍스트 문자열을 만듭니다."""
+        relevant = [
+            doc for doc in documents
+            if doc.get('similarity', 0) >= self.min_similarity or doc.get('lexical_score', 0) > 0
+        ]
+        if not relevant:
+            return NO_CONTEXT
+
+        passages = self._mmr_order(self._merge_neighbours(relevant))
+
+        parts = []
+        used_tokens = 0
+        separator_tokens = self.count_tokens("\n\n")
+        for passage in passages:
+            part = f"[{self._label(passage)}] {passage['text']}"
+            tokens = self.count_tokens(part) + (separator_tokens if parts else 0)
+            if used_tokens + tokens > self.max_tokens:
+                if not parts:
+                    # 가장 관련 있는 구절 하나가 예산보다 크면 예산만큼 잘라서 사용
+                    parts.append(self.token_counter.truncate(part, self.max_tokens))
+                    used_tokens = self.max_tokens
+                continue
+            parts.append(part)
+            used_tokens += tokens
+
+        logger.info(f"컨텍스트 구성: 검색 {len(documents)}개 → 구절 {len(passages)}개 중 "
+                    f"{len(parts)}개 사용, {used_tokens}/{self.max_tokens} 토큰")
+        return "\n\n".join(parts)
+
+def create_context_builder_from_env(
+        embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+        embedding_lookup: Optional[Callable[[List[str]], Dict[str, np.ndarray]]] = None) -> ContextBuilder:
+    """CONTEXT_MAX_TOKENS, CONTEXT_MIN_SIMILARITY, CONTEXT_MMR_LAMBDA 환경변수로 컨텍스트 빌더를 생성합니다."""
+    return ContextBuilder(
+        max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "2000")),
+        min_similarity=float(os.getenv("CONTEXT_MIN_SIMILARITY", "0.5")),
+        mmr_lambda=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
+        embed_fn=embed_fn,
+        embedding_lookup=embedding_lookup
+    )
@@ -0,0 +1,214 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable
+
+from context_builder import TokenCounter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 요약 작업을 위한 공용 스레드 풀 (여러 대화가 공유)
+_summary_executor: Optional[ThreadPoolExecutor] = None
+_summary_executor_lock = threading.Lock()
+
+def _default_executor() -> ThreadPoolExecutor:
+    global _summary_executor
+    with _summary_executor_lock:
+        if _summary_executor is None:
+            _summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+        return _summary_executor
+
+class JSONMemoryStore:
+    """대화 메모리를 세션별 JSON 파일로 저장하는 저장소
+
+    load(session_id), save(session_id, data), delete(session_id)를 가진 객체라면
+    무엇이든 ConversationMemory의 저장소로 사용할 수 있습니다.
+    """
+
+    def __init__(self, directory: str = "conversations"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        key = hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, session_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(session_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"대화 메모리 로드 실패: {session_id} - {e}")
+            return None
+
+    def save(self, session_id: str, data: Dict):
+        """임시 파일에 쓴 뒤 교체하여 원자적으로 저장합니다."""
+        path = self._path(session_id)
+        try:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"대화 메모리 저장 실패: {session_id} - {e}")
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+class ConversationMemory:
+    """최근 대화는 토큰 예산 안에서 그대로 두고, 오래된 대화는 누적 요약으로 압축하는 대화 메모리
+
+    최근 메시지의 토큰 수가 max_tokens를 넘으면 가장 오래된 턴부터 요약 대기열로 옮깁니다.
+    대기열은 다음 응답을 막지 않도록 백그라운드 스레드에서 summarizer(이전 요약, 메시지 목록)로
+    기존 요약에 합쳐지며, 요약 작업이 진행 중이면 새로 밀려난 턴은 다음 작업에서 함께 처리됩니다.
+    summarizer가 없으면 밀려난 턴은 버립니다. store와 session_id를 주면 변경될 때마다 저장합니다.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 1500,
+                 summarizer: Optional[Callable[[str, List[Dict]], str]] = None,
+                 store=None,
+                 session_id: Optional[str] = None,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 encoding_name: str = "cl100k_base"):
+
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.store = store
+        self.session_id = session_id
+        self.executor = executor
+        self.encoding_name = encoding_name
+        self.token_counter = TokenCounter(encoding_name)
+
+        self.messages: List[Dict] = []
+        self.summary = ""
+        self._token_counts: List[int] = []
+        self._overflow: List[Dict] = []
+        self._in_flight: List[Dict] = []
+        self._summarizing = False
+        self._generation = 0
+        self._lock = threading.RLock()
+
+        if store is not None and session_id is not None:
+            data = store.load(session_id)
+            if data:
+                self._restore(data)
+
+    def count_tokens(self, message: Dict) -> int:
+        # 메시지마다 역할/구분자에 해당하는 토큰 4개를 더함 (tiktoken이 없으면 문자 수 기반 추정)
+        return self.token_counter.count(message['content']) + 4
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __bool__(self) -> bool:
+        return bool(self.messages or self.summary)
+
+    def add_turn(self, question: str, answer: str):
+        """질문과 답변을 추가하고, 예산을 넘은 오래된 턴을 요약 대기열로 옮깁니다."""
+        with self._lock:
+            for message in ({"role": "user", "content": question},
+                            {"role": "assistant", "content": answer}):
+                self.messages.append(message)
+                self._token_counts.append(self.count_tokens(message))
+
+            # 마지막 턴은 예산을 넘더라도 그대로 유지
+            while sum(self._token_counts) > self.max_tokens and len(self.messages) > 2:
+                self._overflow.extend(self.messages[:2])
+                del self.messages[:2]
+                del self._token_counts[:2]
+
+            if self._overflow:
+                if self.summarizer is None:
+                    self._overflow = []
+                else:
+                    self._schedule_summary()
+            self._persist()
+
+    def _schedule_summary(self):
+        if self._summarizing or not self._overflow:
+            return
+        self._summarizing = True
+        batch, self._overflow = self._overflow, []
+        self._in_flight = batch
+        (self.executor or _default_executor()).submit(
+            self._summarize, self.summary, batch, self._generation
+        )
+
+    def _summarize(self, previous: str, batch: List[Dict], generation: int):
+        try:
+            summary = self.summarizer(previous, batch)
+        except Exception as e:
+            logger.error(f"대화 요약 실패: {e}")
+            summary = None
+
+        with self._lock:
+            self._summarizing = False
+            self._in_flight = []
+            if generation != self._generation:
+                # 요약하는 동안 대화가 초기화됨: 결과는 버리고 초기화 이후 쌓인 턴을 처리
+                self._schedule_summary()
+                return
+            if summary is None:
+                # 실패한 턴은 대기열 앞에 되돌려 다음 턴에서 다시 시도
+                self._overflow = batch + self._overflow
+                return
+            self.summary = summary.strip()
+            self._persist()
+            self._schedule_summary()
+
+    def prompt_messages(self) -> List[Dict]:
+        """프롬프트에 넣을 메시지 목록(누적 요약 + 최근 대화)을 반환합니다."""
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"이전 대화 요약:\n{self.summary}"})
+            messages.extend(dict(message) for message in self.messages)
+            return messages
+
+    def get_messages(self) -> List[Dict]:
+        """요약되지 않은 최근 메시지들의 복사본을 반환합니다."""
+        with self._lock:
+            return [dict(message) for message in self.messages]
+
+    def clear(self):
+        """대화 내용과 요약을 모두 지웁니다."""
+        with self._lock:
+            self._generation += 1
+            self.messages = []
+            self._token_counts = []
+            self._overflow = []
+            self._in_flight = []
+            self.summary = ""
+            if self.store is not None and self.session_id is not None:
+                self.store.delete(self.session_id)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'summary': self.summary,
+                'messages': [dict(message) for message in self.messages],
+                # 아직 요약에 반영되지 않은 턴도 저장해 재시작 후 요약
+                'pending': [dict(message) for message in self._in_flight + self._overflow]
+            }
+
+    def _restore(self, data: Dict):
+        self.summary = data.get('summary', "")
+        self.messages = list(data.get('messages', []))
+        self._token_counts = [self.count_tokens(message) for message in self.messages]
+        self._overflow = list(data.get('pending', []))
+        if self._overflow and self.summarizer is not None:
+            self._schedule_summary()
+
+    def _persist(self):
+        if self.store is not None and self.session_id is not None:
+            self.store.save(self.session_id, self.to_dict())
@@ -0,0 +1,149 @@
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Iterable, Optional, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 수집 상태: pending(대기) → ingested(수집 완료) / empty(텍스트 없음) / failed(실패, 다시 시도)
+INGEST_STATUSES = ('pending', 'ingested', 'empty', 'failed')
+_RESULT_STATUS = {'ingested': 'ingested', 'skipped': 'ingested', 'empty': 'empty', 'failed': 'failed'}
+
+class CrawlCatalog:
+    """크롤링한 보도자료와 PDF URL, 최초/최근 발견 시각, 수집 상태를 SQLite에 기록하는 카탈로그
+
+    URL은 기본 키, 날짜와 수집 상태에는 인덱스가 있어 이미 아는 보도자료 확인과
+    미수집 PDF 조회가 전체 목록 크기와 관계없이 빠르게 수행됩니다.
+    """
+
+    def __init__(self, db_path: str = "crawl_catalog.sqlite"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS releases ("
+            "source_url TEXT PRIMARY KEY, title TEXT, date TEXT, "
+            "first_seen REAL NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdfs ("
+            "pdf_url TEXT PRIMARY KEY, source_url TEXT, title TEXT, date TEXT, "
+            "first_seen REAL NOT NULL, last_seen REAL NOT NULL, "
+            "ingest_status TEXT NOT NULL DEFAULT 'pending', ingested_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_releases_date ON releases(date)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pdfs_date ON pdfs(date)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pdfs_source_url ON pdfs(source_url)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pdfs_status ON pdfs(ingest_status, first_seen)")
+        self.conn.commit()
+
+    @staticmethod
+    def _batches(items: List, size: int = 500):
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def known_releases(self, source_urls: Iterable[str]) -> Set[str]:
+        """주어진 보도자료 URL 중 이미 카탈로그에 있는 URL들을 반환합니다."""
+        urls = list(dict.fromkeys(url for url in source_urls if url))
+        known = set()
+        with self._lock:
+            for batch in self._batches(urls):
+                placeholders = ",".join("?" * len(batch))
+                known.update(url for (url,) in self.conn.execute(
+                    f"SELECT source_url FROM releases WHERE source_url IN ({placeholders})", batch
+                ))
+        return known
+
+    def touch_releases(self, source_urls: Iterable[str]):
+        """다시 발견한 보도자료와 그 PDF들의 최근 발견 시각을 갱신합니다."""
+        rows = [(time.time(), url) for url in dict.fromkeys(source_urls)]
+        with self._lock:
+            self.conn.executemany("UPDATE releases SET last_seen = ? WHERE source_url = ?", rows)
+            self.conn.executemany("UPDATE pdfs SET last_seen = ? WHERE source_url = ?", rows)
+            self.conn.commit()
+
+    def record_release(self, release: Dict, pdf_urls: List[str]) -> int:
+        """보도자료와 PDF URL들을 기록하고 새로 추가된 PDF 수를 반환합니다.
+
+        release는 title, date, link 키를 가지며, 이미 있는 항목은 최근 발견 시각만 갱신합니다.
+        """
+        now = time.time()
+        source_url = release['link']
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO releases (source_url, title, date, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(source_url) DO UPDATE SET title = excluded.title, date = excluded.date, "
+                "last_seen = excluded.last_seen",
+                (source_url, release.get('title'), release.get('date'), now, now)
+            )
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO pdfs (pdf_url, source_url, title, date, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(url, source_url, release.get('title'), release.get('date'), now, now) for url in pdf_urls]
+            )
+            added = self.conn.total_changes - before
+            self.conn.executemany("UPDATE pdfs SET last_seen = ? WHERE pdf_url = ?",
+                                  [(now, url) for url in pdf_urls])
+            self.conn.commit()
+        return added
+
+    def pending_pdfs(self, limit: Optional[int] = None, include_failed: bool = True) -> List[Dict]:
+        """아직 수집되지 않은 PDF들을 발견 순서대로 반환합니다.
+
+        반환 항목은 title, date, pdf_url, source_url 키를 가집니다.
+        """
+        statuses = ('pending', 'failed') if include_failed else ('pending',)
+        placeholders = ",".join("?" * len(statuses))
+        query = (f"SELECT title, date, pdf_url, source_url FROM pdfs "
+                 f"WHERE ingest_status IN ({placeholders}) ORDER BY first_seen, rowid")
+        params: List = list(statuses)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [
+            {'title': title, 'date': date, 'pdf_url': pdf_url, 'source_url': source_url}
+            for title, date, pdf_url, source_url in rows
+        ]
+
+    def mark_ingested(self, results: List[Dict]):
+        """수집 파이프라인 결과(doc_key, status)를 PDF별 수집 상태에 반영합니다."""
+        now = time.time()
+        rows = [
+            (_RESULT_STATUS.get(result['status'], 'failed'), now, result['doc_key'])
+            for result in results
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE pdfs SET ingest_status = ?, ingested_at = ? WHERE pdf_url = ?", rows
+            )
+            self.conn.commit()
+
+    def reset_status(self):
+        """모든 PDF를 다시 수집 대기 상태로 되돌립니다 (데이터베이스를 초기화한 경우)."""
+        with self._lock:
+            self.conn.execute("UPDATE pdfs SET ingest_status = 'pending', ingested_at = NULL")
+            self.conn.commit()
+
+    def get_stats(self) -> Dict:
+        """보도자료 수와 수집 상태별 PDF 수를 반환합니다."""
+        with self._lock:
+            releases = self.conn.execute("SELECT COUNT(*) FROM releases").fetchone()[0]
+            counts = dict(self.conn.execute(
+                "SELECT ingest_status, COUNT(*) FROM pdfs GROUP BY ingest_status"
+            ).fetchall())
+        return {
+            'releases': releases,
+            'pdfs': sum(counts.values()),
+            **{status: counts.get(status, 0) for status in INGEST_STATUSES}
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    """호스트별 요청 속도를 제한하는 토큰 버킷 (초당 rate개, 최대 burst개까지 누적)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class ResponseCache:
+    """HTTP 응답 본문과 검증자(ETag/Last-Modified)를 URL별 JSON 파일로 저장하는 디스크 캐시
+
+    ttl 안의 항목은 네트워크 없이 반환하고, 만료된 항목은 조건부 GET으로 재검증합니다.
+    """
+
+    def __init__(self, cache_dir: str = "http_cache", ttl: float = 3600.0):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if entry.get('url') == url else None
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict:
+        entry = {
+            'url': url,
+            'text': text,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        }
+        path = self._path(url)
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"응답 캐시 저장 실패: {url} - {e}")
+        return entry
+
+class AsyncCrawler:
+    """호스트별 속도 제한, 동시 요청 수 제한, URL 중복 제거, 재시도를 갖춘 비동기 크롤러
+
+    같은 URL은 크롤러 인스턴스 안에서 한 번만 요청하며, 동시에 들어온 요청은 진행 중인
+    결과를 공유합니다. 응답은 ResponseCache에 저장되어 다음 크롤링에서 재사용됩니다.
+    """
+
+    def __init__(self,
+                 requests_per_second: float = 2.0,
+                 burst: int = 2,
+                 max_concurrency: int = 8,
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 cache: Optional[ResponseCache] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.headers = headers or {}
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'retries': 0, 'failures': 0}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            transport=self.transport
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks = {}
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+        return self._buckets[host]
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Retry-After 헤더가 있으면 따르고, 없으면 지터를 더한 지수 백오프 시간을 반환합니다."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        return self.backoff_factor * (2 ** attempt) * (1 + random.random())
+
+    async def fetch(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
+        """URL의 본문을 반환합니다. 실패하면 None을 반환합니다."""
+        if params:
+            url = str(httpx.URL(url, params=params))
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._tasks[url] = task
+        return await task
+
+    async def fetch_many(self, urls: List[str]) -> List[Optional[str]]:
+        """여러 URL을 동시에 가져오고 입력 순서대로 본문을 반환합니다."""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.stats['cache_hits'] += 1
+            return entry['text']
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    await self._bucket(url).acquire()
+                    self.stats['requests'] += 1
+                    response = await self._client.get(url, headers=headers)
+
+                if response.status_code == 304 and entry:
+                    self.stats['not_modified'] += 1
+                    return self.cache.put(url, entry['text'], entry.get('etag'), entry.get('last_modified'))['text']
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    if self.cache:
+                        self.cache.put(url, response.text, response.headers.get('ETag'),
+                                       response.headers.get('Last-Modified'))
+                    return response.text
+                error = f"HTTP {response.status_code}"
+
+            except httpx.HTTPStatusError as e:
+                # 4xx 오류는 재시도해도 결과가 같으므로 바로 실패 처리
+                logger.error(f"요청 실패: {url} - {e}")
+                self.stats['failures'] += 1
+                return None
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                self.stats['retries'] += 1
+                logger.warning(f"요청 재시도 ({attempt + 1}/{self.max_retries}, {delay:.1f}초 후): {url} - {error}")
+                await asyncio.sleep(delay)
+
+        logger.error(f"요청 실패: {url} - {error}")
+        self.stats['failures'] += 1
+        # 재검증에 실패했으면 만료된 캐시라도 반환
+        return entry['text'] if entry else None
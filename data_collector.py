@@ -1,11 +1,14 @@
 import os
+import asyncio
 import requests
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
 import logging
 from datetime import datetime
-import time
+
+from crawler import AsyncCrawler, ResponseCache
+from crawl_catalog import CrawlCatalog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,7 +16,15 @@ logger = logging.getLogger(__name__)
 class DataCollector:
     """공공데이터 포탈에서 주택정책 보도자료를 수집하는 클래스"""
     
-    def __init__(self, api_key: str = None):
+    LIST_URL = "https://www.data.go.kr/tcs/dss/selectApiDataDetailView.do"
+    
+    def __init__(self,
+                 api_key: str = None,
+                 requests_per_second: float = 2.0,
+                 max_concurrency: int = 8,
+                 cache_dir: Optional[str] = "http_cache",
+                 cache_ttl: float = 3600.0,
+                 catalog_path: Optional[str] = "crawl_catalog.sqlite"):
         self.api_key = api_key or os.getenv("DECODING_API_KEY")
         if not self.api_key:
             logger.warning("API 키가 설정되지 않았습니다.")
@@ -23,58 +34,84 @@ class DataCollector:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        
+        # 비동기 크롤링 설정 (호스트당 초당 요청 수, 동시 요청 수, 디스크 응답 캐시)
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.response_cache = ResponseCache(cache_dir, ttl=cache_ttl) if cache_dir else None
+        
+        # 보도자료/PDF 발견 이력과 수집 상태 카탈로그
+        self.catalog = CrawlCatalog(catalog_path) if catalog_path else None
+    
+    def _list_params(self, page: int, rows: int) -> Dict:
+        return {
+            'publicDataPk': '15109325',
+            'page': page,
+            'rows': rows
+        }
+    
+    def _parse_releases(self, html: str) -> List[Dict]:
+        """목록 페이지 HTML에서 보도자료 정보를 추출합니다."""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # 보도자료 목록 추출 (실제 구조에 따라 수정 필요)
+        releases = []
+        
+        # 테이블이나 리스트에서 보도자료 정보 추출
+        # 실제 웹사이트 구조에 맞게 수정
+        items = soup.find_all('tr') or soup.find_all('li')
+        
+        for item in items:
+            try:
+                # 제목, 날짜, 링크 등 추출
+                title_elem = item.find('a') or item.find('h3') or item.find('td')
+                if title_elem:
+                    title = title_elem.get_text(strip=True)
+                    
+                    # 링크 추출
+                    link = title_elem.get('href') if title_elem.name == 'a' else None
+                    if link and not link.startswith('http'):
+                        link = self.base_url + link
+                    
+                    # 날짜 추출
+                    date_elem = item.find('span', class_='date') or item.find('td', class_='date')
+                    date = date_elem.get_text(strip=True) if date_elem else ""
+                    
+                    releases.append({
+                        'title': title,
+                        'date': date,
+                        'link': link,
+                        'source': '공공데이터포털'
+                    })
+                    
+            except Exception as e:
+                logger.warning(f"항목 파싱 실패: {e}")
+                continue
+        
+        return releases
+    
+    def _parse_pdf_links(self, html: str) -> List[str]:
+        """보도자료 페이지 HTML에서 PDF 링크들을 추출합니다."""
+        soup = BeautifulSoup(html, 'html.parser')
+        pdf_links = []
+        
+        # PDF 링크 찾기
+        for link in soup.find_all('a', href=True):
+            href = link['href']
+            if href.lower().endswith('.pdf'):
+                if not href.startswith('http'):
+                    href = self.base_url + href
+                pdf_links.append(href)
+        
+        return pdf_links
     
     def get_housing_policy_releases(self, page: int = 1, rows: int = 10) -> List[Dict]:
         """주택정책 보도자료 목록을 가져옵니다."""
         try:
-            # 공공데이터 포탈 API 엔드포인트
-            url = "https://www.data.go.kr/tcs/dss/selectApiDataDetailView.do"
-            params = {
-                'publicDataPk': '15109325',
-                'page': page,
-                'rows': rows
-            }
-            
-            response = self.session.get(url, params=params)
+            response = self.session.get(self.LIST_URL, params=self._list_params(page, rows))
             response.raise_for_status()
             
-            # HTML 파싱
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 보도자료 목록 추출 (실제 구조에 따라 수정 필요)
-            releases = []
-            
-            # 테이블이나 리스트에서 보도자료 정보 추출
-            # 실제 웹사이트 구조에 맞게 수정
-            items = soup.find_all('tr') or soup.find_all('li')
-            
-            for item in items:
-                try:
-                    # 제목, 날짜, 링크 등 추출
-                    title_elem = item.find('a') or item.find('h3') or item.find('td')
-                    if title_elem:
-                        title = title_elem.get_text(strip=True)
-                        
-                        # 링크 추출
-                        link = title_elem.get('href') if title_elem.name == 'a' else None
-                        if link and not link.startswith('http'):
-                            link = self.base_url + link
-                        
-                        # 날짜 추출
-                        date_elem = item.find('span', class_='date') or item.find('td', class_='date')
-                        date = date_elem.get_text(strip=True) if date_elem else ""
-                        
-                        releases.append({
-                            'title': title,
-                            'date': date,
-                            'link': link,
-                            'source': '공공데이터포털'
-                        })
-                        
-                except Exception as e:
-                    logger.warning(f"항목 파싱 실패: {e}")
-                    continue
-            
+            releases = self._parse_releases(response.text)
             logger.info(f"{len(releases)}개의 보도자료를 찾았습니다.")
             return releases
             
@@ -88,17 +125,7 @@ class DataCollector:
             response = self.session.get(release_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            pdf_links = []
-            
-            # PDF 링크 찾기
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href.lower().endswith('.pdf'):
-                    if not href.startswith('http'):
-                        href = self.base_url + href
-                    pdf_links.append(href)
-            
+            pdf_links = self._parse_pdf_links(response.text)
             logger.info(f"PDF 링크 {len(pdf_links)}개 발견")
             return pdf_links
             
@@ -106,37 +133,104 @@ class DataCollector:
             logger.error(f"PDF 링크 추출 실패: {e}")
             return []
     
-    def search_housing_policy_pdfs(self, keywords: List[str] = None) -> List[Dict]:
-        """주택정책 관련 PDF 파일들을 검색합니다."""
+    def search_housing_policy_pdfs(self, keywords: List[str] = None, max_pages: int = 5,
+                                   incremental: bool = True) -> List[Dict]:
+        """주택정책 관련 PDF 파일들을 검색합니다.
+        
+        asearch_housing_policy_pdfs를 새 이벤트 루프에서 실행합니다. 이미 실행 중인
+        이벤트 루프 안에서는 asearch_housing_policy_pdfs를 직접 await하세요.
+        """
+        return asyncio.run(self.asearch_housing_policy_pdfs(keywords, max_pages, incremental=incremental))
+    
+    async def asearch_housing_policy_pdfs(self, keywords: List[str] = None, max_pages: int = 5,
+                                          rows: int = 10, incremental: bool = True) -> List[Dict]:
+        """목록 페이지와 보도자료 페이지를 동시에 가져와 주택정책 관련 PDF 파일들을 검색합니다.
+        
+        목록 페이지는 max_concurrency개씩 묶어 요청하고, 빈 페이지가 나오면 이후 페이지는
+        요청하지 않습니다. 결과는 페이지·보도자료 순서를 유지하며 같은 PDF URL은 한 번만 포함됩니다.
+        
+        카탈로그가 있으면 발견한 보도자료와 PDF를 기록합니다. incremental이면 이미 아는
+        보도자료는 다시 가져오지 않고, 목록 페이지의 보도자료가 모두 이미 아는 것이면
+        그 묶음까지만 요청한 뒤 중단합니다. 이 경우 새로 발견한 PDF만 반환합니다.
+        """
+        incremental = incremental and self.catalog is not None
         if keywords is None:
             keywords = ['주택정책', '보도자료', '주택', '부동산', '정책']
         
-        all_pdfs = []
-        
         try:
-            # 여러 페이지에서 검색
-            for page in range(1, 6):  # 최대 5페이지
-                releases = self.get_housing_policy_releases(page=page)
+            async with AsyncCrawler(requests_per_second=self.requests_per_second,
+                                    max_concurrency=self.max_concurrency,
+                                    cache=self.response_cache,
+                                    headers=dict(self.session.headers)) as crawler:
                 
-                for release in releases:
-                    title = release.get('title', '').lower()
+                async def crawl_page(page: int) -> Tuple[bool, bool, List[Dict]]:
+                    """목록 페이지 하나를 처리하고 (목록 항목 존재 여부, 새 보도자료 존재 여부, PDF 목록)을 반환합니다."""
+                    html = await crawler.fetch(self.LIST_URL, params=self._list_params(page, rows))
+                    if html is None:
+                        return True, True, []
                     
                     # 키워드가 포함된 보도자료만 필터링
-                    if any(keyword in title for keyword in keywords):
-                        link = release.get('link')
-                        if link:
-                            pdf_links = self.get_pdf_links_from_release(link)
-                            
-                            for pdf_link in pdf_links:
-                                all_pdfs.append({
-                                    'title': release['title'],
-                                    'date': release['date'],
-                                    'pdf_url': pdf_link,
-                                    'source_url': link
-                                })
+                    listed = self._parse_releases(html)
+                    releases = [
+                        release for release in listed
+                        if release.get('link') and any(keyword in release.get('title', '').lower() for keyword in keywords)
+                    ]
+                    
+                    if incremental:
+                        # 이미 아는 보도자료는 최근 발견 시각만 갱신하고 다시 가져오지 않음
+                        known = self.catalog.known_releases(release['link'] for release in listed if release.get('link'))
+                        self.catalog.touch_releases(known)
+                        has_new = any(release.get('link') and release['link'] not in known for release in listed)
+                        releases = [release for release in releases if release['link'] not in known]
+                        
+                        # 키워드와 맞지 않는 보도자료도 PDF 없이 기록해 다음 크롤링의 중단 기준에 포함
+                        matched = {release['link'] for release in releases}
+                        for release in listed:
+                            link = release.get('link')
+                            if link and link not in known and link not in matched:
+                                self.catalog.record_release(release, [])
+                    else:
+                        has_new = True
+                    pages = await crawler.fetch_many([release['link'] for release in releases])
+                    
+                    pdfs = []
+                    for release, release_html in zip(releases, pages):
+                        if release_html is None:
+                            # 가져오지 못한 보도자료는 기록하지 않아 다음 크롤링에서 다시 시도
+                            continue
+                        pdf_links = self._parse_pdf_links(release_html)
+                        if self.catalog is not None:
+                            self.catalog.record_release(release, pdf_links)
+                        for pdf_link in pdf_links:
+                            pdfs.append({
+                                'title': release['title'],
+                                'date': release['date'],
+                                'pdf_url': pdf_link,
+                                'source_url': release['link']
+                            })
+                    return bool(listed), has_new, pdfs
+                
+                all_pdfs = []
+                seen = set()
+                for first in range(1, max_pages + 1, self.max_concurrency):
+                    batch = range(first, min(first + self.max_concurrency, max_pages + 1))
+                    results = await asyncio.gather(*(crawl_page(page) for page in batch))
+                    
+                    for _, _, pdfs in results:
+                        for pdf in pdfs:
+                            if pdf['pdf_url'] not in seen:
+                                seen.add(pdf['pdf_url'])
+                                all_pdfs.append(pdf)
+                    
+                    # 빈 목록 페이지가 나오면 마지막 페이지를 지난 것으로 보고 중단
+                    if not all(has_items for has_items, _, _ in results):
+                        break
+                    # 이미 수집한 보도자료에 도달하면 이후 페이지는 요청하지 않음
+                    if incremental and not all(has_new for _, has_new, _ in results):
+                        logger.info(f"이미 알고 있는 보도자료에 도달하여 {batch[-1]}페이지에서 크롤링을 중단합니다.")
+                        break
                 
-                # 요청 간격 조절
-                time.sleep(1)
+                logger.info(f"크롤링 통계: {crawler.stats}")
             
             logger.info(f"총 {len(all_pdfs)}개의 PDF 파일을 찾았습니다.")
             return all_pdfs
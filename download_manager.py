@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DownloadManager:
+    """연결 풀을 공유하며 PDF를 조건부/이어받기 방식으로 내려받는 클래스
+
+    파일은 내용 해시(SHA-256)를 이름으로 download_dir에 저장하고, URL별 ETag/Last-Modified와
+    저장 경로는 download_state.json에 기록합니다. 다시 받을 때는 조건부 GET을 보내 변경되지
+    않은 파일은 내려받지 않으며, 중단된 다운로드는 Range 요청으로 이어받습니다.
+    """
+
+    def __init__(self,
+                 download_dir: str = "pdfs",
+                 max_workers: int = 8,
+                 timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 chunk_size: int = 64 * 1024):
+
+        self.download_dir = download_dir
+        self.partial_dir = os.path.join(download_dir, "partial")
+        self.state_path = os.path.join(download_dir, "download_state.json")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+        # 호스트당 연결을 작업자 수만큼 재사용하고, 일시적 오류는 지수 백오프로 재시도
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"])
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self.state: Dict[str, Dict] = {}
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            if os.path.exists(self.state_path):
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f).get('urls', {})
+        except Exception as e:
+            logger.error(f"다운로드 상태 로드 실패: {e}")
+            self.state = {}
+
+    def _save_state(self):
+        """상태 파일을 임시 파일에 쓴 뒤 교체하여 원자적으로 저장합니다."""
+        try:
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'urls': self.state}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"다운로드 상태 저장 실패: {e}")
+
+    def _update_state(self, url: str, record: Optional[Dict]):
+        with self._lock:
+            if record is None:
+                self.state.pop(url, None)
+            else:
+                self.state[url] = record
+            self._save_state()
+
+    def _partial_paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.partial_dir, f"{key}.part"), os.path.join(self.partial_dir, f"{key}.json")
+
+    @staticmethod
+    def _display_name(url: str, response: requests.Response) -> str:
+        """Content-Disposition 또는 URL 경로에서 원래 파일 이름을 구합니다."""
+        disposition = response.headers.get('Content-Disposition', '')
+        match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)|filename=\"?([^\";]+)\"?", disposition)
+        if match:
+            name = unquote((match.group(1) or match.group(2)).strip())
+            # 헤더는 latin-1로 해석되므로 UTF-8 원문 이름을 복원
+            try:
+                return name.encode('latin-1').decode('utf-8')
+            except UnicodeError:
+                return name
+        name = os.path.basename(unquote(urlparse(url).path))
+        return name or "document.pdf"
+
+    def _result(self, url: str, status: str, record: Optional[Dict] = None, bytes_received: int = 0) -> Dict:
+        record = record or {}
+        return {
+            'url': url,
+            'status': status,
+            'path': record.get('path'),
+            'content_hash': record.get('content_hash'),
+            'filename': record.get('filename'),
+            'bytes_received': bytes_received
+        }
+
+    def download(self, url: str) -> Dict:
+        """URL을 내려받고 결과를 반환합니다.
+
+        status는 'downloaded', 'resumed', 'not_modified', 'failed' 중 하나이며,
+        path/content_hash는 저장된 파일의 경로와 SHA-256 해시입니다.
+        """
+        with self._lock:
+            record = dict(self.state.get(url) or {})
+        if record and not os.path.exists(record.get('path', '')):
+            record = {}
+
+        part_path, part_meta_path = self._partial_paths(url)
+        try:
+            headers = {}
+            if record.get('etag'):
+                headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                headers['If-Modified-Since'] = record['last_modified']
+
+            # 이어받기: 같은 검증자(ETag/Last-Modified)로 받던 부분 파일이 있으면 Range 요청
+            offset = 0
+            part_meta = self._read_json(part_meta_path)
+            validator = part_meta.get('etag') or part_meta.get('last_modified')
+            if os.path.exists(part_path) and validator:
+                offset = os.path.getsize(part_path)
+                if offset:
+                    headers['Range'] = f"bytes={offset}-"
+                    headers['If-Range'] = validator
+
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    logger.info(f"변경 없음 (304): {url}")
+                    return self._result(url, 'not_modified', record)
+                if response.status_code == 416 and offset:
+                    # 부분 파일이 서버 파일보다 크거나 같음: 처음부터 다시 받음
+                    self._remove(part_path, part_meta_path)
+                    return self.download(url)
+                response.raise_for_status()
+
+                resumed = response.status_code == 206 and offset > 0
+                if not resumed:
+                    offset = 0
+                self._write_json(part_meta_path, {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                })
+
+                # 이어받는 경우 기존 부분의 해시를 먼저 계산
+                digest = hashlib.sha256()
+                if resumed:
+                    with open(part_path, 'rb') as f:
+                        for block in iter(lambda: f.read(1024 * 1024), b''):
+                            digest.update(block)
+
+                received = 0
+                with open(part_path, 'ab' if resumed else 'wb') as f:
+                    for block in response.iter_content(chunk_size=self.chunk_size):
+                        if block:
+                            f.write(block)
+                            digest.update(block)
+                            received += len(block)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                content_hash = digest.hexdigest()
+                final_path = os.path.join(self.download_dir, f"{content_hash}.pdf")
+                if os.path.exists(final_path):
+                    os.remove(part_path)
+                else:
+                    os.replace(part_path, final_path)
+                self._remove(part_meta_path)
+
+                record = {
+                    'path': final_path,
+                    'content_hash': content_hash,
+                    'filename': self._display_name(url, response),
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+                self._update_state(url, record)
+
+            status = 'resumed' if resumed else 'downloaded'
+            logger.info(f"PDF 다운로드 완료 ({status}): {url} → {final_path}")
+            return self._result(url, status, record, received)
+
+        except Exception as e:
+            logger.error(f"PDF 다운로드 실패: {url} - {e}")
+            return self._result(url, 'failed')
+
+    def download_many(self, urls: List[str], max_workers: Optional[int] = None) -> List[Dict]:
+        """여러 URL을 동시에 내려받고 입력 순서대로 결과를 반환합니다."""
+        # 같은 URL을 동시에 받으면 부분 파일이 겹치므로 한 번만 요청
+        unique_urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as pool:
+            results = dict(zip(unique_urls, pool.map(self.download, unique_urls)))
+        return [dict(results[url]) for url in urls]
+
+    @staticmethod
+    def _read_json(path: str) -> Dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path: str, data: Dict):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    @staticmethod
+    def _remove(*paths: str):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """연결 풀을 닫습니다."""
+        self.session.close()
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import inspect
+import logging
+import numpy as np
+from typing import List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ONNX 변환 후 PyTorch 출력과 비교할 문장과 허용하는 최소 코사인 유사도
+_VALIDATION_TEXTS = [
+    "주택담보대출의 LTV 한도는 규제지역에서 70%입니다.",
+    "청년 전세자금 대출은 연 2.1% 금리로 지원된다.",
+    "무주택 세대주로서 소득 요건을 충족해야 합니다.",
+    "Housing supply measures for the metropolitan area.",
+]
+_MIN_COSINE = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+class SentenceTransformerEncoder:
+    """SentenceTransformer(PyTorch)로 임베딩하는 기본 백엔드
+
+    SentenceTransformer.encode는 이미 길이순으로 정렬해 배치를 만들므로 배치 크기와 스레드 수만 설정합니다.
+    """
+
+    backend_name = "torch"
+
+    def __init__(self, model_name: str, batch_size: int = 32, num_threads: Optional[int] = None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=show_progress_bar,
+                                 convert_to_numpy=True)
+
+class ONNXEncoder:
+    """SentenceTransformer 모델을 ONNX로 변환해 ONNX Runtime으로 임베딩하는 백엔드
+
+    처음 사용할 때 모델을 model_dir 아래에 ONNX로 내보내고(quantize이면 동적 int8 양자화 포함),
+    PyTorch 출력과 비교해 차이가 허용 범위를 넘으면 RuntimeError를 냅니다. 이후에는 저장된 파일과
+    토크나이저만 사용하므로 torch를 import하지 않습니다.
+    텍스트는 토큰 길이순으로 정렬해 배치로 묶고, 배치마다 가장 긴 텍스트 길이까지만 패딩합니다.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 model_dir: str = "onnx_models",
+                 quantize: bool = False,
+                 batch_size: int = 32,
+                 num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.backend_name = "onnx-int8" if quantize else "onnx"
+        self.batch_size = batch_size
+        self.export_dir = os.path.join(model_dir, re.sub(r'[^0-9A-Za-z._-]+', '_', model_name))
+
+        config_path = os.path.join(self.export_dir, "encoder.json")
+        model_path = os.path.join(self.export_dir, "model.int8.onnx" if quantize else "model.onnx")
+        if not (os.path.exists(config_path) and os.path.exists(model_path)):
+            self._export(model_path)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0이면 ONNX Runtime이 물리 코어 수에 맞춤
+        options.intra_op_num_threads = num_threads or 0
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(self.export_dir)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        logger.info(f"ONNX 임베딩 모델 로드: {model_path} (스레드 {options.intra_op_num_threads or '자동'})")
+
+    def _export(self, model_path: str):
+        """SentenceTransformer 모델을 ONNX로 내보내고 PyTorch 출력과 비교해 검증합니다."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"ONNX 변환 중: {self.model_name} → {model_path}")
+        os.makedirs(self.export_dir, exist_ok=True)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        modules = list(model)
+        pooling_config = modules[1].get_config_dict() if len(modules) > 1 else {}
+        if pooling_config.get('pooling_mode_cls_token'):
+            pooling = "cls"
+        elif pooling_config.get('pooling_mode_max_tokens'):
+            pooling = "max"
+        elif pooling_config.get('pooling_mode_mean_tokens', True):
+            pooling = "mean"
+        else:
+            raise ValueError(f"지원하지 않는 풀링 방식입니다: {pooling_config}")
+
+        dummy = model.tokenizer(_VALIDATION_TEXTS[:2], padding=True, return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+        class _LastHiddenState(torch.nn.Module):
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *inputs):
+                return self.transformer(**dict(zip(input_names, inputs)))[0]
+
+        fp32_path = os.path.join(self.export_dir, "model.onnx")
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        # torch 2.9부터 기본값인 dynamo 내보내기는 dynamic_axes를 받지 않으므로 기존 TorchScript 경로를 쓴다
+        export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                _LastHiddenState(modules[0].auto_model.eval()),
+                tuple(dummy[name] for name in input_names),
+                fp32_path + ".tmp",
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                **export_kwargs
+            )
+        os.replace(fp32_path + ".tmp", fp32_path)
+
+        if self.quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(fp32_path, model_path + ".tmp", weight_type=QuantType.QInt8)
+            os.replace(model_path + ".tmp", model_path)
+
+        model.tokenizer.save_pretrained(self.export_dir)
+        config = {
+            'model_name': self.model_name,
+            'pooling': pooling,
+            'normalize': any(type(module).__name__ == "Normalize" for module in modules),
+            'max_length': model.max_seq_length
+        }
+
+        # PyTorch 출력과 비교 (설정 파일은 검증을 통과한 뒤에만 기록)
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        self.config = config
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(self.export_dir)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        cosine = float(np.min(np.sum(
+            _normalize(self.encode(_VALIDATION_TEXTS)) * _normalize(model.encode(_VALIDATION_TEXTS)), axis=1
+        )))
+        if cosine < _MIN_COSINE[self.backend_name]:
+            os.remove(model_path)
+            raise RuntimeError(f"ONNX 출력이 PyTorch와 다릅니다 (최소 코사인 유사도 {cosine:.5f})")
+        logger.info(f"ONNX 변환 완료: PyTorch 대비 최소 코사인 유사도 {cosine:.5f}")
+
+        config_path = os.path.join(self.export_dir, "encoder.json")
+        with open(config_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False)
+        os.replace(config_path + ".tmp", config_path)
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config['pooling'] == "cls":
+            return hidden[:, 0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        if self.config['pooling'] == "max":
+            return np.where(mask > 0, hidden, -1e9).max(axis=1)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """텍스트들을 (텍스트 수, 차원) float32 배열로 임베딩합니다. 결과는 입력 순서를 따릅니다."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.config['max_length'])
+        lengths = np.array([len(ids) for ids in encoded['input_ids']])
+        # 긴 텍스트부터 묶어 배치 안의 패딩을 최소화
+        order = np.argsort(-lengths, kind="stable")
+
+        output = None
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad(
+                {name: [encoded[name][i] for i in indices] for name in encoded.keys()},
+                padding=True, return_tensors="np"
+            )
+            feeds = {name: batch[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            pooled = self._pool(hidden, batch['attention_mask'])
+            if output is None:
+                output = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            output[indices] = pooled
+            if show_progress_bar:
+                logger.info(f"임베딩 진행: {min(start + self.batch_size, len(order))}/{len(order)}")
+
+        return _normalize(output) if self.config['normalize'] else output
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def create_encoder(model_name: str,
+                   backend: str = "torch",
+                   batch_size: int = 32,
+                   num_threads: Optional[int] = None,
+                   model_dir: str = "onnx_models"):
+    """설정에 맞는 임베딩 추론 백엔드를 생성합니다. 모든 백엔드는 encode(texts, show_progress_bar)를 가집니다."""
+    if backend == "torch":
+        return SentenceTransformerEncoder(model_name, batch_size, num_threads)
+    if backend in ("onnx", "onnx-int8"):
+        return ONNXEncoder(model_name, model_dir, quantize=backend == "onnx-int8",
+                           batch_size=batch_size, num_threads=num_threads)
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend}")
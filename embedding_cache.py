@@ -0,0 +1,289 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+import numpy as np
+from typing import List, Dict, Optional
+
+from hashing import compute_text_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """(모델 이름, 텍스트 해시)를 키로 임베딩을 디스크에 보관하는 캐시 클래스
+
+    벡터는 메모리 매핑된 float32 배열에, 키와 슬롯 번호는 SQLite 인덱스에 저장합니다.
+    항목 수가 max_entries에 도달하면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    여러 프로세스가 같은 캐시 디렉터리를 쓸 수 있도록 슬롯 할당과 기록은 하나의 쓰기
+    트랜잭션(BEGIN IMMEDIATE) 안에서 수행하며, 슬롯은 항목 하나에만 속합니다(UNIQUE).
+    슬롯마다 키 태그를 함께 기록하고 읽은 뒤 다시 확인하므로, 조회와 읽기 사이에 다른 프로세스가
+    그 슬롯을 다른 항목에 재사용해도 엉뚱한 벡터를 돌려주지 않습니다.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 cache_dir: str = "embedding_cache",
+                 max_entries: int = 200000,
+                 evict_fraction: float = 0.1):
+
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.evict_fraction = evict_fraction
+        self.cache_dir = os.path.join(cache_dir, re.sub(r'[^0-9A-Za-z._-]+', '_', model_name))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.tags_path = os.path.join(self.cache_dir, "tags.u64")
+        self.hits = 0
+        self.misses = 0
+        self.dim: Optional[int] = None
+        self.vectors: Optional[np.memmap] = None
+        self.tags: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=30,
+                                    check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        # 한 번 쓰인 뒤 비워진 슬롯 (새 슬롯은 meta의 next_slot부터 할당)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+        # 이전 버전에서 여러 프로세스가 같은 슬롯을 받은 항목은 벡터를 믿을 수 없으므로 모두 제거
+        self.conn.execute("DELETE FROM entries WHERE slot IN "
+                          "(SELECT slot FROM entries GROUP BY slot HAVING COUNT(*) > 1)")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_slot ON entries(slot)")
+        # 용량이 줄어든 경우 범위를 벗어난 슬롯 정리
+        self.conn.execute("DELETE FROM entries WHERE slot >= ?", (max_entries,))
+        self.conn.execute("DELETE FROM free_slots WHERE slot >= ?", (max_entries,))
+        next_slot = self._get_next_slot()
+        if next_slot is None:
+            # 이전 버전 캐시: 마지막 슬롯까지의 빈 슬롯을 한 번만 찾아 기록
+            (max_slot,) = self.conn.execute("SELECT COALESCE(MAX(slot), -1) FROM entries").fetchone()
+            used = {slot for (slot,) in self.conn.execute("SELECT slot FROM entries")}
+            self.conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)",
+                                  [(slot,) for slot in range(max_slot + 1) if slot not in used])
+            self._set_next_slot(max_slot + 1)
+        elif next_slot > max_entries:
+            self._set_next_slot(max_entries)
+        self.conn.commit()
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row:
+            self._open_vectors(int(row[0]))
+
+    def _open_vectors(self, dim: int):
+        """벡터 파일을 메모리 매핑으로 엽니다. 없으면 용량만큼 새로 만듭니다."""
+        self.dim = dim
+        required_size = self.max_entries * dim * np.dtype(np.float32).itemsize
+        with open(self.vectors_path, 'ab') as f:
+            if f.tell() < required_size:
+                f.truncate(required_size)
+
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(self.max_entries, dim))
+
+        tags_size = self.max_entries * np.dtype(np.uint64).itemsize
+        with open(self.tags_path, 'ab') as f:
+            created = f.tell() == 0
+            if f.tell() < tags_size:
+                f.truncate(tags_size)
+        self.tags = np.memmap(self.tags_path, dtype=np.uint64, mode='r+', shape=(self.max_entries,))
+        if created:
+            # 태그 파일이 없던 이전 버전 캐시는 기록된 키로 태그를 채움
+            for key, slot in self.conn.execute("SELECT key, slot FROM entries"):
+                self.tags[slot] = self._tag(key)
+            self.tags.flush()
+
+    def _get_next_slot(self) -> Optional[int]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_slot'").fetchone()
+        return int(row[0]) if row else None
+
+    def _set_next_slot(self, value: int):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_slot', ?)", (str(value),))
+
+    @staticmethod
+    def _tag(key: str) -> np.uint64:
+        """슬롯에 함께 기록하는 키 태그 (0은 기록 중이거나 비어 있는 슬롯)"""
+        return np.uint64(int(key[:16], 16) or 1)
+
+    def _key(self, text: str) -> str:
+        return compute_text_hash(f"{self.model_name}\x00{text}")
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """텍스트들의 캐시된 임베딩을 반환합니다. 없는 항목은 None입니다."""
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        if not texts:
+            return results
+
+        with self._lock:
+            if self.vectors is None:
+                self.misses += len(texts)
+                return results
+
+            keys = [self._key(text) for text in texts]
+            slots = {}
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, slot in self.conn.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+                ):
+                    slots[key] = slot
+
+            hit_keys = []
+            for i, key in enumerate(keys):
+                slot = slots.get(key)
+                if slot is None:
+                    continue
+                # 읽기 전후의 태그가 모두 이 키와 같아야 다른 프로세스가 덮어쓰지 않은 벡터임
+                tag = self._tag(key)
+                if self.tags[slot] != tag:
+                    continue
+                vector = np.array(self.vectors[slot])
+                if self.tags[slot] == tag:
+                    results[i] = vector
+                    hit_keys.append(key)
+            if hit_keys:
+                now = time.time()
+                self.conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                      [(now, key) for key in hit_keys])
+                self.conn.commit()
+
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(texts) - hits
+
+        return results
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray):
+        """텍스트들의 임베딩을 캐시에 저장합니다."""
+        if not texts:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        try:
+            with self._lock:
+                # 다른 프로세스가 같은 빈 슬롯을 할당하지 않도록 조회부터 기록까지 쓰기 잠금을 잡음
+                if self.conn.in_transaction:
+                    self.conn.commit()
+                self.conn.execute("BEGIN IMMEDIATE")
+                if self.vectors is None:
+                    # 다른 프로세스가 먼저 차원을 기록했으면 그 파일을 사용
+                    row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+                    if row is None:
+                        self.conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)",
+                                          (str(embeddings.shape[1]),))
+                    self._open_vectors(int(row[0]) if row else embeddings.shape[1])
+
+                # 중복 텍스트 제거
+                unique = {}
+                for text, vector in zip(texts, embeddings):
+                    unique[self._key(text)] = vector
+                unique = dict(list(unique.items())[:self.max_entries])
+
+                existing = {}
+                keys = list(unique.keys())
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for key, slot in self.conn.execute(
+                        f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+                    ):
+                        existing[key] = slot
+
+                # 이미 있는 항목은 벡터를 다시 쓰지 않고 사용 시각만 갱신
+                new_keys = [key for key in keys if key not in existing]
+                free_slots = self._allocate_slots(len(new_keys), protected=set(existing))
+
+                # 태그를 먼저 지우고 벡터를 쓴 뒤 새 태그를 기록 (읽는 쪽은 태그가 다르면 미스로 처리)
+                assigned = list(zip(new_keys, free_slots))
+                for _, slot in assigned:
+                    self.tags[slot] = 0
+                self.tags.flush()
+                for key, slot in assigned:
+                    self.vectors[slot] = unique[key]
+                self.vectors.flush()
+                for key, slot in assigned:
+                    self.tags[slot] = self._tag(key)
+                self.tags.flush()
+
+                now = time.time()
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for key, slot in list(existing.items()) + assigned]
+                )
+                self.conn.commit()
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            logger.error(f"임베딩 캐시 저장 실패: {e}")
+
+    def _allocate_slots(self, count: int, protected: set) -> List[int]:
+        """비어 있는 슬롯을 할당하고, 부족하면 오래된 항목을 제거하여 확보합니다. 쓰기 트랜잭션 안에서 호출합니다.
+
+        비워진 슬롯 목록, 아직 쓰지 않은 슬롯, last_used 인덱스 순서로 찾으므로 캐시가 가득 차도
+        용량 전체를 훑지 않습니다.
+        """
+        if count == 0:
+            return []
+
+        free = [slot for (slot,) in self.conn.execute("SELECT slot FROM free_slots LIMIT ?", (count,))]
+        self.conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in free])
+
+        next_slot = self._get_next_slot() or 0
+        if len(free) < count and next_slot < self.max_entries:
+            end = min(self.max_entries, next_slot + count - len(free))
+            free.extend(range(next_slot, end))
+            self._set_next_slot(end)
+
+        if len(free) < count:
+            evict_count = max(count - len(free), int(self.max_entries * self.evict_fraction))
+            victims = []
+            for key, slot in self.conn.execute(
+                "SELECT key, slot FROM entries ORDER BY last_used ASC LIMIT ?", (evict_count + len(protected),)
+            ):
+                if key in protected:
+                    continue
+                victims.append((key, slot))
+                if len(victims) >= evict_count:
+                    break
+
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+            needed = count - len(free)
+            free.extend(slot for _, slot in victims[:needed])
+            # 이번에 쓰지 않는 슬롯은 다음 할당을 위해 남겨 둠
+            self.conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)",
+                                  [(slot,) for _, slot in victims[needed:]])
+            logger.info(f"임베딩 캐시에서 {len(victims)}개 항목을 제거했습니다.")
+
+        return free[:count]
+
+    def get_stats(self) -> Dict:
+        """캐시 적중/실패 통계를 반환합니다."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'cache_dir': self.cache_dir
+            }
+
+    def clear(self):
+        """캐시의 모든 항목을 삭제합니다."""
+        with self._lock:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM free_slots")
+            self._set_next_slot(0)
+            self.conn.commit()
+            self.hits = 0
+            self.misses = 0
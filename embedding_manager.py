@@ -1,13 +1,18 @@
 import os
 import json
+import threading
 import numpy as np
 from typing import List, Dict, Optional, Tuple
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
 import logging
 from datetime import datetime
 
+import metrics
+from hashing import make_chunk_ids
+from embedding_cache import EmbeddingCache
+from lru_cache import LRUCache
+from vector_store import create_vector_store
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -17,48 +22,220 @@ class EmbeddingManager:
     def __init__(self, 
                  model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
                  db_path: str = "chroma_db",
-                 collection_name: str = "housing_policy_docs"):
+                 collection_name: str = "housing_policy_docs",
+                 cache_dir: Optional[str] = "embedding_cache",
+                 cache_max_entries: int = 200000,
+                 query_cache_size: int = 1024,
+                 query_cache_ttl: Optional[float] = 600.0,
+                 index_backend: Optional[str] = None,
+                 index_options: Optional[Dict] = None,
+                 enable_lexical_index: bool = True,
+                 search_mode: Optional[str] = None,
+                 inference_backend: Optional[str] = None,
+                 service_socket: Optional[str] = None):
         
         self.model_name = model_name
+        self.inference_backend = inference_backend or os.getenv("EMBEDDING_BACKEND", "torch")
+        self.service_socket = service_socket or os.getenv("EMBEDDING_SERVICE_SOCKET")
         self.db_path = db_path
         self.collection_name = collection_name
+        self.index_backend = index_backend or os.getenv("VECTOR_BACKEND", "chroma")
+        self.search_mode = search_mode or os.getenv("SEARCH_MODE", "dense")
+        
+        # 디스크 임베딩 캐시 (cache_dir이 None이면 사용하지 않음)
+        # 모델을 로드하기 전에는 요청한 백엔드의 캐시를 쓰고, 실제로 로드된 백엔드가 다르면
+        # (ONNX 로드 실패로 PyTorch 사용, 다른 백엔드의 임베딩 서비스 등) 그 백엔드의 캐시로 바꿈
+        self._cache_dir = cache_dir
+        self._cache_max_entries = cache_max_entries
+        self.embedding_cache = self._open_embedding_cache(self.inference_backend)
+        
+        # 쿼리 임베딩 및 검색 결과 메모리 캐시
+        self.query_embedding_cache = LRUCache(query_cache_size, query_cache_ttl)
+        self.search_cache = LRUCache(query_cache_size, query_cache_ttl)
+        
+        # Sentence Transformer 모델은 처음 임베딩이 필요할 때 로드 (warm_up()으로 미리 로드 가능)
+        self._embedding_model = None
+        self._model_lock = threading.Lock()
         
-        # Sentence Transformer 모델 로드
-        logger.info(f"임베딩 모델 로드 중: {model_name}")
-        self.embedding_model = SentenceTransformer(model_name)
+        # 벡터 저장소 백엔드 초기화 (chroma, faiss 또는 compact)
+        if index_options is None and self.index_backend == "faiss":
+            index_options = {"index_type": os.getenv("FAISS_INDEX_TYPE", "flat")}
+        elif index_options is None and self.index_backend == "compact":
+            index_options = {"quantization": os.getenv("VECTOR_QUANTIZATION", "int8"),
+                             "rescore_factor": int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))}
+        self.vector_store = create_vector_store(self.index_backend, db_path, collection_name,
+                                                **(index_options or {}))
         
-        # ChromaDB 클라이언트 초기화
-        self.client = chromadb.PersistentClient(
-            path=db_path,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        # BM25 어휘 색인 (하이브리드 검색용)
+        self.lexical_index = None
+        if enable_lexical_index:
+            self.lexical_index = LexicalIndex(os.path.join(db_path, "lexical", f"{collection_name}.npz"))
+            self._sync_lexical_index()
+    
+    @property
+    def embedding_model(self):
+        """임베딩 모델을 반환합니다. 처음 접근할 때 inference_backend에 맞는 추론 백엔드를 로드합니다.
         
-        # 컬렉션 가져오기 또는 생성
+        service_socket이 설정되어 있으면 모델을 로드하지 않고 공유 임베딩 서비스의 클라이언트를 사용하며,
+        서비스에 연결할 수 없으면 모델을 직접 로드합니다.
+        ONNX 백엔드를 만들 수 없으면(변환 실패, 패키지 없음 등) PyTorch 백엔드를 사용합니다.
+        """
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None and self.service_socket:
+                    from embedding_service import EmbeddingClient
+                    try:
+                        self._embedding_model = EmbeddingClient(self.service_socket, model_name=self.model_name)
+                        logger.info(f"임베딩 서비스 사용: {self.service_socket}")
+                    except Exception as e:
+                        logger.warning(f"임베딩 서비스에 연결할 수 없어 모델을 직접 로드합니다: {e}")
+                if self._embedding_model is None:
+                    from embedding_backends import create_encoder
+                    logger.info(f"임베딩 모델 로드 중: {self.model_name} ({self.inference_backend})")
+                    options = {
+                        "batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+                        "num_threads": int(os.getenv("EMBEDDING_THREADS", "0")) or None
+                    }
+                    try:
+                        model = create_encoder(self.model_name, self.inference_backend,
+                                               model_dir=os.getenv("ONNX_MODEL_DIR", "onnx_models"), **options)
+                    except Exception as e:
+                        if self.inference_backend == "torch":
+                            raise
+                        logger.error(f"{self.inference_backend} 백엔드 로드 실패, PyTorch를 사용합니다: {e}")
+                        model = create_encoder(self.model_name, "torch", **options)
+                    self._embedding_model = model
+                self._match_cache_backend(self._embedding_model)
+        return self._embedding_model
+    
+    @embedding_model.setter
+    def embedding_model(self, model):
+        self._embedding_model = model
+        self._match_cache_backend(model)
+    
+    def _cache_key(self, backend: str) -> str:
+        # int8 양자화 모델의 임베딩은 원래 모델과 조금 다르므로 캐시를 따로 사용
+        return f"{self.model_name}@{backend}" if backend == "onnx-int8" else self.model_name
+    
+    def _open_embedding_cache(self, backend: str) -> Optional[EmbeddingCache]:
+        if not self._cache_dir:
+            return None
+        return EmbeddingCache(self._cache_key(backend), self._cache_dir, self._cache_max_entries)
+    
+    def _match_cache_backend(self, model):
+        """로드된 모델의 백엔드(backend_name)와 캐시 이름 공간이 다르면 캐시를 바꿉니다."""
+        backend = getattr(model, 'backend_name', None)
+        if backend is None or self.embedding_cache is None:
+            return
+        if self.embedding_cache.model_name != self._cache_key(backend):
+            logger.info(f"임베딩 캐시를 실제 추론 백엔드({backend})에 맞춥니다.")
+            self.embedding_cache = self._open_embedding_cache(backend)
+    
+    @property
+    def model_loaded(self) -> bool:
+        return self._embedding_model is not None
+    
+    def warm_up(self):
+        """임베딩 모델을 로드하고 짧은 문장을 한 번 임베딩하여 첫 요청의 지연을 없앱니다."""
+        self.embedding_model.encode(["warm up"])
+    
+    def _sync_lexical_index(self):
+        """어휘 색인의 문서 수가 저장소와 다르면 저장소 내용으로 다시 만듭니다."""
         try:
-            self.collection = self.client.get_collection(name=collection_name)
-            logger.info(f"기존 컬렉션 로드: {collection_name}")
-        except:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"description": "주택정책 보도자료 임베딩"}
-            )
-            logger.info(f"새 컬렉션 생성: {collection_name}")
-    
-    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """텍스트 리스트를 임베딩합니다."""
+            count = self.vector_store.count()
+            if len(self.lexical_index) == count:
+                return
+            logger.info(f"어휘 색인 재구성 중: {count}개 문서")
+            self.lexical_index.clear()
+            for ids, documents in self.vector_store.iter_documents():
+                self.lexical_index.add(ids, documents)
+            self.lexical_index.persist()
+        except Exception as e:
+            logger.error(f"어휘 색인 재구성 실패: {e}")
+    
+    def encode_texts(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """텍스트들을 임베딩합니다. 캐시에 있는 텍스트는 모델을 거치지 않습니다."""
+        if self.embedding_cache is None:
+            return self.embedding_model.encode(texts, show_progress_bar=show_progress_bar)
+        
+        cache = self.embedding_cache
+        cached = cache.get_many(texts)
+        miss_indices = [i for i, vector in enumerate(cached) if vector is None]
+        
+        if miss_indices:
+            model = self.embedding_model
+            if self.embedding_cache is not cache:
+                # 모델을 로드하면서 캐시가 바뀜: 다른 백엔드의 임베딩이 섞이지 않도록 새 캐시로 다시 조회
+                return self.encode_texts(texts, show_progress_bar=show_progress_bar)
+            miss_texts = [texts[i] for i in miss_indices]
+            encoded = model.encode(miss_texts, show_progress_bar=show_progress_bar)
+            cache.put_many(miss_texts, encoded)
+            for i, vector in zip(miss_indices, encoded):
+                cached[i] = vector
+        
+        return np.vstack(cached).astype(np.float32) if cached else np.empty((0, 0), dtype=np.float32)
+    
+    def create_embeddings(self, texts: List[str]) -> np.ndarray:
+        """텍스트 리스트를 (문서 수, 차원) float32 배열로 임베딩합니다."""
         try:
-            embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
+            embeddings = np.ascontiguousarray(self.encode_texts(texts, show_progress_bar=True), dtype=np.float32)
             logger.info(f"{len(texts)}개 텍스트 임베딩 완료")
-            return embeddings.tolist()
+            return embeddings
         except Exception as e:
             logger.error(f"임베딩 생성 실패: {e}")
-            return []
+            return np.empty((0, 0), dtype=np.float32)
+    
+    def get_cache_stats(self) -> Dict:
+        """임베딩/쿼리/검색 캐시의 적중률 통계를 반환합니다."""
+        return {
+            "embedding_cache": self.embedding_cache.get_stats() if self.embedding_cache else {},
+            "query_embedding_cache": self.query_embedding_cache.get_stats(),
+            "search_cache": self.search_cache.get_stats()
+        }
+    
+    @property
+    def collection_version(self) -> int:
+        """컬렉션 버전을 반환합니다. 검색 결과 캐시와 답변 캐시의 키로 쓰입니다.
+        
+        저장소에 기록된 세대 번호를 그대로 쓰므로, 다른 프로세스(인덱싱 CLI, 다른 Streamlit 워커 등)가
+        컬렉션을 바꿔도 값이 달라집니다.
+        """
+        return self.vector_store.generation()
+    
+    def _on_collection_changed(self):
+        """컬렉션이 바뀌면 이전 버전의 검색 결과 캐시를 비웁니다."""
+        self.search_cache.clear()
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """쿼리를 임베딩합니다. 최근에 본 쿼리는 메모리 캐시를 사용합니다."""
+        return self.encode_queries([query])[0]
+    
+    def encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """여러 쿼리를 한 번의 모델 호출로 임베딩합니다. 캐시에 있는 쿼리는 제외합니다."""
+        embeddings = [self.query_embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(q for q, e in zip(queries, embeddings) if e is None))
+        
+        if missing:
+            with metrics.stage(metrics.QUERY_ENCODING, queries=len(missing)):
+                encoded = dict(zip(missing, self.embedding_model.encode(missing)))
+            for query, embedding in encoded.items():
+                self.query_embedding_cache.put(query, embedding)
+            embeddings = [e if e is not None else encoded[q] for q, e in zip(queries, embeddings)]
+        
+        return embeddings
     
     def add_documents(self, 
                      texts: List[str], 
                      metadata: Optional[List[Dict]] = None,
                      ids: Optional[List[str]] = None) -> bool:
-        """문서들을 벡터 데이터베이스에 추가합니다."""
+        """문서들을 벡터 데이터베이스에 추가합니다. 같은 ID의 문서는 덮어씁니다."""
+        return self.upsert_documents(texts, metadata, ids)
+    
+    def upsert_documents(self, 
+                        texts: List[str], 
+                        metadata: Optional[List[Dict]] = None,
+                        ids: Optional[List[str]] = None) -> bool:
+        """문서들을 벡터 데이터베이스에 추가하거나 갱신합니다."""
         try:
             if not texts:
                 logger.warning("추가할 텍스트가 없습니다.")
@@ -66,25 +243,23 @@ class EmbeddingManager:
             
             # 임베딩 생성
             embeddings = self.create_embeddings(texts)
-            if not embeddings:
+            if len(embeddings) == 0:
                 return False
             
-            # ID 생성
+            # ID 생성 (내용 기반이므로 재실행 시에도 동일)
             if ids is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                ids = [f"doc_{timestamp}_{i}" for i in range(len(texts))]
+                ids = make_chunk_ids(self.collection_name, texts)
             
             # 메타데이터 설정
             if metadata is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 metadata = [{"source": "housing_policy", "timestamp": timestamp} for _ in texts]
             
-            # 컬렉션에 추가
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadata,
-                ids=ids
-            )
+            # 컬렉션에 추가 또는 갱신
+            self.vector_store.upsert(ids, embeddings, texts, metadata)
+            if self.lexical_index is not None:
+                self.lexical_index.add(ids, texts)
+            self._on_collection_changed()
             
             logger.info(f"{len(texts)}개 문서를 벡터 데이터베이스에 추가했습니다.")
             return True
@@ -93,57 +268,193 @@ class EmbeddingManager:
             logger.error(f"문서 추가 실패: {e}")
             return False
     
+    def get_existing_ids(self, ids: List[str]) -> set:
+        """주어진 ID 중 컬렉션에 이미 존재하는 ID 집합을 반환합니다."""
+        try:
+            if not ids:
+                return set()
+            return self.vector_store.get_existing_ids(ids)
+        except Exception as e:
+            logger.error(f"문서 ID 조회 실패: {e}")
+            return set()
+    
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        """주어진 ID 중 컬렉션에 존재하는 문서의 메타데이터를 ID별로 반환합니다."""
+        try:
+            if not ids:
+                return {}
+            return self.vector_store.get_metadatas(ids)
+        except Exception as e:
+            logger.error(f"문서 메타데이터 조회 실패: {e}")
+            return {}
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """주어진 ID 중 컬렉션에 존재하는 문서의 저장된 임베딩을 ID별로 반환합니다. 다시 임베딩하지 않습니다."""
+        try:
+            if not ids:
+                return {}
+            return self.vector_store.get_embeddings(ids)
+        except Exception as e:
+            logger.error(f"문서 임베딩 조회 실패: {e}")
+            return {}
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> bool:
+        """문서들의 메타데이터만 갱신합니다. 다시 임베딩하지 않습니다."""
+        try:
+            if ids:
+                self.vector_store.update_metadatas(ids, metadatas)
+                self._on_collection_changed()
+                logger.info(f"{len(ids)}개 문서의 메타데이터를 갱신했습니다.")
+            return True
+        except Exception as e:
+            logger.error(f"메타데이터 갱신 실패: {e}")
+            return False
+    
+    def delete_documents(self, ids: List[str]) -> bool:
+        """주어진 ID의 문서들을 삭제합니다."""
+        try:
+            if ids:
+                self.vector_store.delete(ids)
+                if self.lexical_index is not None:
+                    self.lexical_index.remove(ids)
+                self._on_collection_changed()
+                logger.info(f"{len(ids)}개 문서를 삭제했습니다.")
+            return True
+        except Exception as e:
+            logger.error(f"문서 삭제 실패: {e}")
+            return False
+    
     def search_similar(self, 
                       query: str, 
                       n_results: int = 5,
-                      threshold: float = 0.5) -> List[Dict]:
+                      threshold: float = 0.5,
+                      mode: Optional[str] = None) -> List[Dict]:
         """쿼리와 유사한 문서들을 검색합니다."""
+        return self.search_many([query], n_results=n_results, threshold=threshold, mode=mode)[0]
+    
+    def search_many(self, 
+                    queries: List[str], 
+                    n_results: int = 5,
+                    threshold: float = 0.5,
+                    mode: Optional[str] = None) -> List[List[Dict]]:
+        """여러 쿼리를 한 번의 배치 임베딩과 한 번의 컬렉션 조회로 검색합니다.
+        
+        mode는 "dense"(벡터 검색) 또는 "hybrid"(BM25 + 벡터 검색, RRF 결합)이며,
+        지정하지 않으면 search_mode를 따릅니다. 결과는 입력 쿼리 순서대로 반환됩니다.
+        """
+        mode = mode or self.search_mode
+        if mode == "hybrid" and self.lexical_index is None:
+            mode = "dense"
+        
+        results_by_query: List[Optional[List[Dict]]] = [None] * len(queries)
         try:
-            # 쿼리 임베딩
-            query_embedding = self.embedding_model.encode([query])
-            
-            # 유사도 검색
-            results = self.collection.query(
-                query_embeddings=query_embedding.tolist(),
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
+            # 검색 결과 캐시 확인 (다른 프로세스가 컬렉션을 바꿨으면 버전이 달라 적중하지 않음)
+            version = self.collection_version
+            for i, query in enumerate(queries):
+                cached = self.search_cache.get((query, n_results, threshold, mode, version))
+                if cached is not None:
+                    results_by_query[i] = cached
             
-            # 결과 처리
-            similar_docs = []
-            if results['documents'] and results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
-                )):
-                    # 거리를 유사도로 변환 (ChromaDB는 거리를 반환하므로)
-                    similarity = 1 - distance
-                    
-                    if similarity >= threshold:
-                        similar_docs.append({
-                            'document': doc,
-                            'metadata': metadata,
-                            'similarity': similarity,
-                            'rank': i + 1
-                        })
+            pending = list(dict.fromkeys(q for q, r in zip(queries, results_by_query) if r is None))
+            if pending:
+                # 쿼리 임베딩 (배치)
+                query_embeddings = self.encode_queries(pending)
+                
+                # 유사도 검색 (한 번의 다중 쿼리)
+                with metrics.stage(metrics.VECTOR_SEARCH, queries=len(pending)):
+                    if mode == "hybrid":
+                        hits = self.vector_store.query(np.vstack(query_embeddings), n_results * 4)
+                    else:
+                        hits = self.vector_store.query(np.vstack(query_embeddings), n_results)
+                
+                found = {}
+                for query, embedding, query_hits in zip(pending, query_embeddings, hits):
+                    if mode == "hybrid":
+                        found[query] = self._hybrid_results(query, embedding, query_hits, n_results, threshold)
+                    else:
+                        found[query] = self._format_results(query_hits, threshold)
+                # 검색 중에 컬렉션이 바뀌었다면 캐시에 넣지 않음
+                if version == self.collection_version:
+                    for query in pending:
+                        self.search_cache.put((query, n_results, threshold, mode, version), found[query])
+                
+                results_by_query = [r if r is not None else found[q] for q, r in zip(queries, results_by_query)]
+                logger.info(f"검색 결과: {len(pending)}개 쿼리, {sum(len(found[q]) for q in pending)}개 문서 발견")
             
-            logger.info(f"검색 결과: {len(similar_docs)}개 문서 발견")
-            return similar_docs
+            return [[dict(doc) for doc in docs] for docs in results_by_query]
             
         except Exception as e:
             logger.error(f"검색 실패: {e}")
-            return []
+            return [[] for _ in queries]
+    
+    def _format_results(self, hits: List[Tuple[str, str, Dict, float]], threshold: float) -> List[Dict]:
+        """저장소 조회 결과를 유사도 기준으로 걸러 문서 목록으로 변환합니다."""
+        similar_docs = []
+        for i, (doc_id, doc, metadata, similarity) in enumerate(hits):
+            if similarity >= threshold:
+                similar_docs.append({
+                    'id': doc_id,
+                    'document': doc,
+                    'metadata': metadata,
+                    'similarity': similarity,
+                    'rank': i + 1
+                })
+        return similar_docs
+    
+    def _hybrid_results(self,
+                        query: str,
+                        query_embedding: np.ndarray,
+                        dense_hits: List[Tuple[str, str, Dict, float]],
+                        n_results: int,
+                        threshold: float) -> List[Dict]:
+        """벡터 검색 후보와 BM25 후보를 RRF로 합쳐 상위 n_results개를 반환합니다.
+        
+        키워드가 일치한 문서는 벡터 유사도가 임계값보다 낮아도 결과에 포함됩니다.
+        """
+        lexical_hits = self.lexical_index.search(query, top_k=n_results * 4)
+        lexical_scores = dict(lexical_hits)
+        
+        # 벡터 후보는 임계값을 넘는 것만 사용
+        candidates = {doc_id: (doc, metadata, similarity)
+                      for doc_id, doc, metadata, similarity in dense_hits if similarity >= threshold}
+        dense_ranking = list(candidates.keys())
+        lexical_ranking = [doc_id for doc_id, _ in lexical_hits]
+        
+        fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking])[:n_results]
+        
+        # 키워드로만 찾은 문서는 저장소에서 내용과 유사도를 가져옴
+        missing = [doc_id for doc_id, _ in fused if doc_id not in candidates]
+        if missing:
+            candidates.update(self.vector_store.get_by_ids(missing, query_embedding))
+        
+        similar_docs = []
+        for doc_id, fusion_score in fused:
+            if doc_id not in candidates:
+                continue
+            doc, metadata, similarity = candidates[doc_id]
+            similar_docs.append({
+                'id': doc_id,
+                'document': doc,
+                'metadata': metadata,
+                'similarity': similarity,
+                'lexical_score': lexical_scores.get(doc_id, 0.0),
+                'fusion_score': fusion_score,
+                'rank': len(similar_docs) + 1
+            })
+        return similar_docs
     
     def get_collection_info(self) -> Dict:
         """컬렉션 정보를 반환합니다."""
         try:
-            count = self.collection.count()
+            count = self.vector_store.count()
             return {
                 "collection_name": self.collection_name,
                 "document_count": count,
                 "model_name": self.model_name,
-                "db_path": self.db_path
+                "db_path": self.db_path,
+                "index_backend": self.index_backend,
+                "index_memory": self.vector_store.memory_usage() if hasattr(self.vector_store, 'memory_usage') else {},
+                "caches": self.get_cache_stats()
             }
         except Exception as e:
             logger.error(f"컬렉션 정보 조회 실패: {e}")
@@ -152,7 +463,10 @@ class EmbeddingManager:
     def delete_collection(self) -> bool:
         """컬렉션을 삭제합니다."""
         try:
-            self.client.delete_collection(name=self.collection_name)
+            self.vector_store.reset()
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
+            self._on_collection_changed()
             logger.info(f"컬렉션 삭제 완료: {self.collection_name}")
             return True
         except Exception as e:
@@ -166,15 +480,13 @@ class EmbeddingManager:
         """문서를 업데이트합니다."""
         try:
             # 새 임베딩 생성
-            new_embedding = self.embedding_model.encode([new_text])
+            new_embedding = self.encode_texts([new_text])
             
             # 업데이트
-            self.collection.update(
-                ids=[doc_id],
-                embeddings=new_embedding.tolist(),
-                documents=[new_text],
-                metadatas=[new_metadata] if new_metadata else None
-            )
+            self.vector_store.update(doc_id, new_embedding[0], new_text, new_metadata)
+            if self.lexical_index is not None:
+                self.lexical_index.add([doc_id], [new_text])
+            self._on_collection_changed()
             
             logger.info(f"문서 업데이트 완료: {doc_id}")
             return True
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+로컬 임베딩 서비스
+
+임베딩 모델을 한 프로세스에서 한 번만 로드하고 Unix 소켓으로 임베딩 요청을 받습니다.
+동시에 들어온 요청은 max_wait_ms 안에서 최대 max_batch_size개 텍스트까지 하나의 배치로 묶어 처리합니다.
+
+사용법:
+    python embedding_service.py --socket embedding.sock
+    EMBEDDING_SERVICE_SOCKET=embedding.sock python main.py
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import itertools
+import argparse
+import threading
+import socketserver
+import numpy as np
+from concurrent.futures import Future
+from typing import List, Dict, Callable, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 메시지 형식: [헤더 길이][JSON 헤더][본문 길이][본문], 길이는 4바이트 빅엔디언
+_LENGTH = struct.Struct("!I")
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("연결이 닫혔습니다.")
+        received += count
+    return buffer
+
+def send_message(sock: socket.socket, header: Dict, payload: bytes = b""):
+    data = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(data)) + data + _LENGTH.pack(len(payload)) + payload)
+
+def recv_message(sock: socket.socket) -> Tuple[Dict, bytearray]:
+    header = json.loads(_recv_exact(sock, _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))[0]))
+    payload = _recv_exact(sock, _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))[0])
+    return header, payload
+
+def _gather(parts: List[Future], future: Future):
+    """나눠 처리한 조각들이 모두 끝나면 결과를 순서대로 이어 붙여 future에 전달합니다."""
+    lock = threading.Lock()
+    remaining = [len(parts)]
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [part.exception() for part in parts if part.exception() is not None]
+        if errors:
+            future.set_exception(errors[0])
+        else:
+            future.set_result(np.concatenate([part.result() for part in parts]))
+
+    for part in parts:
+        part.add_done_callback(done)
+
+class MicroBatcher:
+    """동시에 들어온 임베딩 요청을 모아 한 번의 encode 호출로 처리하는 배처
+
+    첫 요청이 도착한 뒤 max_wait초가 지나거나 텍스트가 max_batch_size개 이상 모이면 배치를 실행합니다.
+    max_wait가 0이어도 이전 배치를 처리하는 동안 대기열에 쌓인 요청은 한 배치로 묶입니다.
+    같은 배치 안에서 중복된 텍스트는 한 번만 임베딩합니다.
+    max_batch_size보다 큰 요청은 max_batch_size개씩 나눠 처리하고, 나뉜 조각보다 작은 요청을 먼저 꺼내므로
+    대량 적재 요청이 처리되는 동안에도 질의 임베딩은 조각 하나만큼만 기다립니다.
+    """
+
+    # 대기열 우선순위: 작은 요청 → 큰 요청의 조각 → 종료 신호
+    _REQUEST, _SLICE, _SHUTDOWN = 0, 1, 2
+
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 64,
+                 max_wait: float = 0.005):
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0, 'encoded': 0}
+        # (우선순위, 순번, 텍스트, Future, 요청의 첫 조각 여부), 같은 우선순위는 도착 순서대로
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        if len(texts) <= self.max_batch_size:
+            self._queue.put((self._REQUEST, next(self._sequence), texts, future, True))
+            return future
+
+        parts = []
+        for start in range(0, len(texts), self.max_batch_size):
+            part = Future()
+            parts.append(part)
+            self._queue.put((self._SLICE, next(self._sequence), texts[start:start + self.max_batch_size],
+                             part, start == 0))
+        _gather(parts, future)
+        return future
+
+    def _collect(self) -> Optional[List]:
+        first = self._queue.get()
+        if first[0] == self._SHUTDOWN:
+            return None
+        batch = [first]
+        count = len(first[2])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # 기한이 지나도 이전 배치를 처리하는 동안 쌓인 요청은 함께 처리
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == self._SHUTDOWN or count + len(item[2]) > self.max_batch_size:
+                # 종료 신호나 배치에 들어가지 않는 요청은 다음 배치로 (순번이 그대로라 순서는 유지됨)
+                self._queue.put(item)
+                break
+            batch.append(item)
+            count += len(item[2])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            try:
+                self._encode_batch(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"배치 임베딩 실패: {e}")
+                    batch[0][3].set_exception(e)
+                else:
+                    # 한 요청 때문에 함께 묶인 다른 클라이언트 요청까지 실패하지 않도록 요청별로 다시 시도
+                    logger.warning(f"배치 임베딩 실패, 요청별로 다시 시도합니다: {e}")
+                    for item in batch:
+                        try:
+                            self._encode_batch([item])
+                        except Exception as item_error:
+                            logger.error(f"요청 임베딩 실패: {item_error}")
+                            item[3].set_exception(item_error)
+
+            self.stats['requests'] += sum(1 for item in batch if item[4])
+            self.stats['texts'] += sum(len(item[2]) for item in batch)
+
+    def _encode_batch(self, batch: List):
+        """배치의 중복 텍스트를 한 번만 임베딩해 각 요청의 Future에 결과를 전달합니다.
+
+        결과는 모든 요청의 벡터를 만든 뒤에 전달하므로, 예외가 나면 어떤 Future에도 결과가 설정되지 않습니다.
+        """
+        texts = [text for _, _, request_texts, _, _ in batch for text in request_texts]
+        unique = list(dict.fromkeys(texts))
+        vectors = np.asarray(self.encode_fn(unique), dtype=np.float32) if unique else None
+        if vectors is not None and vectors.shape[0] != len(unique):
+            raise ValueError(f"임베딩 수가 텍스트 수와 다릅니다: {vectors.shape[0]} != {len(unique)}")
+
+        position = {text: i for i, text in enumerate(unique)}
+        dimension = vectors.shape[1] if vectors is not None else 0
+        results = [
+            vectors[[position[text] for text in request_texts]] if request_texts
+            else np.empty((0, dimension), dtype=np.float32)
+            for _, _, request_texts, _, _ in batch
+        ]
+        for (_, _, _, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        self.stats['batches'] += 1
+        self.stats['encoded'] += len(unique)
+
+    def close(self):
+        self._queue.put((self._SHUTDOWN, next(self._sequence), None, None, False))
+        self._thread.join()
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    """한 연결에서 오는 요청들을 차례로 처리합니다 (연결은 클라이언트 스레드마다 유지됨)."""
+
+    def handle(self):
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+
+            try:
+                if header.get('op') == 'info':
+                    send_message(self.request, self.server.info())
+                    continue
+                texts = header.get('texts')
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    send_message(self.request, {'error': "texts는 문자열 리스트여야 합니다."})
+                    continue
+                vectors = self.server.batcher.submit(texts).result()
+                send_message(self.request, {'shape': list(vectors.shape)}, vectors.tobytes())
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                send_message(self.request, {'error': str(e)})
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """임베딩 모델 하나를 여러 프로세스가 공유하도록 Unix 소켓으로 제공하는 서버"""
+
+    daemon_threads = True
+    # 여러 워커 프로세스/스레드가 동시에 연결할 수 있도록 대기열을 넉넉하게
+    request_queue_size = 128
+
+    def __init__(self,
+                 encoder,
+                 socket_path: str = "embedding.sock",
+                 model_name: str = "",
+                 backend: str = "",
+                 max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+
+        if os.path.exists(socket_path):
+            # 이미 실행 중인 서버가 있으면 소켓을 지우지 않음
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                raise RuntimeError(f"임베딩 서비스가 이미 실행 중입니다: {socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(socket_path)
+            finally:
+                probe.close()
+
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.backend = backend
+        self.batcher = MicroBatcher(encoder.encode, max_batch_size, max_wait_ms / 1000)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+    def info(self) -> Dict:
+        stats = dict(self.batcher.stats)
+        stats['mean_batch_size'] = round(stats['texts'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return {'model_name': self.model_name, 'backend': self.backend, 'stats': stats}
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+class EmbeddingClient:
+    """임베딩 서비스 클라이언트. 로컬 모델과 같은 encode(texts, show_progress_bar) 인터페이스를 가집니다.
+
+    스레드마다 연결을 하나씩 유지하므로 여러 스레드의 요청이 서버에서 한 배치로 묶일 수 있습니다.
+    model_name을 주면 서버의 모델과 다를 때 ValueError를 냅니다.
+    """
+
+    def __init__(self, socket_path: str, model_name: Optional[str] = None, timeout: float = 300.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        info = self.info()
+        if model_name is not None and info['model_name'] != model_name:
+            raise ValueError(f"임베딩 서비스의 모델({info['model_name']})이 요청한 모델({model_name})과 다릅니다.")
+        self.model_name = info['model_name']
+        self.backend_name = info['backend']
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, header: Dict) -> Tuple[Dict, bytearray]:
+        # 서버가 재시작되어 연결이 끊긴 경우 한 번 다시 연결
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, header)
+                response, payload = recv_message(sock)
+            except (ConnectionError, OSError):
+                self._disconnect()
+                if attempt:
+                    raise
+                continue
+            if 'error' in response:
+                raise RuntimeError(f"임베딩 서비스 오류: {response['error']}")
+            return response, payload
+
+    def info(self) -> Dict:
+        """서버의 모델 이름, 백엔드, 배치 통계를 반환합니다."""
+        return self._request({'op': 'info'})[0]
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        if len(texts) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        response, payload = self._request({'texts': list(texts)})
+        return np.frombuffer(payload, dtype=np.float32).reshape(response['shape'])
+
+def main():
+    from embedding_backends import create_encoder
+
+    parser = argparse.ArgumentParser(description="로컬 임베딩 서비스")
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVICE_SOCKET", "embedding.sock"))
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("EMBEDDING_THREADS", "0")))
+    parser.add_argument("--max-batch-size", type=int, default=64, help="한 배치로 묶을 최대 텍스트 수")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="배치를 모으기 위해 기다리는 최대 시간")
+    args = parser.parse_args()
+
+    encoder = create_encoder(args.model, args.backend, batch_size=args.batch_size,
+                             num_threads=args.threads or None,
+                             model_dir=os.getenv("ONNX_MODEL_DIR", "onnx_models"))
+    encoder.encode(["warm up"])
+
+    # 클라이언트가 캐시 이름 공간을 고를 수 있도록 실제로 로드된 백엔드를 알림
+    server = EmbeddingServer(encoder, args.socket, args.model, encoder.backend_name,
+                             args.max_batch_size, args.max_wait_ms)
+    logger.info(f"임베딩 서비스 시작: {args.socket} ({args.model}, {encoder.backend_name})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info("임베딩 서비스 종료")
+
+if __name__ == "__main__":
+    main()
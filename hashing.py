@@ -0,0 +1,42 @@
+import hashlib
+from typing import List, Dict
+
+def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """파일 내용의 SHA-256 해시를 계산합니다."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def compute_bytes_hash(data: bytes) -> str:
+    """바이트 데이터의 SHA-256 해시를 계산합니다."""
+    return hashlib.sha256(data).hexdigest()
+
+def compute_text_hash(text: str) -> str:
+    """텍스트의 SHA-256 해시를 계산합니다."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ChunkIdAssigner:
+    """청크를 순서대로 받아 make_chunk_ids와 같은 ID를 하나씩 부여하는 클래스 (스트리밍 수집용)"""
+
+    def __init__(self, doc_key: str):
+        self.doc_key = doc_key
+        self._seen: Dict[str, int] = {}
+
+    def assign(self, chunk: str) -> str:
+        """다음 청크의 ID를 반환합니다."""
+        chunk_hash = compute_text_hash(chunk)
+        occurrence = self._seen.get(chunk_hash, 0)
+        self._seen[chunk_hash] = occurrence + 1
+        key = f"{self.doc_key}\x00{chunk_hash}\x00{occurrence}"
+        return "chunk_" + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def make_chunk_ids(doc_key: str, chunks: List[str]) -> List[str]:
+    """문서 키와 청크 내용으로부터 결정적인 청크 ID를 생성합니다.
+
+    같은 문서 안에 동일한 청크가 여러 번 나오면 등장 순번을 붙여 구분하므로,
+    내용이 바뀌지 않은 청크는 재수집 시에도 항상 같은 ID를 갖습니다.
+    """
+    assigner = ChunkIdAssigner(doc_key)
+    return [assigner.assign(chunk) for chunk in chunks]
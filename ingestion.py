@@ -0,0 +1,301 @@
+import os
+import json
+import logging
+import threading
+from typing import List, Dict, Optional
+from datetime import datetime
+
+from hashing import compute_text_hash, make_chunk_ids, ChunkIdAssigner
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IngestionManifest:
+    """문서별 내용 해시와 청크 ID를 기록하는 수집 매니페스트 클래스
+
+    여러 세션의 스레드가 같은 매니페스트를 함께 쓰므로 읽기, 기록, 저장은 잠금 안에서 수행합니다.
+    """
+
+    def __init__(self, manifest_path: str = "ingestion_manifest.json"):
+        self.manifest_path = manifest_path
+        self.documents: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """매니페스트 파일을 로드합니다."""
+        with self._lock:
+            try:
+                if os.path.exists(self.manifest_path):
+                    with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                        self.documents = json.load(f).get('documents', {})
+                    logger.info(f"수집 매니페스트 로드: {len(self.documents)}개 문서")
+            except Exception as e:
+                logger.error(f"수집 매니페스트 로드 실패: {e}")
+                self.documents = {}
+
+    def save(self):
+        """매니페스트를 임시 파일에 쓴 뒤 교체하여 원자적으로 저장합니다."""
+        # 임시 파일 이름을 프로세스/스레드마다 달리해 동시에 저장해도 서로의 파일을 덮어쓰지 않음
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            directory = os.path.dirname(self.manifest_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with self._lock:
+                data = json.dumps({'documents': self.documents}, ensure_ascii=False, indent=2)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            logger.error(f"수집 매니페스트 저장 실패: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_document(self, doc_key: str) -> Optional[Dict]:
+        """문서의 매니페스트 항목을 반환합니다."""
+        with self._lock:
+            return self.documents.get(doc_key)
+
+    def record_document(self, doc_key: str, content_hash: str, chunk_ids: List[str], filename: str = ""):
+        """문서의 수집 결과를 기록합니다."""
+        with self._lock:
+            self.documents[doc_key] = {
+                'content_hash': content_hash,
+                'chunk_ids': chunk_ids,
+                'filename': filename,
+                'ingested_at': datetime.now().isoformat()
+            }
+
+    def remove_document(self, doc_key: str):
+        """문서를 매니페스트에서 제거합니다."""
+        with self._lock:
+            self.documents.pop(doc_key, None)
+
+    def clear(self):
+        """매니페스트를 초기화합니다."""
+        with self._lock:
+            self.documents = {}
+            self.save()
+
+class IncrementalIngestor:
+    """매니페스트를 이용해 새로 추가되거나 변경된 청크만 임베딩하는 클래스"""
+
+    def __init__(self, pdf_processor, embedding_manager, manifest: Optional[IngestionManifest] = None):
+        self.pdf_processor = pdf_processor
+        self.embedding_manager = embedding_manager
+        self.manifest = manifest or IngestionManifest(
+            os.path.join(embedding_manager.db_path, "ingestion_manifest.json")
+        )
+
+    def is_document_current(self, doc_key: str, content_hash: str) -> bool:
+        """문서가 변경되지 않았고 모든 청크가 데이터베이스에 있는지 확인합니다."""
+        record = self.manifest.get_document(doc_key)
+        if not record or record.get('content_hash') != content_hash:
+            return False
+
+        # 컬렉션이 재생성된 경우를 대비해 실제 저장 여부를 확인
+        chunk_ids = record.get('chunk_ids', [])
+        existing = self.embedding_manager.get_existing_ids(chunk_ids)
+        return len(existing) == len(chunk_ids)
+
+    def ingest_pdf(self, source, doc_key: str, extra_metadata: Optional[Dict] = None,
+                   batch_size: int = 256) -> Dict:
+        """PDF를 증분 수집합니다. 내용이 바뀌지 않은 문서는 건너뜁니다.
+
+        source는 파일 경로 또는 PDF 바이트/파일 객체이며, 한 번만 열어 해시, 메타데이터,
+        청크를 모두 얻습니다. 해시가 매니페스트와 같으면 PDF를 파싱하지 않고 건너뜁니다. 페이지를 스트리밍으로 읽어 청크가 batch_size개 모일 때마다
+        임베딩하므로, 큰 문서도 전체 텍스트를 메모리에 올리지 않습니다.
+        추출이나 임베딩이 중간에 실패하면 먼저 저장한 청크를 지우고 매니페스트를 갱신하지 않은 채 'failed'를
+        반환하므로 다음 수집에서 다시 시도합니다.
+        """
+        chunks = None
+        embedded_ids: List[str] = []
+        metadata_updates: Dict[str, Dict] = {}
+        try:
+            filename = (extra_metadata or {}).get('filename')
+            document = self.pdf_processor.process_document(
+                source, filename=filename, streaming=True,
+                is_unchanged=lambda content_hash: self.is_document_current(doc_key, content_hash)
+            )
+            content_hash = document['content_hash']
+            chunks = document['chunks']
+            if content_hash is None:
+                return self._result(doc_key, 'failed')
+
+            if document['unchanged']:
+                record = self.manifest.get_document(doc_key)
+                logger.info(f"변경 없는 문서 건너뜀: {doc_key}")
+                return self._result(doc_key, 'skipped', len(record['chunk_ids']))
+
+            # 메타데이터 추가
+            metadata = document['metadata']
+            metadata.update(extra_metadata or {})
+
+            # 텍스트 추출 및 청킹 (배치 단위로 임베딩)
+            assigner = ChunkIdAssigner(doc_key)
+            chunk_ids: List[str] = []
+            batch: List[Dict] = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    if not self._embed_batch(batch, assigner, metadata, chunk_ids, embedded_ids, metadata_updates):
+                        self._discard_partial(doc_key, embedded_ids)
+                        return self._result(doc_key, 'failed', len(chunk_ids))
+                    batch = []
+            if batch and not self._embed_batch(batch, assigner, metadata, chunk_ids, embedded_ids, metadata_updates):
+                self._discard_partial(doc_key, embedded_ids)
+                return self._result(doc_key, 'failed', len(chunk_ids))
+
+            if not chunk_ids:
+                logger.warning(f"PDF에서 텍스트를 추출할 수 없습니다: {doc_key}")
+                return self._result(doc_key, 'empty')
+
+            record = self.manifest.get_document(doc_key) or {}
+            return self.commit_plan({
+                'doc_key': doc_key,
+                'content_hash': content_hash,
+                'chunk_ids': chunk_ids,
+                'filename': metadata.get('filename', ''),
+                'ids': embedded_ids,
+                'updated_ids': list(metadata_updates.keys()),
+                'updated_metadatas': list(metadata_updates.values()),
+                'stale_ids': sorted(set(record.get('chunk_ids', [])) - set(chunk_ids))
+            })
+
+        except Exception as e:
+            logger.error(f"증분 수집 실패: {doc_key} - {e}")
+            self._discard_partial(doc_key, embedded_ids)
+            return self._result(doc_key, 'failed')
+        finally:
+            # 끝까지 읽지 않은 경우에도 파일을 닫도록 생성기 정리
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def _discard_partial(self, doc_key: str, embedded_ids: List[str]):
+        """실패한 수집에서 먼저 임베딩된 청크 중 매니페스트에 없는 것을 삭제합니다."""
+        record = self.manifest.get_document(doc_key) or {}
+        orphan_ids = sorted(set(embedded_ids) - set(record.get('chunk_ids', [])))
+        if orphan_ids:
+            self.embedding_manager.delete_documents(orphan_ids)
+
+    def _embed_batch(self, batch: List[Dict], assigner: ChunkIdAssigner, metadata: Dict,
+                     chunk_ids: List[str], embedded_ids: List[str], metadata_updates: Dict[str, Dict]) -> bool:
+        """스트리밍으로 받은 청크 배치 중 데이터베이스에 없는 것만 임베딩합니다.
+
+        이미 있는 청크 중 저장된 메타데이터(청크 번호, 페이지 등)가 달라진 것은 metadata_updates에 모아
+        커밋할 때 임베딩 없이 메타데이터만 갱신합니다.
+        """
+        start_index = len(chunk_ids)
+        ids = [assigner.assign(chunk['text']) for chunk in batch]
+        chunk_ids.extend(ids)
+        metadatas = [self._chunk_metadata(metadata, start_index + i, chunk['text'], chunk)
+                     for i, chunk in enumerate(batch)]
+
+        stored = self.embedding_manager.get_metadatas(ids)
+        metadata_updates.update(self._changed_metadata(ids, metadatas, stored))
+        new_indices = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+        if not new_indices:
+            return True
+
+        success = self.embedding_manager.upsert_documents(
+            texts=[batch[i]['text'] for i in new_indices],
+            metadata=[metadatas[i] for i in new_indices],
+            ids=[ids[i] for i in new_indices]
+        )
+        if not success:
+            logger.error(f"PDF 임베딩 실패: {assigner.doc_key}")
+            return False
+
+        embedded_ids.extend(ids[i] for i in new_indices)
+        return True
+
+    @staticmethod
+    def _changed_metadata(ids: List[str], metadatas: List[Dict], stored: Dict[str, Dict]) -> Dict[str, Dict]:
+        """저장된 청크 중 메타데이터가 새 버전과 다른 것의 {ID: 새 메타데이터}를 반환합니다."""
+        return {chunk_id: chunk_metadata for chunk_id, chunk_metadata in zip(ids, metadatas)
+                if chunk_id in stored and stored[chunk_id] != chunk_metadata}
+
+    @staticmethod
+    def _chunk_metadata(metadata: Dict, chunk_index: int, text: str, chunk: Optional[Dict] = None) -> Dict:
+        """문서 메타데이터에 청크 번호, 해시, 페이지 범위를 더합니다."""
+        chunk_metadata = {**metadata, 'chunk_index': chunk_index, 'chunk_hash': compute_text_hash(text)}
+        if chunk and chunk.get('page_start') is not None:
+            chunk_metadata['page_start'] = chunk['page_start']
+            chunk_metadata['page_end'] = chunk['page_end']
+        return chunk_metadata
+
+    def ingest_chunks(self, doc_key: str, content_hash: str, chunks: List, metadata: Dict) -> Dict:
+        """청크 중 데이터베이스에 없는 것만 임베딩하고, 사라진 청크는 삭제합니다."""
+        plan = self.plan_chunks(doc_key, content_hash, chunks, metadata)
+
+        if plan['texts']:
+            success = self.embedding_manager.upsert_documents(
+                texts=plan['texts'],
+                metadata=plan['metadatas'],
+                ids=plan['ids']
+            )
+            if not success:
+                logger.error(f"PDF 임베딩 실패: {doc_key}")
+                return self._result(doc_key, 'failed', len(chunks))
+
+        return self.commit_plan(plan)
+
+    def plan_chunks(self, doc_key: str, content_hash: str, chunks: List, metadata: Dict) -> Dict:
+        """임베딩이 필요한 청크와 삭제할 청크를 계산합니다.
+
+        chunks는 청크 문자열 또는 {'text', 'page_start', 'page_end'} 딕셔너리 목록입니다.
+        """
+        chunk_dicts = [chunk if isinstance(chunk, dict) else {'text': chunk} for chunk in chunks]
+        texts = [chunk['text'] for chunk in chunk_dicts]
+        chunk_ids = make_chunk_ids(doc_key, texts)
+        metadatas = [self._chunk_metadata(metadata, i, texts[i], chunk_dicts[i]) for i in range(len(texts))]
+        stored = self.embedding_manager.get_metadatas(chunk_ids)
+        updates = self._changed_metadata(chunk_ids, metadatas, stored)
+        new_indices = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in stored]
+
+        record = self.manifest.get_document(doc_key) or {}
+        stale_ids = sorted(set(record.get('chunk_ids', [])) - set(chunk_ids))
+
+        return {
+            'doc_key': doc_key,
+            'content_hash': content_hash,
+            'chunk_ids': chunk_ids,
+            'filename': metadata.get('filename', ''),
+            'texts': [texts[i] for i in new_indices],
+            'metadatas': [metadatas[i] for i in new_indices],
+            'ids': [chunk_ids[i] for i in new_indices],
+            'updated_ids': list(updates.keys()),
+            'updated_metadatas': list(updates.values()),
+            'stale_ids': stale_ids
+        }
+
+    def commit_plan(self, plan: Dict, save: bool = True) -> Dict:
+        """임베딩이 끝난 계획을 반영하여 재사용한 청크의 메타데이터를 갱신하고, 오래된 청크를 삭제하고,
+        매니페스트를 갱신합니다."""
+        doc_key = plan['doc_key']
+        updated_ids = plan.get('updated_ids', [])
+        if updated_ids and not self.embedding_manager.update_metadatas(updated_ids, plan['updated_metadatas']):
+            # 매니페스트를 갱신하지 않으므로 다음 수집에서 다시 시도
+            return self._result(doc_key, 'failed', len(plan['chunk_ids']))
+        if plan['stale_ids']:
+            self.embedding_manager.delete_documents(plan['stale_ids'])
+
+        self.manifest.record_document(doc_key, plan['content_hash'], plan['chunk_ids'], plan['filename'])
+        if save:
+            self.manifest.save()
+
+        num_chunks = len(plan['chunk_ids'])
+        logger.info(f"증분 수집 완료: {doc_key} (청크 {num_chunks}개, 신규 {len(plan['ids'])}개, "
+                    f"메타데이터 갱신 {len(updated_ids)}개, 삭제 {len(plan['stale_ids'])}개)")
+        return self._result(doc_key, 'ingested', num_chunks, len(plan['ids']), len(plan['stale_ids']))
+
+    def _result(self, doc_key: str, status: str, num_chunks: int = 0, embedded: int = 0, deleted: int = 0) -> Dict:
+        return {
+            'doc_key': doc_key,
+            'status': status,
+            'num_chunks': num_chunks,
+            'embedded': embedded,
+            'deleted': deleted
+        }
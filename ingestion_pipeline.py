@@ -0,0 +1,363 @@
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator, Tuple
+
+from pdf_processor import PDFProcessor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_SENTINEL = None
+
+def _extract_worker(conn, pdf_path: str, content_hash: str):
+    """별도 프로세스에서 PDF 텍스트를 추출하고 청킹합니다."""
+    try:
+        processor = PDFProcessor(download_dir=os.path.dirname(pdf_path) or ".")
+        # 파일을 한 번만 열어 청크(페이지 범위 포함)와 메타데이터를 함께 얻음
+        # (해시는 다운로드 단계에서 받는 동안 계산했으므로 다시 계산하지 않음)
+        document = processor.process_document(pdf_path, content_hash=content_hash)
+        if document['content_hash'] is None:
+            conn.send(('error', 'PDF를 열 수 없습니다.', {}))
+            return
+        conn.send(('ok', document['chunks'], document['metadata']))
+    except Exception as e:
+        conn.send(('error', str(e), {}))
+    finally:
+        conn.close()
+
+class StageStats:
+    """파이프라인 단계별 처리량을 집계하는 클래스"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, started: float, items: int = 1, failed: bool = False):
+        """단계 작업 하나의 처리 결과를 기록합니다."""
+        ended = time.monotonic()
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.items += items
+            self.busy_seconds += ended - started
+            self.first_start = started if self.first_start is None else min(self.first_start, started)
+            self.last_end = ended if self.last_end is None else max(self.last_end, ended)
+
+    def report(self) -> Dict:
+        """단계별 처리량 보고서를 반환합니다."""
+        elapsed = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'failures': self.failures,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_sec': round(self.items / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+def default_start_method() -> str:
+    """추출 프로세스의 기본 시작 방식: forkserver를 쓸 수 있으면 forkserver, 아니면 spawn"""
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_main_module_lock = threading.Lock()
+
+@contextmanager
+def _main_script_hidden():
+    """프로세스를 시작하는 동안 __main__ 스크립트 경로를 숨겨 자식이 스크립트를 다시 실행하지 않게 합니다.
+
+    spawn/forkserver 자식은 부모의 __main__ 파일을 다시 import하는데, Streamlit 앱처럼
+    `if __name__ == "__main__"` 보호 없이 실행되는 스크립트는 화면 코드 전체를 다시 실행합니다.
+    추출 작업자는 이 모듈의 함수만 쓰므로 __main__이 필요 없습니다.
+    (python -m으로 실행한 경우처럼 __spec__이 있으면 모듈 이름으로 import하므로 그대로 둡니다.)
+    """
+    main = sys.modules.get('__main__')
+    if getattr(main, '__spec__', None) is not None or getattr(main, '__file__', None) is None:
+        yield
+        return
+    with _main_module_lock:
+        main_file = main.__file__
+        del main.__file__
+        try:
+            yield
+        finally:
+            main.__file__ = main_file
+
+class ExtractionProcessPool:
+    """문서 하나당 프로세스 하나로 추출을 수행하며, 시간을 초과한 프로세스는 종료하는 풀
+
+    다운로드 스레드, torch, SQLite 연결 등을 가진 프로세스를 fork하면 상속한 잠금 때문에 자식이
+    멈출 수 있으므로 기본값은 forkserver(없으면 spawn)입니다. start_method로 바꿀 수 있습니다.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, start_method: Optional[str] = None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.context = multiprocessing.get_context(start_method or default_start_method())
+        if self.context.get_start_method() == "forkserver":
+            # 포크 서버가 추출 모듈을 미리 import해 두어 문서마다 다시 import하지 않도록 함
+            self.context.set_forkserver_preload(["ingestion_pipeline"])
+
+    def run(self, task_queue: queue.Queue, poll_interval: float = 0.05) -> Iterator[Tuple[Dict, str, object, Dict]]:
+        """큐의 작업들을 병렬로 처리하고 (작업, 상태, 결과, 메타데이터)를 완료 순서대로 반환합니다.
+
+        큐에서 _SENTINEL을 받으면 진행 중인 작업을 마저 처리한 뒤 종료합니다.
+        """
+        active = {}
+        exhausted = False
+
+        while active or not exhausted:
+            # 빈 슬롯 채우기 (진행 중인 작업이 있으면 기다리지 않음)
+            while not exhausted and len(active) < self.max_workers:
+                try:
+                    task = task_queue.get(block=not active)
+                except queue.Empty:
+                    break
+                if task is _SENTINEL:
+                    exhausted = True
+                    break
+                task['started'] = time.monotonic()
+                parent_conn, child_conn = self.context.Pipe(duplex=False)
+                process = self.context.Process(
+                    target=_extract_worker,
+                    args=(child_conn, task['pdf_path'], task['content_hash']),
+                    daemon=True
+                )
+                if self.context.get_start_method() == "fork":
+                    process.start()
+                else:
+                    with _main_script_hidden():
+                        process.start()
+                child_conn.close()
+                active[parent_conn] = (process, task, task['started'] + self.timeout)
+
+            if not active:
+                continue
+
+            next_deadline = min(deadline for _, _, deadline in active.values())
+            timeout = max(0.0, next_deadline - time.monotonic())
+            if not exhausted:
+                timeout = min(timeout, poll_interval)
+            ready = wait(list(active.keys()), timeout=timeout)
+
+            for conn in ready:
+                process, task, _ = active.pop(conn)
+                try:
+                    status, payload, metadata = conn.recv()
+                except EOFError:
+                    status, payload, metadata = 'error', '추출 프로세스가 비정상 종료되었습니다.', {}
+                conn.close()
+                process.join()
+                yield task, status, payload, metadata
+
+            # 제한 시간을 넘긴 추출 프로세스 종료
+            now = time.monotonic()
+            for conn in [c for c, (_, _, deadline) in active.items() if deadline <= now]:
+                process, task, _ = active.pop(conn)
+                process.terminate()
+                process.join()
+                conn.close()
+                yield task, 'timeout', f"{self.timeout}초 내에 추출이 끝나지 않았습니다.", {}
+
+class IngestionPipeline:
+    """다운로드 → 추출/청킹 → 임베딩 단계를 병렬 파이프라인으로 수행하는 클래스"""
+
+    def __init__(self,
+                 pdf_processor,
+                 embedding_manager,
+                 ingestor,
+                 download_workers: int = 8,
+                 extract_workers: Optional[int] = None,
+                 extract_timeout: float = 120.0,
+                 embed_batch_size: int = 256,
+                 extract_start_method: Optional[str] = None):
+
+        self.pdf_processor = pdf_processor
+        self.embedding_manager = embedding_manager
+        self.ingestor = ingestor
+        self.download_workers = download_workers
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.extract_timeout = extract_timeout
+        self.embed_batch_size = embed_batch_size
+        self.extract_start_method = extract_start_method
+
+    def run(self, pdf_urls: List[str]) -> Dict:
+        """PDF URL 목록을 파이프라인으로 수집하고 단계별 통계를 반환합니다."""
+        started = time.monotonic()
+        stats = {
+            'download': StageStats('download', self.download_workers),
+            'extract': StageStats('extract', self.extract_workers),
+            'embed': StageStats('embed', 1)
+        }
+        extract_queue: queue.Queue = queue.Queue()
+        embed_queue: queue.Queue = queue.Queue(maxsize=self.extract_workers * 4)
+        results: List[Dict] = []
+        results_lock = threading.Lock()
+
+        def add_result(result: Dict):
+            with results_lock:
+                results.append(result)
+
+        # 2단계: 프로세스 풀에서 추출 및 청킹
+        extractor = threading.Thread(
+            target=self._extract_stage,
+            args=(extract_queue, embed_queue, stats['extract'], add_result),
+            daemon=True
+        )
+        extractor.start()
+
+        # 1단계: 스레드 풀에서 다운로드 및 변경 여부 확인
+        downloader = threading.Thread(
+            target=self._run_downloads,
+            args=(pdf_urls, extract_queue, stats['download'], add_result),
+            daemon=True
+        )
+        downloader.start()
+
+        # 3단계: 여러 문서의 청크를 모아 배치 임베딩
+        self._embed_stage(embed_queue, stats['embed'], add_result)
+        downloader.join()
+        extractor.join()
+
+        report = self._build_report(results, stats, time.monotonic() - started)
+        logger.info(f"수집 파이프라인 완료: {report['summary']}")
+        return report
+
+    def _run_downloads(self, pdf_urls: List[str], extract_queue: queue.Queue,
+                       stats: StageStats, add_result):
+        try:
+            with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+                for url in dict.fromkeys(pdf_urls):
+                    pool.submit(self._download_stage, url, extract_queue, stats, add_result)
+        finally:
+            extract_queue.put(_SENTINEL)
+
+    def _download_stage(self, url: str, extract_queue: queue.Queue,
+                        stats: StageStats, add_result):
+        started = time.monotonic()
+        try:
+            # 조건부 GET으로 변경된 파일만 받고, 해시는 받는 동안 계산됨
+            download = self.pdf_processor.downloader.download(url)
+            if download['status'] == 'failed':
+                stats.record(started, failed=True)
+                add_result(self.ingestor._result(url, 'failed'))
+                return
+
+            pdf_path = download['path']
+            content_hash = download['content_hash']
+            filename = download['filename']
+            stats.record(started)
+
+            if self.ingestor.is_document_current(url, content_hash):
+                record = self.ingestor.manifest.get_document(url)
+                add_result(self.ingestor._result(url, 'skipped', len(record['chunk_ids'])))
+                return
+
+            extract_queue.put({
+                'doc_key': url,
+                'pdf_path': pdf_path,
+                'content_hash': content_hash,
+                'metadata': {'source_url': url, 'filename': filename}
+            })
+        except Exception as e:
+            logger.error(f"PDF 다운로드 단계 실패: {url} - {e}")
+            stats.record(started, failed=True)
+            add_result(self.ingestor._result(url, 'failed'))
+
+    def _extract_stage(self, extract_queue: queue.Queue, embed_queue: queue.Queue,
+                       stats: StageStats, add_result):
+        try:
+            pool = ExtractionProcessPool(self.extract_workers, self.extract_timeout, self.extract_start_method)
+            for task, status, payload, metadata in pool.run(extract_queue):
+                doc_key = task['doc_key']
+                if status != 'ok':
+                    logger.error(f"PDF 추출 실패 ({status}): {doc_key} - {payload}")
+                    stats.record(task['started'], failed=True)
+                    add_result(self.ingestor._result(doc_key, 'failed'))
+                    continue
+
+                stats.record(task['started'])
+                if not payload:
+                    logger.warning(f"PDF에서 텍스트를 추출할 수 없습니다: {doc_key}")
+                    add_result(self.ingestor._result(doc_key, 'empty'))
+                    continue
+
+                metadata.update(task['metadata'])
+                plan = self.ingestor.plan_chunks(doc_key, task['content_hash'], payload, metadata)
+                embed_queue.put(plan)
+        except Exception as e:
+            logger.error(f"PDF 추출 단계 실패: {e}")
+        finally:
+            embed_queue.put(_SENTINEL)
+
+    def _embed_stage(self, embed_queue: queue.Queue, stats: StageStats, add_result):
+        pending: List[Dict] = []
+        pending_chunks = 0
+
+        while True:
+            plan = embed_queue.get()
+            if plan is _SENTINEL:
+                break
+            pending.append(plan)
+            pending_chunks += len(plan['texts'])
+            if pending_chunks >= self.embed_batch_size:
+                self._flush(pending, stats, add_result)
+                pending, pending_chunks = [], 0
+
+        if pending:
+            self._flush(pending, stats, add_result)
+
+    def _flush(self, plans: List[Dict], stats: StageStats, add_result):
+        """여러 문서의 신규 청크를 한 번에 임베딩한 뒤 문서별로 반영합니다."""
+        started = time.monotonic()
+        texts = [text for plan in plans for text in plan['texts']]
+        success = True
+
+        if texts:
+            success = self.embedding_manager.upsert_documents(
+                texts=texts,
+                metadata=[meta for plan in plans for meta in plan['metadatas']],
+                ids=[chunk_id for plan in plans for chunk_id in plan['ids']]
+            )
+
+        if not success:
+            stats.record(started, failed=True)
+            for plan in plans:
+                add_result(self.ingestor._result(plan['doc_key'], 'failed', len(plan['chunk_ids'])))
+            return
+
+        stats.record(started, items=len(texts))
+        for plan in plans:
+            add_result(self.ingestor.commit_plan(plan, save=False))
+        self.ingestor.manifest.save()
+
+    def _build_report(self, results: List[Dict], stats: Dict[str, StageStats], wall_seconds: float) -> Dict:
+        counts = {'ingested': 0, 'skipped': 0, 'empty': 0, 'failed': 0}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+
+        return {
+            'results': results,
+            'summary': {
+                'documents': len(results),
+                **counts,
+                'chunks': sum(r['num_chunks'] for r in results if r['status'] in ('ingested', 'skipped')),
+                'embedded': sum(r['embedded'] for r in results),
+                'wall_seconds': round(wall_seconds, 3)
+            },
+            'stages': {name: stage.report() for name, stage in stats.items()}
+        }
@@ -0,0 +1,355 @@
+import os
+import re
+import json
+import time
+import atexit
+import logging
+import threading
+import numpy as np
+from array import array
+from collections import Counter
+from typing import List, Dict, Optional, Tuple, Iterable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 한글 연속 구간, 숫자(소수점/퍼센트 포함), 영문 단어
+_TOKEN_PATTERN = re.compile(r'[가-힣]+|\d+(?:[.,]\d+)*%?|[a-zA-Z]+')
+
+def tokenize(text: str) -> List[str]:
+    """텍스트를 검색 토큰으로 나눕니다.
+
+    한글은 음절 바이그램(한 글자 단어는 그대로), 영문은 소문자 단어, 숫자는 "70%"처럼
+    단위 기호를 붙인 채로 하나의 토큰이 됩니다. 숫자 토큰은 "%"를 뗀 형태도 함께 넣습니다.
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = match.group()
+        first = word[0]
+        if '가' <= first <= '힣':
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        elif first.isdigit():
+            tokens.append(word)
+            if word.endswith('%'):
+                tokens.append(word[:-1])
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+class LexicalIndex:
+    """BM25 점수를 계산하는 증분 역색인 클래스
+
+    게시 목록(posting list)은 압축 저장 시 CSR 형태(용어별 오프셋 + 연속된 uint32 문서 번호와
+    uint16 빈도 배열)로 보관하고, 이후 추가된 문서는 용어별 array 버퍼에 덧붙입니다.
+    삭제된 문서는 표시만 해 두었다가 압축할 때 제거합니다.
+    주기 저장은 백그라운드 스레드에서 수행하며, 잠금 안에서는 상태를 복사만 하고 압축과 파일
+    쓰기는 잠금 밖에서 하므로 저장하는 동안에도 수집(add)과 검색이 막히지 않습니다.
+    """
+
+    def __init__(self,
+                 index_path: Optional[str] = None,
+                 k1: float = 1.2,
+                 b: float = 0.75,
+                 min_idf: float = 0.01,
+                 persist_interval: float = 30.0):
+
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+        self.min_idf = min_idf
+        self.persist_interval = persist_interval
+        self._lock = threading.RLock()
+        self._persist_lock = threading.Lock()
+        self._persist_thread: Optional[threading.Thread] = None
+        self._last_persist = 0.0
+        self._dirty = False
+        # 변경할 때마다 증가하며, 저장하는 동안 색인이 바뀌었는지 확인하는 데 사용
+        self._version = 0
+        self._reset_state()
+
+        if index_path:
+            self.load()
+            atexit.register(self.persist)
+
+    def _reset_state(self):
+        # 문서 번호 ↔ 청크 ID
+        self.doc_keys: List[Optional[str]] = []
+        self.key_to_doc: Dict[str, int] = {}
+        self.doc_lengths = array('I')
+        self.deleted: set = set()
+        self.total_length = 0
+
+        # 압축된 게시 목록 (CSR)
+        self.base_terms: Dict[str, Tuple[int, int]] = {}
+        self.base_doc_ids = np.empty(0, dtype=np.uint32)
+        self.base_tfs = np.empty(0, dtype=np.uint16)
+
+        # 압축 이후 추가된 게시 목록
+        self.delta_postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_length_view: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.key_to_doc)
+
+    def add(self, keys: List[str], texts: List[str]):
+        """문서들을 색인에 추가합니다. 같은 키가 있으면 교체합니다."""
+        with self._lock:
+            self._remove_keys(keys)
+            for key, text in zip(keys, texts):
+                tokens = tokenize(text)
+                doc_id = len(self.doc_keys)
+                self.doc_keys.append(key)
+                self.key_to_doc[key] = doc_id
+                self.doc_lengths.append(len(tokens))
+                self.total_length += len(tokens)
+
+                for term, tf in Counter(tokens).items():
+                    postings = self.delta_postings.get(term)
+                    if postings is None:
+                        postings = (array('I'), array('H'))
+                        self.delta_postings[term] = postings
+                    postings[0].append(doc_id)
+                    postings[1].append(min(tf, 65535))
+
+            self._doc_length_view = None
+            self._maybe_persist()
+
+    def remove(self, keys: Iterable[str]):
+        """문서들을 색인에서 제거합니다."""
+        with self._lock:
+            self._remove_keys(keys)
+            self._maybe_persist()
+
+    def _remove_keys(self, keys: Iterable[str]):
+        for key in keys:
+            doc_id = self.key_to_doc.pop(key, None)
+            if doc_id is not None:
+                self.deleted.add(doc_id)
+                self.doc_keys[doc_id] = None
+                self.total_length -= self.doc_lengths[doc_id]
+
+    def clear(self):
+        """모든 문서를 삭제합니다."""
+        with self._lock:
+            self._reset_state()
+            self._maybe_persist()
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """용어의 게시 목록을 (문서 번호, 빈도) 배열로 반환합니다."""
+        parts_ids, parts_tfs = [], []
+        base = self.base_terms.get(term)
+        if base is not None:
+            offset, length = base
+            parts_ids.append(self.base_doc_ids[offset:offset + length])
+            parts_tfs.append(self.base_tfs[offset:offset + length])
+        delta = self.delta_postings.get(term)
+        if delta is not None:
+            parts_ids.append(np.frombuffer(delta[0], dtype=np.uint32))
+            parts_tfs.append(np.frombuffer(delta[1], dtype=np.uint16))
+
+        if not parts_ids:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_tfs[0]
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """BM25 점수가 높은 순서로 (청크 ID, 점수) 목록을 반환합니다."""
+        terms = set(tokenize(query))
+        with self._lock:
+            num_docs = len(self.key_to_doc)
+            if not terms or num_docs == 0:
+                return []
+
+            if self._doc_length_view is None:
+                self._doc_length_view = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float32)
+            doc_lengths = self._doc_length_view
+            avg_length = max(self.total_length / num_docs, 1.0)
+
+            scores = np.zeros(len(self.doc_keys), dtype=np.float32)
+            for term in terms:
+                doc_ids, tfs = self._postings(term)
+                if len(doc_ids) == 0:
+                    continue
+                df = len(doc_ids)
+                idf = np.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+                # 거의 모든 문서에 나오는 용어는 순위에 영향이 없으므로 건너뜀
+                if idf < self.min_idf:
+                    continue
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[doc_ids] / avg_length)
+                scores[doc_ids] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+            if self.deleted:
+                scores[list(self.deleted)] = 0.0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) == 0:
+                return []
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [(self.doc_keys[i], float(scores[i])) for i in candidates]
+
+    def _snapshot(self) -> Dict:
+        """압축과 저장에 필요한 상태를 복사합니다. 잠금 안에서 호출해야 합니다.
+
+        압축된 게시 목록은 교체만 되고 제자리에서 바뀌지 않으므로 참조만 보관합니다.
+        """
+        return {
+            'version': self._version,
+            'doc_keys': list(self.doc_keys),
+            'doc_lengths': np.frombuffer(self.doc_lengths, dtype=np.uint32).copy(),
+            'base_terms': self.base_terms,
+            'base_doc_ids': self.base_doc_ids,
+            'base_tfs': self.base_tfs,
+            'delta_postings': {
+                term: (np.frombuffer(doc_ids, dtype=np.uint32).copy(), np.frombuffer(tfs, dtype=np.uint16).copy())
+                for term, (doc_ids, tfs) in self.delta_postings.items()
+            }
+        }
+
+    @staticmethod
+    def _compact_snapshot(snapshot: Dict) -> Dict:
+        """복사한 상태에서 삭제된 문서를 제거하고 모든 게시 목록을 CSR 배열로 합칩니다."""
+        doc_keys = snapshot['doc_keys']
+        live = [doc_id for doc_id, key in enumerate(doc_keys) if key is not None]
+        remap = np.full(len(doc_keys), -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+
+        base_terms, delta_postings = snapshot['base_terms'], snapshot['delta_postings']
+        new_terms, id_parts, tf_parts = {}, [], []
+        offset = 0
+        for term in sorted(set(base_terms) | set(delta_postings)):
+            parts_ids, parts_tfs = [], []
+            if term in base_terms:
+                start, length = base_terms[term]
+                parts_ids.append(snapshot['base_doc_ids'][start:start + length])
+                parts_tfs.append(snapshot['base_tfs'][start:start + length])
+            if term in delta_postings:
+                parts_ids.append(delta_postings[term][0])
+                parts_tfs.append(delta_postings[term][1])
+            doc_ids, tfs = np.concatenate(parts_ids), np.concatenate(parts_tfs)
+            mapped = remap[doc_ids.astype(np.int64)]
+            keep = mapped >= 0
+            if not keep.any():
+                continue
+            id_parts.append(mapped[keep].astype(np.uint32))
+            tf_parts.append(tfs[keep])
+            new_terms[term] = (offset, int(keep.sum()))
+            offset += int(keep.sum())
+
+        return {
+            'version': snapshot['version'],
+            'base_terms': new_terms,
+            'base_doc_ids': np.concatenate(id_parts) if id_parts else np.empty(0, dtype=np.uint32),
+            'base_tfs': np.concatenate(tf_parts) if tf_parts else np.empty(0, dtype=np.uint16),
+            'doc_keys': [doc_keys[i] for i in live],
+            'doc_lengths': snapshot['doc_lengths'][live]
+        }
+
+    def _install(self, compacted: Dict):
+        """압축 결과로 메모리의 색인을 교체합니다. 잠금 안에서 호출해야 합니다."""
+        self.base_terms = compacted['base_terms']
+        self.base_doc_ids = compacted['base_doc_ids']
+        self.base_tfs = compacted['base_tfs']
+        self.delta_postings = {}
+        self.doc_keys = list(compacted['doc_keys'])
+        self.key_to_doc = {key: i for i, key in enumerate(self.doc_keys)}
+        self.doc_lengths = array('I', compacted['doc_lengths'].tobytes())
+        self.deleted = set()
+        self._doc_length_view = None
+
+    def compact(self):
+        """삭제된 문서를 제거하고 모든 게시 목록을 CSR 배열로 합칩니다."""
+        with self._lock:
+            self._install(self._compact_snapshot(self._snapshot()))
+
+    def _maybe_persist(self):
+        """변경을 기록하고, 마지막 저장 후 persist_interval이 지났으면 백그라운드에서 저장합니다."""
+        self._version += 1
+        self._dirty = True
+        if not self.index_path or time.monotonic() - self._last_persist < self.persist_interval:
+            return
+        if self._persist_thread is not None and self._persist_thread.is_alive():
+            return
+        self._last_persist = time.monotonic()
+        self._persist_thread = threading.Thread(target=self.persist, name="lexical-index-persist", daemon=True)
+        self._persist_thread.start()
+
+    def persist(self):
+        """색인을 압축한 상태로 디스크에 저장합니다.
+
+        저장하는 동안 색인이 바뀌지 않았으면 압축 결과를 메모리에도 반영하고,
+        바뀌었으면 저장한 시점 이후의 변경이 남아 있으므로 다음 저장 때 다시 저장합니다.
+        """
+        if not self.index_path:
+            return
+        with self._persist_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = self._snapshot()
+            try:
+                compacted = self._compact_snapshot(snapshot)
+                self._write(compacted)
+            except Exception as e:
+                logger.error(f"어휘 색인 저장 실패: {e}")
+                return
+            with self._lock:
+                self._last_persist = time.monotonic()
+                if self._version == snapshot['version']:
+                    self._install(compacted)
+                    self._dirty = False
+
+    def _write(self, compacted: Dict):
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        base_terms = compacted['base_terms']
+        terms = list(base_terms.keys())
+        tmp_path = self.index_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            doc_ids=compacted['base_doc_ids'],
+            tfs=compacted['base_tfs'],
+            term_offsets=np.array([base_terms[t] for t in terms], dtype=np.int64).reshape(-1, 2),
+            doc_lengths=compacted['doc_lengths'],
+            terms=np.array(json.dumps(terms, ensure_ascii=False)),
+            doc_keys=np.array(json.dumps(compacted['doc_keys'], ensure_ascii=False))
+        )
+        os.replace(tmp_path, self.index_path)
+
+    def load(self):
+        """디스크에 저장된 색인을 로드합니다."""
+        try:
+            if not self.index_path or not os.path.exists(self.index_path):
+                return
+            with np.load(self.index_path) as data:
+                terms = json.loads(str(data['terms']))
+                offsets = data['term_offsets']
+                self._reset_state()
+                self.base_doc_ids = data['doc_ids']
+                self.base_tfs = data['tfs']
+                self.base_terms = {term: (int(o), int(n)) for term, (o, n) in zip(terms, offsets)}
+                self.doc_keys = json.loads(str(data['doc_keys']))
+                self.doc_lengths = array('I', data['doc_lengths'].tolist())
+            self.key_to_doc = {key: i for i, key in enumerate(self.doc_keys)}
+            self.total_length = int(sum(self.doc_lengths))
+            self._last_persist = time.monotonic()
+            logger.info(f"어휘 색인 로드: {len(self.doc_keys)}개 문서, {len(terms)}개 용어")
+        except Exception as e:
+            logger.error(f"어휘 색인 로드 실패: {e}")
+            self._reset_state()
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """여러 순위 목록을 RRF(1 / (k + 순위))로 합쳐 점수가 높은 순서로 반환합니다."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
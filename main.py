@@ -5,15 +5,12 @@
 
 import os
 import sys
+import time
 import logging
-from typing import List, Dict
+import threading
+from typing import List, Dict, Callable
 from dotenv import load_dotenv
 
-from pdf_processor import PDFProcessor
-from embedding_manager import EmbeddingManager
-from rag_chatbot import RAGChatbot
-from data_collector import DataCollector
-
 # 환경변수 로드
 load_dotenv()
 
@@ -25,23 +22,130 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class HousingPolicyChatbot:
-    """주택정책 RAG 챗봇 메인 클래스"""
+    """주택정책 RAG 챗봇 메인 클래스
+    
+    구성 요소는 처음 사용할 때 만들어지며, 무거운 모듈(sentence_transformers, chromadb,
+    openai, bs4 등)도 그때 import됩니다. warm_up()으로 질의에 필요한 구성 요소를
+    백그라운드에서 미리 준비할 수 있습니다.
+    """
     
     def __init__(self):
-        self.pdf_processor = PDFProcessor()
-        self.embedding_manager = EmbeddingManager()
-        self.chatbot = RAGChatbot(self.embedding_manager)
-        self.data_collector = DataCollector()
+        self._components: Dict[str, object] = {}
+        self._lock = threading.RLock()
+        self._warm_up_thread = None
+    
+    def _component(self, name: str, factory: Callable[[], object]):
+        """구성 요소를 한 번만 생성하여 반환합니다."""
+        with self._lock:
+            if name not in self._components:
+                started = time.perf_counter()
+                self._components[name] = factory()
+                logger.info(f"{name} 초기화 완료 ({time.perf_counter() - started:.2f}초)")
+            return self._components[name]
+    
+    @property
+    def pdf_processor(self):
+        def create():
+            from pdf_processor import PDFProcessor
+            return PDFProcessor(download_workers=int(os.getenv("INGEST_DOWNLOAD_WORKERS", "8")))
+        return self._component('pdf_processor', create)
+    
+    @property
+    def embedding_manager(self):
+        from embedding_manager import EmbeddingManager
+        return self._component('embedding_manager', EmbeddingManager)
+    
+    @property
+    def chatbot(self):
+        def create():
+            from rag_chatbot import RAGChatbot
+            from answer_cache import create_answer_cache_from_env
+            return RAGChatbot(self.embedding_manager, answer_cache=create_answer_cache_from_env())
+        return self._component('chatbot', create)
+    
+    @property
+    def data_collector(self):
+        def create():
+            from data_collector import DataCollector
+            return DataCollector(
+                requests_per_second=float(os.getenv("CRAWL_REQUESTS_PER_SECOND", "2")),
+                max_concurrency=int(os.getenv("CRAWL_MAX_CONCURRENCY", "8")),
+                cache_ttl=float(os.getenv("CRAWL_CACHE_TTL", "3600"))
+            )
+        return self._component('data_collector', create)
+    
+    @property
+    def ingestor(self):
+        def create():
+            from ingestion import IncrementalIngestor
+            return IncrementalIngestor(self.pdf_processor, self.embedding_manager)
+        return self._component('ingestor', create)
+    
+    @property
+    def pipeline(self):
+        def create():
+            from ingestion_pipeline import IngestionPipeline
+            return IngestionPipeline(
+                self.pdf_processor,
+                self.embedding_manager,
+                self.ingestor,
+                download_workers=int(os.getenv("INGEST_DOWNLOAD_WORKERS", "8")),
+                extract_workers=int(os.getenv("INGEST_EXTRACT_WORKERS", "0")) or None,
+                extract_timeout=float(os.getenv("INGEST_EXTRACT_TIMEOUT", "120")),
+                embed_batch_size=int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256")),
+                extract_start_method=os.getenv("INGEST_START_METHOD") or None
+            )
+        return self._component('pipeline', create)
+    
+    def close(self):
+        """생성된 구성 요소의 스레드 풀과 연결을 닫습니다."""
+        with self._lock:
+            components = dict(self._components)
+        for name in ('chatbot', 'pdf_processor'):
+            if name in components:
+                components[name].close()
+    
+    def warm_up(self, background: bool = True):
+        """챗봇과 임베딩 모델을 미리 로드합니다. background이면 데몬 스레드에서 실행합니다."""
+        def run():
+            try:
+                started = time.perf_counter()
+                self.chatbot.warm_up()
+                logger.info(f"워밍업 완료 ({time.perf_counter() - started:.2f}초)")
+            except Exception as e:
+                logger.warning(f"워밍업 실패: {e}")
         
-        logger.info("주택정책 RAG 챗봇 초기화 완료")
+        if not background:
+            run()
+            return
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+            self._warm_up_thread.start()
     
     def setup_database(self, pdf_urls: List[str] = None):
         """PDF 데이터를 수집하고 벡터 데이터베이스를 구축합니다."""
         try:
+            catalog = self.data_collector.catalog
+            from_catalog = False
             if pdf_urls is None:
-                # 공공데이터 포탈에서 PDF 수집
+                # 공공데이터 포탈에서 새 보도자료만 크롤링하여 카탈로그에 기록
                 logger.info("공공데이터 포탈에서 PDF 수집 중...")
-                pdf_info = self.data_collector.search_housing_policy_pdfs()
+                pdf_info = self.data_collector.search_housing_policy_pdfs(
+                    max_pages=int(os.getenv("CRAWL_MAX_PAGES", "5"))
+                )
+                
+                if catalog is not None:
+                    if self.embedding_manager.get_collection_info().get('document_count') == 0:
+                        # 벡터 데이터베이스가 비었거나 초기화되었으면 카탈로그의 모든 PDF를 다시 수집
+                        logger.info("벡터 데이터베이스가 비어 있어 카탈로그의 모든 PDF를 다시 수집합니다.")
+                        catalog.reset_status()
+                    
+                    # 아직 수집하지 않은 PDF만 처리 (이전 실행에서 실패한 PDF 포함)
+                    pdf_info = catalog.pending_pdfs()
+                    from_catalog = True
+                    if not pdf_info and catalog.get_stats()['pdfs']:
+                        logger.info("새로 수집할 PDF가 없습니다. 데이터베이스가 최신 상태입니다.")
+                        return True
                 
                 if not pdf_info:
                     logger.warning("PDF를 찾을 수 없습니다. 샘플 데이터를 사용합니다.")
@@ -53,47 +157,21 @@ class HousingPolicyChatbot:
                 logger.error("처리할 PDF가 없습니다.")
                 return False
             
-            # PDF 다운로드 및 처리
-            processed_chunks = []
+            # 다운로드 → 추출/청킹 → 임베딩 파이프라인 실행
+            report = self.pipeline.run(pdf_urls)
+            summary = report['summary']
+            if from_catalog:
+                catalog.mark_ingested(report['results'])
             
-            for i, url in enumerate(pdf_urls):
-                try:
-                    logger.info(f"PDF 처리 중 ({i+1}/{len(pdf_urls)}): {url}")
-                    
-                    # PDF 다운로드
-                    filename = f"housing_policy_{i+1}.pdf"
-                    pdf_path = self.pdf_processor.download_pdf_from_url(url, filename)
-                    
-                    if pdf_path:
-                        # 텍스트 추출 및 청킹
-                        chunks = self.pdf_processor.process_pdf_file(pdf_path)
-                        
-                        # 메타데이터 추가
-                        metadata = self.pdf_processor.get_pdf_metadata(pdf_path)
-                        metadata['source_url'] = url
-                        metadata['filename'] = filename
-                        
-                        # 임베딩 데이터베이스에 추가
-                        if chunks:
-                            success = self.embedding_manager.add_documents(
-                                texts=chunks,
-                                metadata=[metadata] * len(chunks)
-                            )
-                            
-                            if success:
-                                processed_chunks.extend(chunks)
-                                logger.info(f"PDF 처리 완료: {len(chunks)}개 청크")
-                            else:
-                                logger.error(f"PDF 임베딩 실패: {filename}")
-                        else:
-                            logger.warning(f"PDF에서 텍스트를 추출할 수 없습니다: {filename}")
-                    
-                except Exception as e:
-                    logger.error(f"PDF 처리 실패: {url} - {e}")
-                    continue
+            for stage, stage_report in report['stages'].items():
+                logger.info(f"[{stage}] 작업자 {stage_report['workers']}개, "
+                            f"{stage_report['items']}건 처리, 실패 {stage_report['failures']}건, "
+                            f"{stage_report['throughput_per_sec']}건/초")
             
-            logger.info(f"총 {len(processed_chunks)}개 청크를 처리했습니다.")
-            return len(processed_chunks) > 0
+            logger.info(f"총 {summary['chunks']}개 청크를 처리했습니다. "
+                        f"(신규 임베딩 {summary['embedded']}개, 변경 없음 {summary['skipped']}개 문서, "
+                        f"실패 {summary['failed']}개 문서)")
+            return summary['chunks'] > 0
             
         except Exception as e:
             logger.error(f"데이터베이스 구축 실패: {e}")
@@ -137,11 +215,16 @@ class HousingPolicyChatbot:
                     print(f"대화 히스토리: {info['conversation_history_length']}개")
                     continue
                 
-                # 챗봇 응답
-                print("\n🤖 챗봇이 답변을 생성하는 중...")
-                result = self.chatbot.chat(user_input)
+                # 챗봇 응답 (토큰이 도착하는 대로 출력)
+                stream = self.chatbot.chat_stream(user_input)
+                print("\n답변: ", end="", flush=True)
+                for token in stream:
+                    print(token, end="", flush=True)
+                print()
                 
-                print(f"\n답변: {result['answer']}")
+                result = stream.result
+                if result['time_to_first_token'] is not None:
+                    logger.info(f"첫 토큰까지 {result['time_to_first_token']:.2f}초, 전체 {result['total_time']:.2f}초")
                 
                 # 관련 문서 정보 표시
                 if result['relevant_documents']:
@@ -172,11 +255,13 @@ class HousingPolicyChatbot:
         print("🎯 주택정책 RAG 챗봇 데모 모드")
         print("="*60)
         
-        for i, question in enumerate(demo_questions, 1):
+        # 질문들을 한 번에 검색하고 답변은 병렬로 생성
+        results = self.chatbot.chat_many(demo_questions)
+        
+        for i, (question, result) in enumerate(zip(demo_questions, results), 1):
             print(f"\n질문 {i}: {question}")
             print("-" * 40)
             
-            result = self.chatbot.chat(question)
             print(f"답변: {result['answer']}")
             
             if result['relevant_documents']:
@@ -186,6 +271,7 @@ class HousingPolicyChatbot:
 
 def main():
     """메인 함수"""
+    chatbot = None
     try:
         # API 키 확인
         openai_key = os.getenv("OPENAI_API_KEY")
@@ -214,7 +300,10 @@ def main():
                 chatbot.run_demo()
                 return
         
-        # 기본 모드: 데이터베이스 확인 후 대화 시작
+        # 기본 모드: 사용자가 질문을 입력하는 동안 모델을 백그라운드에서 로드
+        chatbot.warm_up()
+        
+        # 데이터베이스 확인 후 대화 시작
         collection_info = chatbot.embedding_manager.get_collection_info()
         doc_count = collection_info.get('document_count', 0)
         
@@ -232,6 +321,9 @@ def main():
     except Exception as e:
         logger.error(f"프로그램 실행 중 오류 발생: {e}")
         print(f"❌ 오류가 발생했습니다: {e}")
+    finally:
+        if chatbot is not None:
+            chatbot.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
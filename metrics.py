@@ -0,0 +1,367 @@
+"""
+요청 계측과 지표 내보내기
+
+RAGChatbot의 각 요청 단계(쿼리 임베딩, 벡터 검색, 컨텍스트 생성, LLM 호출)를 monotonic 시계로 측정해
+요청 결과의 timings에 담고, 카운터와 히스토그램을 Prometheus 텍스트 형식으로 내보냅니다.
+
+  - METRICS_ENABLED=1, METRICS_PORT, METRICS_FILE 중 하나라도 설정하면 지표 집계를 켭니다.
+  - METRICS_PORT를 주면 127.0.0.1:PORT/metrics 에서, METRICS_FILE을 주면 그 파일로
+    METRICS_FILE_INTERVAL초마다(그리고 종료 시) 내보냅니다.
+  - add_span_hook()으로 트레이싱 훅을 등록하면 단계마다 스팬이 열리고 닫힙니다.
+
+요청 밖에서 지표와 훅이 모두 꺼져 있으면 stage()는 아무 일도 하지 않는 공용 객체를 반환합니다.
+"""
+
+import os
+import time
+import atexit
+import bisect
+import logging
+import threading
+import contextvars
+from typing import List, Dict, Callable, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 단계 이름
+ANSWER_CACHE = "answer_cache"
+RETRIEVAL = "retrieval"
+QUERY_ENCODING = "query_encoding"
+VECTOR_SEARCH = "vector_search"
+CONTEXT_BUILDING = "context_building"
+LLM = "llm"
+
+# 초 단위 히스토그램 구간 (임베딩 캐시 적중부터 LLM 호출까지)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """레이블별로 단조 증가하는 값을 세는 카운터"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+class Histogram:
+    """레이블별 관측값 분포를 누적 구간으로 집계하는 히스토그램"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 레이블 → [구간별 개수..., +Inf 개수, 합계]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """지표를 이름으로 모아 Prometheus 텍스트 형식으로 내보내는 저장소"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """현재 지표를 파일에 원자적으로 기록합니다 (node_exporter textfile 수집기 등에서 사용)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(path + ".tmp", path)
+
+REGISTRY = MetricsRegistry()
+REQUESTS = REGISTRY.counter("rag_requests_total", "처리한 챗봇 요청 수", ("endpoint", "outcome"))
+REQUEST_SECONDS = REGISTRY.histogram("rag_request_duration_seconds", "챗봇 요청 전체 처리 시간", ("endpoint",))
+STAGE_SECONDS = REGISTRY.histogram("rag_stage_duration_seconds", "요청 단계별 처리 시간", ("stage",))
+LLM_TOKENS = REGISTRY.counter("rag_llm_tokens_total", "OpenAI 응답의 토큰 사용량", ("model", "type"))
+
+_enabled = (os.getenv("METRICS_ENABLED", "0") == "1"
+            or bool(os.getenv("METRICS_PORT")) or bool(os.getenv("METRICS_FILE")))
+_span_hooks: List[Callable] = []
+_current_request: contextvars.ContextVar = contextvars.ContextVar("rag_current_request", default=None)
+
+def enable(enabled: bool = True):
+    """지표 집계를 켜거나 끕니다. 꺼져 있어도 요청 결과의 timings는 채워집니다."""
+    global _enabled
+    _enabled = enabled
+
+def is_enabled() -> bool:
+    return _enabled
+
+def add_span_hook(hook: Callable):
+    """단계마다 호출할 트레이싱 훅을 등록합니다.
+
+    hook(name, attributes)는 컨텍스트 관리자를 반환해야 하며, 단계가 시작될 때 들어가고 끝날 때 나옵니다.
+    예: add_span_hook(lambda name, attributes: tracer.start_as_current_span(name, attributes=attributes))
+    """
+    _span_hooks.append(hook)
+
+def remove_span_hook(hook: Callable):
+    if hook in _span_hooks:
+        _span_hooks.remove(hook)
+
+class RequestMetrics:
+    """요청 하나의 단계별 시간(초)과 토큰 사용량"""
+
+    __slots__ = ("endpoint", "outcome", "timings", "usage", "started")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outcome = "ok"
+        self.timings: Dict[str, float] = {}
+        self.usage: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def add_time(self, name: str, seconds: float):
+        # 같은 단계가 여러 번 실행되면(예: 캐시 확인과 검색의 쿼리 임베딩) 합산
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def add_usage(self, usage: Dict[str, int]):
+        for key, value in usage.items():
+            self.usage[key] = self.usage.get(key, 0) + value
+
+    def finish(self) -> float:
+        """전체 시간을 기록하고 요청 지표를 갱신합니다. 요청이 끝났을 때 한 번 호출합니다."""
+        total = time.perf_counter() - self.started
+        self.timings['total'] = total
+        if _enabled:
+            REQUESTS.inc(endpoint=self.endpoint, outcome=self.outcome)
+            REQUEST_SECONDS.observe(total, endpoint=self.endpoint)
+        return total
+
+class _RequestScope:
+    __slots__ = ("request", "_token")
+
+    def __init__(self, request: RequestMetrics):
+        self.request = request
+
+    def __enter__(self) -> RequestMetrics:
+        self._token = _current_request.set(self.request)
+        return self.request
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_request.reset(self._token)
+        return False
+
+def request_scope(request: RequestMetrics) -> _RequestScope:
+    """with 블록 안에서 실행되는 stage()와 record_usage()가 request에 기록되도록 합니다.
+
+    contextvars로 전달되므로 스레드 풀에서 실행할 때는 contextvars.copy_context().run으로 감싸야 합니다.
+    """
+    return _RequestScope(request)
+
+def current_request() -> Optional[RequestMetrics]:
+    return _current_request.get()
+
+def set_outcome(outcome: str):
+    """현재 요청의 결과(ok, cache_hit, error, rejected)를 기록합니다."""
+    request = _current_request.get()
+    if request is not None:
+        request.outcome = outcome
+
+class _Stage:
+    __slots__ = ("name", "attributes", "request", "started", "_spans")
+
+    def __init__(self, name: str, attributes: Dict, request: Optional[RequestMetrics]):
+        self.name = name
+        self.attributes = attributes
+        self.request = request
+
+    def __enter__(self):
+        self._spans = [hook(self.name, self.attributes) for hook in _span_hooks]
+        for span in self._spans:
+            span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if self.request is not None:
+            self.request.add_time(self.name, elapsed)
+        if _enabled:
+            STAGE_SECONDS.observe(elapsed, stage=self.name)
+        for span in reversed(self._spans):
+            try:
+                span.__exit__(exc_type, exc, tb)
+            except Exception as e:
+                logger.warning(f"트레이싱 훅 종료 실패 ({self.name}): {e}")
+        return False
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_STAGE = _NoopStage()
+
+def stage(name: str, request: Optional[RequestMetrics] = None, **attributes):
+    """단계 하나의 시간을 재는 컨텍스트 관리자를 반환합니다.
+
+    request를 주지 않으면 현재 request_scope()의 요청에 기록합니다. 기록할 요청이 없고
+    지표 집계와 트레이싱 훅이 모두 꺼져 있으면 시간을 재지 않습니다.
+    """
+    if request is None:
+        request = _current_request.get()
+        if request is None and not _enabled and not _span_hooks:
+            return _NOOP_STAGE
+    return _Stage(name, attributes, request)
+
+def record_usage(usage, model: str = "", request: Optional[RequestMetrics] = None):
+    """OpenAI 응답의 usage(객체 또는 사전)를 현재 요청과 토큰 카운터에 기록합니다."""
+    if usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    usage = {key: int(value) for key, value in usage.items() if isinstance(value, (int, float))}
+
+    request = request or _current_request.get()
+    if request is not None:
+        request.add_usage(usage)
+    if _enabled:
+        for key in ("prompt_tokens", "completion_tokens"):
+            if key in usage:
+                LLM_TOKENS.inc(usage[key], model=model, type=key[:-len("_tokens")])
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+    """지표를 http://host:port/metrics 로 제공하는 서버를 백그라운드 스레드에서 시작합니다."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"지표 엔드포인트 시작: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+def start_file_exporter(path: str, interval: float = 15.0,
+                        registry: MetricsRegistry = REGISTRY) -> threading.Event:
+    """interval초마다, 그리고 프로세스 종료 시 지표를 path에 기록합니다. 반환된 이벤트를 set하면 멈춥니다."""
+    stop = threading.Event()
+
+    def export():
+        try:
+            registry.write(path)
+        except OSError as e:
+            logger.warning(f"지표 파일 기록 실패: {e}")
+
+    def run():
+        while not stop.wait(interval):
+            export()
+
+    threading.Thread(target=run, name="metrics-file", daemon=True).start()
+    atexit.register(export)
+    logger.info(f"지표 파일 내보내기 시작: {path} ({interval:g}초 간격)")
+    return stop
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def configure_from_env():
+    """환경 변수에 설정된 내보내기를 프로세스당 한 번만 시작합니다."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = os.getenv("METRICS_PORT")
+    if port:
+        try:
+            start_http_server(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+        except OSError as e:
+            logger.warning(f"지표 엔드포인트를 시작할 수 없습니다 ({port}): {e}")
+    path = os.getenv("METRICS_FILE")
+    if path:
+        start_file_exporter(path, float(os.getenv("METRICS_FILE_INTERVAL", "15")))
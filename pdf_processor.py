@@ -1,110 +1,248 @@
+import io
 import os
-import requests
+import mmap
+import threading
 from PyPDF2 import PdfReader
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple, Union, Callable
 import logging
 
+from chunker import TextChunker, create_chunker_from_env
+from hashing import compute_bytes_hash
+from download_manager import DownloadManager
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class PDFProcessor:
     """PDF 파일을 처리하고 텍스트를 추출하는 클래스"""
     
-    def __init__(self, download_dir: str = "pdfs"):
+    def __init__(self, download_dir: str = "pdfs", chunker: Optional[TextChunker] = None,
+                 download_workers: Optional[int] = None):
         self.download_dir = download_dir
+        self.chunker = chunker or create_chunker_from_env()
+        # 연결 풀 크기는 수집 파이프라인의 다운로드 작업자 수와 맞춤
+        self.download_workers = download_workers or int(os.getenv("INGEST_DOWNLOAD_WORKERS", "8"))
         os.makedirs(download_dir, exist_ok=True)
+        self._downloader = None
+        self._downloader_lock = threading.Lock()
     
-    def download_pdf_from_url(self, url: str, filename: str) -> Optional[str]:
-        """URL에서 PDF 파일을 다운로드합니다."""
-        try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            filepath = os.path.join(self.download_dir, filename)
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            logger.info(f"PDF 다운로드 완료: {filepath}")
-            return filepath
-        except Exception as e:
-            logger.error(f"PDF 다운로드 실패: {e}")
-            return None
+    @property
+    def downloader(self) -> DownloadManager:
+        """공유 연결 풀을 쓰는 다운로드 관리자 (처음 사용할 때 생성)
+        
+        여러 다운로드 스레드가 동시에 처음 접근해도 관리자는 하나만 만들어지므로
+        download_state.json을 여러 인스턴스가 덮어쓰지 않습니다.
+        """
+        if self._downloader is None:
+            with self._downloader_lock:
+                if self._downloader is None:
+                    self._downloader = DownloadManager(self.download_dir, max_workers=self.download_workers)
+        return self._downloader
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """PDF 파일에서 텍스트를 추출합니다."""
+    def close(self):
+        """다운로드 관리자를 만들었으면 연결 풀을 닫습니다."""
+        with self._downloader_lock:
+            if self._downloader is not None:
+                self._downloader.close()
+                self._downloader = None
+    
+    def download_pdf_from_url(self, url: str, filename: Optional[str] = None) -> Optional[str]:
+        """URL에서 PDF 파일을 다운로드합니다.
+        
+        파일은 내용 해시 이름으로 저장되며, 변경되지 않은 파일은 다시 받지 않습니다.
+        filename은 이전 버전과의 호환을 위해 남겨 둔 인자로 사용하지 않습니다.
+        """
+        return self.downloader.download(url)['path']
+    
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """PDF 파일에서 (페이지 번호, 텍스트)를 한 페이지씩 추출합니다. 빈 페이지는 빈 문자열입니다.
+        
+        파일을 열 수 없으면 아무 페이지도 내보내지 않고, 중간 페이지에서 추출이 실패하면
+        일부만 추출된 결과가 완전한 문서로 쓰이지 않도록 예외를 다시 발생시킵니다.
+        """
         try:
             reader = PdfReader(pdf_path)
-            text = ""
-            
-            for page_num, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():
-                    text += f"\n--- 페이지 {page_num + 1} ---\n"
-                    text += page_text
-                    text += "\n"
-            
-            logger.info(f"텍스트 추출 완료: {len(text)} 문자")
-            return text
         except Exception as e:
             logger.error(f"텍스트 추출 실패: {e}")
-            return ""
+            return
+        yield from self._iter_reader_pages(reader)
+    
+    def _iter_reader_pages(self, reader: PdfReader) -> Iterator[Tuple[int, str]]:
+        num_chars = 0
+        page_num = 0
+        try:
+            for page_num, page in enumerate(reader.pages, 1):
+                page_text = page.extract_text() or ""
+                num_chars += len(page_text)
+                yield page_num, page_text
+        except Exception as e:
+            logger.error(f"텍스트 추출 실패 ({page_num}페이지): {e}")
+            raise
+        logger.info(f"텍스트 추출 완료: {len(reader.pages)}페이지, {num_chars} 문자")
     
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """텍스트를 청크로 나눕니다."""
-        chunks = []
-        start = 0
+    def extract_pages(self, pdf_path: str) -> List[str]:
+        """PDF 파일에서 페이지별 텍스트를 추출합니다. 빈 페이지는 빈 문자열입니다."""
+        return [page_text for _, page_text in self.iter_pages(pdf_path)]
+    
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """PDF 파일에서 텍스트를 추출합니다."""
+        parts = []
+        for page_num, page_text in enumerate(self.extract_pages(pdf_path)):
+            if page_text.strip():
+                parts.append(f"\n--- 페이지 {page_num + 1} ---\n{page_text}\n")
+        return "".join(parts)
+    
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+        """텍스트를 청크로 나눕니다. 크기/겹침을 지정하지 않으면 기본 청커 설정을 따릅니다."""
+        chunker = self.chunker
+        if chunk_size is not None or overlap is not None:
+            chunker = TextChunker(
+                chunk_size=chunk_size if chunk_size is not None else chunker.chunk_size,
+                overlap=overlap if overlap is not None else chunker.overlap,
+                length_unit=chunker.length_unit,
+                encoding_name=chunker.encoding_name
+            )
+        chunks = chunker.chunk_text(text)
+        logger.info(f"텍스트를 {len(chunks)}개 청크로 분할")
+        return chunks
+    
+    def process_pdf_file(self, pdf_path: str, streaming: bool = False) -> Union[List[str], Iterator[Dict]]:
+        """PDF 파일을 처리하여 청크로 나눈 텍스트를 반환합니다.
         
-        while start < len(text):
-            end = start + chunk_size
-            
-            # 문장 경계에서 자르기
-            if end < len(text):
-                # 마지막 마침표나 줄바꿈을 찾아서 자르기
-                last_period = text.rfind('.', start, end)
-                last_newline = text.rfind('\n', start, end)
-                cut_point = max(last_period, last_newline)
-                
-                if cut_point > start:
-                    end = cut_point + 1
-            
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            start = end - overlap
-            if start >= len(text):
-                break
+        streaming=True이면 페이지를 하나씩 읽어 {'text', 'page_start', 'page_end'} 청크를
+        생성하는 대로 내보내는 이터레이터를 반환합니다.
+        """
+        if streaming:
+            return self.chunker.iter_chunks(self.iter_pages(pdf_path))
         
+        chunks = self.chunker.chunk_pages(self.iter_pages(pdf_path))
         logger.info(f"텍스트를 {len(chunks)}개 청크로 분할")
         return chunks
     
-    def process_pdf_file(self, pdf_path: str) -> List[str]:
-        """PDF 파일을 처리하여 청크로 나눈 텍스트를 반환합니다."""
-        text = self.extract_text_from_pdf(pdf_path)
-        if text:
-            return self.chunk_text(text)
-        return []
+    def process_document(self, source, filename: Optional[str] = None, streaming: bool = False,
+                         content_hash: Optional[str] = None,
+                         is_unchanged: Optional[Callable[[str], bool]] = None) -> Dict:
+        """PDF를 한 번만 열어 청크, 메타데이터, 내용 해시를 함께 반환합니다.
+        
+        source는 파일 경로, 메모리 매핑(mmap), bytes/memoryview, 또는 읽기 가능한 바이너리
+        파일 객체(BytesIO, Streamlit UploadedFile 등)입니다. 경로는 메모리 매핑으로 열어 같은
+        버퍼에서 해시 계산과 파싱을 모두 수행하며, 임시 파일을 만들지 않습니다.
+        content_hash를 주면 (다운로드하며 이미 계산한 경우) 해시를 다시 계산하지 않습니다.
+        is_unchanged(해시)가 참이면 PdfReader를 만들지 않고 'unchanged': True로 바로 반환합니다.
+        streaming=True이면 'chunks'는 페이지를 읽는 대로 청크를 내보내는 이터레이터이며,
+        중간 페이지에서 추출이 실패하면 순회 중에 예외가 발생합니다.
+        
+        반환: {'chunks': 청크 딕셔너리 목록, 'metadata': 메타데이터, 'content_hash': 해시,
+               'unchanged': 변경 없음 여부}
+        실패하면 content_hash가 None입니다.
+        """
+        if filename is None:
+            filename = os.path.basename(source) if isinstance(source, str) else getattr(source, 'name', '')
+        
+        close = None
+        try:
+            buffer, stream, close = self._open_source(source)
+            content_hash = content_hash or compute_bytes_hash(buffer)
+            if is_unchanged is not None and is_unchanged(content_hash):
+                close()
+                return {'chunks': [], 'metadata': {}, 'content_hash': content_hash, 'unchanged': True}
+            reader = PdfReader(stream)
+            metadata = self._reader_metadata(reader, filename, len(buffer))
+        except Exception as e:
+            logger.error(f"PDF 열기 실패: {filename} - {e}")
+            if close:
+                close()
+            return {'chunks': [], 'metadata': {}, 'content_hash': None, 'unchanged': False}
+        
+        chunks = _ChunkStream(self.chunker.iter_chunks(self._iter_reader_pages(reader)), close)
+        if not streaming:
+            try:
+                chunks = list(chunks)
+            except Exception:
+                # 일부 페이지만 추출된 문서는 실패로 처리
+                return {'chunks': [], 'metadata': metadata, 'content_hash': None, 'unchanged': False}
+            logger.info(f"텍스트를 {len(chunks)}개 청크로 분할")
+        
+        return {'chunks': chunks, 'metadata': metadata, 'content_hash': content_hash, 'unchanged': False}
+    
+    @staticmethod
+    def _open_source(source) -> Tuple[object, object, Callable[[], None]]:
+        """(해시용 버퍼, PdfReader용 스트림, 정리 함수)를 반환합니다."""
+        if isinstance(source, str):
+            f = open(source, 'rb')
+            if os.fstat(f.fileno()).st_size == 0:
+                f.close()
+                return b"", io.BytesIO(b""), lambda: None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            def close():
+                mapped.close()
+                f.close()
+            return mapped, mapped, close
+        
+        if isinstance(source, mmap.mmap):
+            source.seek(0)
+            return source, source, lambda: None
+        
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return source, io.BytesIO(source), lambda: None
+        
+        # BytesIO 계열은 복사 없이 내부 버퍼를 사용
+        if hasattr(source, 'getbuffer'):
+            buffer = source.getbuffer()
+            source.seek(0)
+            return buffer, source, buffer.release
+        
+        source.seek(0)
+        data = source.read()
+        return data, io.BytesIO(data), lambda: None
+    
+    @staticmethod
+    def _reader_metadata(reader: PdfReader, filename: str, file_size: int) -> Dict:
+        metadata = {
+            'num_pages': len(reader.pages),
+            'filename': filename,
+            'file_size': file_size
+        }
+        
+        if reader.metadata:
+            metadata.update({
+                'title': reader.metadata.get('/Title', ''),
+                'author': reader.metadata.get('/Author', ''),
+                'subject': reader.metadata.get('/Subject', ''),
+                'creator': reader.metadata.get('/Creator', '')
+            })
+        
+        return metadata
     
     def get_pdf_metadata(self, pdf_path: str) -> Dict:
         """PDF 파일의 메타데이터를 추출합니다."""
         try:
             reader = PdfReader(pdf_path)
-            metadata = {
-                'num_pages': len(reader.pages),
-                'filename': os.path.basename(pdf_path),
-                'file_size': os.path.getsize(pdf_path)
-            }
-            
-            if reader.metadata:
-                metadata.update({
-                    'title': reader.metadata.get('/Title', ''),
-                    'author': reader.metadata.get('/Author', ''),
-                    'subject': reader.metadata.get('/Subject', ''),
-                    'creator': reader.metadata.get('/Creator', '')
-                })
-            
-            return metadata
+            return self._reader_metadata(reader, os.path.basename(pdf_path), os.path.getsize(pdf_path))
         except Exception as e:
             logger.error(f"메타데이터 추출 실패: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+class _ChunkStream:
+    """청크 이터레이터를 감싸, 끝까지 읽거나 close()를 호출하면 원본 PDF 버퍼를 닫는 클래스"""
+    
+    def __init__(self, chunks: Iterator[Dict], close: Callable[[], None]):
+        self._chunks = chunks
+        self._close = close
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> Dict:
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+    
+    def close(self):
+        if self._close is not None:
+            close, self._close = self._close, None
+            self._chunks.close()
+            close()
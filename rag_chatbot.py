@@ -1,12 +1,20 @@
 import os
 import json
-from typing import List, Dict, Optional
-import openai
-from openai import OpenAI
+import time
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Iterator
+import threading
 import logging
 from dotenv import load_dotenv
 
+import metrics
 from embedding_manager import EmbeddingManager
+from answer_cache import SemanticAnswerCache
+from context_builder import ContextBuilder, NO_CONTEXT, create_context_builder_from_env
+from conversation_memory import ConversationMemory
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -19,22 +27,60 @@ class RAGChatbot:
                  embedding_manager: EmbeddingManager,
                  model_name: str = "gpt-3.5-turbo",
                  max_tokens: int = 1000,
-                 temperature: float = 0.7):
+                 temperature: float = 0.7,
+                 answer_cache: Optional[SemanticAnswerCache] = None,
+                 max_concurrent_requests: int = 64,
+                 max_pending_requests: int = 512,
+                 retrieval_workers: int = 4,
+                 n_results: int = 6,
+                 context_builder: Optional[ContextBuilder] = None,
+                 memory_max_tokens: Optional[int] = None,
+                 memory_store=None):
         
         self.embedding_manager = embedding_manager
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = temperature
         
+        # 의미 기반 답변 캐시 (선택)
+        self.answer_cache = answer_cache
+        
+        # 검색 후보 수와 토큰 예산 기반 컨텍스트 구성 (MMR 다양화에 쓰도록 후보를 넉넉히 검색)
+        self.n_results = n_results
+        self.context_builder = context_builder or create_context_builder_from_env(
+            embedding_manager.encode_texts, embedding_manager.get_embeddings)
+        
         # OpenAI 클라이언트 초기화
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
         
-        self.client = OpenAI(api_key=api_key)
+        # 클라이언트는 처음 LLM을 호출할 때 만듦 (openai import 지연)
+        self._api_key = api_key
+        self._client = None
+        self._async_client = None
+        # AsyncOpenAI의 연결 풀은 만든 이벤트 루프에 묶이므로 루프마다 따로 만듦
+        self._async_clients: Dict[asyncio.AbstractEventLoop, object] = {}
+        self._client_lock = threading.Lock()
+        
+        # 단계별 지연 시간과 토큰 사용량 지표 (METRICS_PORT/METRICS_FILE이 있으면 내보내기 시작)
+        metrics.configure_from_env()
+        
+        # 비동기 요청 처리 설정 (동시 처리 수 제한과 대기열 상한)
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_pending_requests = max_pending_requests
+        self.retrieval_executor = ThreadPoolExecutor(max_workers=retrieval_workers,
+                                                     thread_name_prefix="retrieval")
+        # asyncio.Semaphore는 처음 사용한 이벤트 루프에 묶이므로 루프마다 따로 만듦
+        self._request_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._pending_requests = 0
         
-        # 대화 히스토리
-        self.conversation_history = []
+        # 대화 메모리 (최근 대화는 토큰 예산 안에서 그대로, 오래된 대화는 요약으로 유지)
+        self.memory_max_tokens = memory_max_tokens or int(os.getenv("MEMORY_MAX_TOKENS", "1500"))
+        self.memory_summary_tokens = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+        self.memory_store = memory_store
+        self.summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+        self.conversation_history = self.create_memory()
         
         # 시스템 프롬프트
         self.system_prompt = """당신은 주택정책 전문가입니다. 
@@ -51,76 +97,245 @@ class RAGChatbot:
 {context}
 
 질문: {question}"""
+        
+        # 이전 대화를 가리키는 표현 (답변 캐시 우회 판단용)
+        self.follow_up_markers = [
+            "그것", "그거", "그건", "이것", "이거", "이건", "그럼", "그러면", "그렇다면",
+            "위의", "위 내용", "앞서", "방금", "아까", "이전", "해당", "더 자세히", "다시"
+        ]
     
-    def search_relevant_documents(self, query: str, n_results: int = 3) -> List[Dict]:
+    def search_relevant_documents(self, query: str, n_results: Optional[int] = None) -> List[Dict]:
         """질문과 관련된 문서들을 검색합니다."""
-        return self.embedding_manager.search_similar(query, n_results=n_results)
+        with metrics.stage(metrics.RETRIEVAL):
+            return self.embedding_manager.search_similar(query, n_results=n_results or self.n_results)
+    
+    def search_many(self, queries: List[str], n_results: Optional[int] = None) -> List[List[Dict]]:
+        """여러 질문의 관련 문서를 한 번에 검색합니다. 결과는 입력 순서를 따릅니다."""
+        with metrics.stage(metrics.RETRIEVAL, queries=len(queries)):
+            return self.embedding_manager.search_many(queries, n_results=n_results or self.n_results)
     
     def create_context_from_documents(self, documents: List[Dict]) -> str:
-        """검색된 문서들로부터 컨텍스트를 생성합니다."""
+        """검색된 문서들로부터 토큰 예산 안의 컨텍스트를 생성합니다."""
         if not documents:
-            return "관련 문서를 찾을 수 없습니다."
+            return NO_CONTEXT
         
-        context_parts = []
-        for doc in documents:
-            similarity = doc.get('similarity', 0)
-            content = doc.get('document', '')
-            metadata = doc.get('metadata', {})
-            
-            # 유사도가 높은 문서만 포함
-            if similarity > 0.6:
-                context_parts.append(f"[유사도: {similarity:.2f}] {content}")
+        with metrics.stage(metrics.CONTEXT_BUILDING, documents=len(documents)):
+            return self.context_builder.build(documents)
+    
+    @property
+    def client(self):
+        """동기 OpenAI 클라이언트를 반환합니다. 처음 접근할 때 생성합니다."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self._api_key)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    @property
+    def async_client(self):
+        """현재 이벤트 루프의 비동기 OpenAI 클라이언트를 반환합니다. 루프에서 처음 접근할 때 생성합니다.
         
-        return "\n\n".join(context_parts) if context_parts else "관련 문서를 찾을 수 없습니다."
+        setter로 지정한 클라이언트가 있으면 루프와 관계없이 그것을 사용합니다.
+        """
+        if self._async_client is not None:
+            return self._async_client
+        
+        def create():
+            from openai import AsyncOpenAI
+            return AsyncOpenAI(api_key=self._api_key)
+        return self._for_running_loop(self._async_clients, create)
     
-    def generate_response(self, question: str, context: str) -> str:
-        """OpenAI API를 사용하여 답변을 생성합니다."""
+    def _for_running_loop(self, store: Dict, factory):
+        """현재 이벤트 루프에 속한 객체를 반환합니다.
+        
+        객체가 루프를 참조하므로 약한 참조로는 정리되지 않아, 닫힌 루프의 객체는 여기서 지웁니다.
+        """
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            for closed in [other for other in store if other.is_closed()]:
+                del store[closed]
+            value = store.get(loop)
+            if value is None:
+                value = store[loop] = factory()
+        return value
+    
+    @async_client.setter
+    def async_client(self, client):
+        self._async_client = client
+    
+    def warm_up(self):
+        """임베딩 모델과 OpenAI 클라이언트를 미리 준비합니다."""
+        self.embedding_manager.warm_up()
+        self.client
+    
+    def create_memory(self, session_id: Optional[str] = None) -> ConversationMemory:
+        """이 챗봇의 설정으로 대화 메모리를 만듭니다. session_id를 주면 memory_store에 저장됩니다."""
+        return ConversationMemory(
+            max_tokens=self.memory_max_tokens,
+            summarizer=self._summarize_turns,
+            store=self.memory_store,
+            session_id=session_id,
+            executor=self.summary_executor
+        )
+    
+    def _summarize_turns(self, previous_summary: str, messages: List[Dict]) -> str:
+        """이전 요약과 오래된 대화 턴들을 하나의 요약으로 합칩니다 (백그라운드에서 호출됨)."""
+        transcript = "\n".join(
+            f"{'사용자' if message['role'] == 'user' else '챗봇'}: {message['content']}" for message in messages
+        )
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "다음 대화를 이후 답변에 필요한 사실, 수치, 사용자의 상황과 관심사 위주로 "
+                                              "간결하게 한국어로 요약하세요. 이전 요약이 있으면 그 내용도 포함하세요."},
+                {"role": "user", "content": f"이전 요약:\n{previous_summary or '(없음)'}\n\n대화:\n{transcript}"}
+            ],
+            max_tokens=self.memory_summary_tokens,
+            temperature=0
+        )
+        metrics.record_usage(getattr(response, 'usage', None), self.model_name)
+        return response.choices[0].message.content
+    
+    def _build_messages(self, question: str, context: str,
+                        history: Optional[ConversationMemory] = None) -> List[Dict]:
+        """시스템 프롬프트, 대화 히스토리, 현재 질문으로 메시지 목록을 구성합니다."""
+        if history is None:
+            history = self.conversation_history
+        
+        # 프롬프트 구성
+        prompt = self.system_prompt.format(
+            context=context,
+            question=question
+        )
+        
+        # 대화 히스토리 추가
+        messages = [
+            {"role": "system", "content": prompt}
+        ]
+        
+        # 이전 대화 요약과 토큰 예산 안의 최근 대화 추가
+        messages.extend(history.prompt_messages())
+        
+        # 현재 질문 추가
+        messages.append({"role": "user", "content": question})
+        return messages
+    
+    def _remember_turn(self, question: str, answer: str, history: Optional[ConversationMemory] = None):
+        """질문과 답변을 대화 메모리에 추가합니다. 예산을 넘은 턴은 백그라운드에서 요약됩니다."""
+        if history is None:
+            history = self.conversation_history
+        
+        history.add_turn(question, answer)
+    
+    def _respond(self, question: str, context: str,
+                 history: Optional[ConversationMemory] = None) -> Tuple[str, bool]:
+        """답변을 생성하고 (답변, 성공 여부)를 반환합니다."""
         try:
-            # 프롬프트 구성
-            prompt = self.system_prompt.format(
-                context=context,
-                question=question
-            )
-            
-            # 대화 히스토리 추가
-            messages = [
-                {"role": "system", "content": prompt}
-            ]
-            
-            # 이전 대화 히스토리 추가 (최근 5개)
-            for msg in self.conversation_history[-10:]:
-                messages.append(msg)
-            
-            # 현재 질문 추가
-            messages.append({"role": "user", "content": question})
-            
             # API 호출
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            messages = self._build_messages(question, context, history)
+            with metrics.stage(metrics.LLM, model=self.model_name):
+                response = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+            metrics.record_usage(getattr(response, 'usage', None), self.model_name)
             
             answer = response.choices[0].message.content
             
             # 대화 히스토리에 추가
-            self.conversation_history.append({"role": "user", "content": question})
-            self.conversation_history.append({"role": "assistant", "content": answer})
-            
-            # 히스토리 길이 제한 (메모리 관리)
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
-            return answer
+            self._remember_turn(question, answer, history)
+            return answer, True
             
         except Exception as e:
             logger.error(f"답변 생성 실패: {e}")
-            return f"죄송합니다. 답변 생성 중 오류가 발생했습니다: {str(e)}"
+            metrics.set_outcome("error")
+            return f"죄송합니다. 답변 생성 중 오류가 발생했습니다: {str(e)}", False
     
-    def chat(self, question: str) -> Dict:
-        """챗봇과 대화합니다."""
+    def generate_response(self, question: str, context: str) -> str:
+        """OpenAI API를 사용하여 답변을 생성합니다."""
+        return self._respond(question, context)[0]
+    
+    def _depends_on_history(self, question: str, history: Optional[ConversationMemory] = None) -> bool:
+        """질문의 의미가 이전 대화에 따라 달라질 수 있는지 판단합니다."""
+        if history is None:
+            history = self.conversation_history
+        if not history:
+            return False
+        return any(marker in question for marker in self.follow_up_markers)
+    
+    def _check_answer_cache(self, question: str,
+                            history: Optional[ConversationMemory] = None) -> Tuple[Optional[Dict], Optional[Tuple]]:
+        """답변 캐시를 조회하고 (캐시된 답변, 저장용 키)를 반환합니다. 후속 질문은 우회합니다.
+        
+        답변 캐시는 모든 세션이 공유하므로, 대화 히스토리가 프롬프트에 들어가는 경우에는
+        생성된 답변이 다른 사용자에게 전달되지 않도록 저장용 키를 None으로 반환합니다.
+        """
+        if history is None:
+            history = self.conversation_history
+        if self.answer_cache is None or self._depends_on_history(question, history):
+            return None, None
+        
+        with metrics.stage(metrics.ANSWER_CACHE):
+            query_embedding = self.embedding_manager.encode_query(question)
+            collection_version = self.embedding_manager.collection_version
+            cached = self.answer_cache.lookup(query_embedding, collection_version)
+        if cached is not None:
+            logger.info(f"답변 캐시 적중 (유사도: {cached['similarity']:.3f})")
+            metrics.set_outcome("cache_hit")
+        if history.prompt_messages():
+            return cached, None
+        return cached, (query_embedding, collection_version)
+    
+    def _store_answer(self, question: str, cache_key: Optional[Tuple], answer: str,
+                      relevant_docs: List[Dict], context: str):
+        """생성된 답변을 답변 캐시에 저장합니다."""
+        if cache_key is not None:
+            query_embedding, collection_version = cache_key
+            self.answer_cache.store(question, query_embedding, answer,
+                                    relevant_docs, context, collection_version)
+    
+    def _finish_request(self, request: "metrics.RequestMetrics", result: Dict) -> Dict:
+        """요청 지표를 확정하고 단계별 시간(초)과 토큰 사용량을 결과에 붙입니다."""
+        request.finish()
+        result["timings"] = dict(request.timings)
+        result["usage"] = dict(request.usage)
+        return result
+    
+    def chat(self, question: str, conversation_history: Optional[ConversationMemory] = None) -> Dict:
+        """챗봇과 대화합니다. conversation_history를 넘기면 그 대화 메모리를 사용합니다.
+        
+        결과의 timings에는 단계별 시간(초, answer_cache, retrieval, query_encoding, vector_search,
+        context_building, llm, total)이, usage에는 OpenAI 응답의 토큰 사용량이 담깁니다.
+        retrieval은 query_encoding과 vector_search를 포함합니다.
+        """
+        request = metrics.RequestMetrics("chat")
+        with metrics.request_scope(request):
+            result = self._chat(question, conversation_history)
+        return self._finish_request(request, result)
+    
+    def _chat(self, question: str, conversation_history: Optional[ConversationMemory] = None) -> Dict:
+        history = self.conversation_history if conversation_history is None else conversation_history
         try:
+            # 0. 의미 기반 답변 캐시 확인
+            cached, cache_key = self._check_answer_cache(question, history)
+            if cached is not None:
+                self._remember_turn(question, cached['answer'], history)
+                return {
+                    "question": question,
+                    "answer": cached['answer'],
+                    "relevant_documents": cached['relevant_documents'],
+                    "context_used": cached['context_used'],
+                    "model_used": self.model_name,
+                    "from_cache": True
+                }
+            
             # 1. 관련 문서 검색
             relevant_docs = self.search_relevant_documents(question)
             
@@ -128,7 +343,9 @@ class RAGChatbot:
             context = self.create_context_from_documents(relevant_docs)
             
             # 3. 답변 생성
-            answer = self.generate_response(question, context)
+            answer, success = self._respond(question, context, history)
+            if success:
+                self._store_answer(question, cache_key, answer, relevant_docs, context)
             
             # 4. 결과 반환
             result = {
@@ -136,7 +353,8 @@ class RAGChatbot:
                 "answer": answer,
                 "relevant_documents": relevant_docs,
                 "context_used": context,
-                "model_used": self.model_name
+                "model_used": self.model_name,
+                "from_cache": False
             }
             
             logger.info(f"챗봇 응답 생성 완료: {len(answer)} 문자")
@@ -144,23 +362,271 @@ class RAGChatbot:
             
         except Exception as e:
             logger.error(f"챗봇 처리 실패: {e}")
+            metrics.set_outcome("error")
             return {
                 "question": question,
                 "answer": f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}",
                 "relevant_documents": [],
                 "context_used": "",
-                "model_used": self.model_name
+                "model_used": self.model_name,
+                "from_cache": False
             }
     
+    def chat_many(self, questions: List[str], max_workers: int = 8) -> List[Dict]:
+        """여러 질문에 한꺼번에 답변합니다.
+        
+        검색은 배치 임베딩과 다중 쿼리 한 번으로 처리하고, LLM 호출은 최대 max_workers개까지
+        병렬로 수행합니다. 각 질문은 독립적인 대화로 처리되며 결과는 입력 순서대로 반환됩니다.
+        결과의 timings에는 일괄 검색 시간이 포함되지 않습니다.
+        """
+        if not questions:
+            return []
+        
+        # 1. 관련 문서 일괄 검색
+        all_docs = self.search_many(questions)
+        
+        def respond(index: int) -> Dict:
+            question = questions[index]
+            try:
+                history = self.create_memory()
+                cached, cache_key = self._check_answer_cache(question, history)
+                if cached is not None:
+                    return {
+                        "question": question,
+                        "answer": cached['answer'],
+                        "relevant_documents": cached['relevant_documents'],
+                        "context_used": cached['context_used'],
+                        "model_used": self.model_name,
+                        "from_cache": True
+                    }
+                
+                # 2. 컨텍스트 생성 및 3. 답변 생성
+                relevant_docs = all_docs[index]
+                context = self.create_context_from_documents(relevant_docs)
+                answer_text, success = self._respond(question, context, history)
+                if success:
+                    self._store_answer(question, cache_key, answer_text, relevant_docs, context)
+                
+                return {
+                    "question": question,
+                    "answer": answer_text,
+                    "relevant_documents": relevant_docs,
+                    "context_used": context,
+                    "model_used": self.model_name,
+                    "from_cache": False
+                }
+            except Exception as e:
+                logger.error(f"챗봇 처리 실패: {e}")
+                metrics.set_outcome("error")
+                return {
+                    "question": question,
+                    "answer": f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}",
+                    "relevant_documents": [],
+                    "context_used": "",
+                    "model_used": self.model_name,
+                    "from_cache": False
+                }
+        
+        def answer(index: int) -> Dict:
+            request = metrics.RequestMetrics("chat_many")
+            with metrics.request_scope(request):
+                result = respond(index)
+            return self._finish_request(request, result)
+        
+        # 4. LLM 호출을 제한된 병렬도로 수행 (map은 입력 순서를 유지)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions)))) as pool:
+            results = list(pool.map(answer, range(len(questions))))
+        
+        logger.info(f"일괄 응답 생성 완료: {len(results)}개 질문")
+        return results
+    
+    def _stream_tokens(self, question: str, context: str,
+                       history: Optional[ConversationMemory] = None,
+                       request: Optional["metrics.RequestMetrics"] = None) -> Iterator[str]:
+        """OpenAI 스트리밍 응답에서 텍스트 조각을 순서대로 반환합니다."""
+        # 순회하는 쪽의 컨텍스트에서 실행되므로 기록할 요청을 직접 넘김
+        with metrics.stage(metrics.LLM, request=request, model=self.model_name):
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._build_messages(question, context, history),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
+    def chat_stream(self, question: str,
+                    conversation_history: Optional[ConversationMemory] = None) -> "ChatStream":
+        """챗봇과 스트리밍으로 대화합니다.
+        
+        반환된 객체를 순회하면 답변 조각이 도착하는 대로 전달되며,
+        순회가 끝나면 result에 답변, 참고 문서, 첫 토큰까지의 시간, 단계별 시간이 담깁니다.
+        스트리밍 응답에는 토큰 사용량이 오지 않으므로 result의 usage는 비어 있습니다.
+        """
+        history = self.conversation_history if conversation_history is None else conversation_history
+        started = time.monotonic()
+        request = metrics.RequestMetrics("chat_stream")
+        with metrics.request_scope(request):
+            try:
+                cached, cache_key = self._check_answer_cache(question, history)
+                if cached is not None:
+                    return ChatStream(self, question, cached['relevant_documents'], cached['context_used'],
+                                      iter([cached['answer']]), started, from_cache=True, history=history,
+                                      request=request)
+                
+                relevant_docs = self.search_relevant_documents(question)
+                context = self.create_context_from_documents(relevant_docs)
+                return ChatStream(self, question, relevant_docs, context,
+                                  self._stream_tokens(question, context, history, request), started,
+                                  cache_key=cache_key, history=history, request=request)
+                
+            except Exception as e:
+                logger.error(f"챗봇 처리 실패: {e}")
+                return ChatStream(self, question, [], "", iter(()), started, error=e, history=history,
+                                  request=request)
+    
+    def create_session(self, session_id: Optional[str] = None) -> "ChatSession":
+        """이 챗봇의 모델, 저장소, 캐시를 공유하면서 대화 메모리만 따로 갖는 세션을 만듭니다."""
+        return ChatSession(self, self.create_memory(session_id))
+    
+    def _request_semaphore(self) -> asyncio.Semaphore:
+        """현재 이벤트 루프의 동시 처리 제한 세마포어를 반환합니다."""
+        return self._for_running_loop(self._request_semaphores,
+                                      lambda: asyncio.Semaphore(self.max_concurrent_requests))
+    
+    async def _run_in_executor(self, func, *args):
+        """CPU 작업(임베딩, 벡터 검색)을 검색용 스레드 풀에서 실행합니다."""
+        loop = asyncio.get_running_loop()
+        # 단계별 시간이 현재 요청에 기록되도록 컨텍스트를 함께 넘김
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.retrieval_executor, functools.partial(context.run, func, *args))
+    
+    async def asearch(self, query: str, n_results: Optional[int] = None) -> List[Dict]:
+        """질문과 관련된 문서들을 이벤트 루프를 막지 않고 검색합니다."""
+        return await self._run_in_executor(self.search_relevant_documents, query, n_results)
+    
+    async def _arespond(self, question: str, context: str, history: ConversationMemory) -> Tuple[str, bool]:
+        """AsyncOpenAI로 답변을 생성하고 (답변, 성공 여부)를 반환합니다."""
+        try:
+            messages = self._build_messages(question, context, history)
+            with metrics.stage(metrics.LLM, model=self.model_name):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+            metrics.record_usage(getattr(response, 'usage', None), self.model_name)
+            
+            answer = response.choices[0].message.content
+            self._remember_turn(question, answer, history)
+            return answer, True
+            
+        except Exception as e:
+            logger.error(f"답변 생성 실패: {e}")
+            metrics.set_outcome("error")
+            return f"죄송합니다. 답변 생성 중 오류가 발생했습니다: {str(e)}", False
+    
+    async def achat(self, question: str, conversation_history: Optional[ConversationMemory] = None) -> Dict:
+        """챗봇과 비동기로 대화합니다.
+        
+        conversation_history에 create_memory()로 만든 대화별 메모리를 넘기면 하나의 이벤트 루프에서
+        여러 대화를 동시에 처리할 수 있습니다. 동시 처리 수는 이벤트 루프마다 max_concurrent_requests로 제한되며,
+        대기 중인 요청이 max_pending_requests를 넘으면 즉시 거절합니다.
+        결과의 timings와 usage는 chat()과 같습니다.
+        """
+        request = metrics.RequestMetrics("achat")
+        with metrics.request_scope(request):
+            result = await self._achat(question, conversation_history)
+        return self._finish_request(request, result)
+    
+    async def _achat(self, question: str, conversation_history: Optional[ConversationMemory] = None) -> Dict:
+        history = self.conversation_history if conversation_history is None else conversation_history
+        
+        if self._pending_requests >= self.max_pending_requests:
+            logger.warning(f"대기 중인 요청이 너무 많아 거절합니다: {self._pending_requests}개")
+            metrics.set_outcome("rejected")
+            return {
+                "question": question,
+                "answer": "죄송합니다. 현재 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+                "relevant_documents": [],
+                "context_used": "",
+                "model_used": self.model_name,
+                "from_cache": False,
+                "rejected": True
+            }
+        
+        self._pending_requests += 1
+        try:
+            async with self._request_semaphore():
+                # 0. 의미 기반 답변 캐시 확인
+                cached, cache_key = await self._run_in_executor(self._check_answer_cache, question, history)
+                if cached is not None:
+                    self._remember_turn(question, cached['answer'], history)
+                    return {
+                        "question": question,
+                        "answer": cached['answer'],
+                        "relevant_documents": cached['relevant_documents'],
+                        "context_used": cached['context_used'],
+                        "model_used": self.model_name,
+                        "from_cache": True
+                    }
+                
+                # 1. 관련 문서 검색
+                relevant_docs = await self.asearch(question)
+                
+                # 2. 컨텍스트 생성 (토큰 계산과 MMR용 임베딩 조회는 스레드 풀에서)
+                context = await self._run_in_executor(self.create_context_from_documents, relevant_docs)
+                
+                # 3. 답변 생성
+                answer, success = await self._arespond(question, context, history)
+                if success:
+                    self._store_answer(question, cache_key, answer, relevant_docs, context)
+                
+                return {
+                    "question": question,
+                    "answer": answer,
+                    "relevant_documents": relevant_docs,
+                    "context_used": context,
+                    "model_used": self.model_name,
+                    "from_cache": False
+                }
+                
+        except Exception as e:
+            logger.error(f"챗봇 처리 실패: {e}")
+            metrics.set_outcome("error")
+            return {
+                "question": question,
+                "answer": f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}",
+                "relevant_documents": [],
+                "context_used": "",
+                "model_used": self.model_name,
+                "from_cache": False
+            }
+        finally:
+            self._pending_requests -= 1
+    
     def get_conversation_history(self) -> List[Dict]:
         """대화 히스토리를 반환합니다."""
-        return self.conversation_history.copy()
+        return self.conversation_history.get_messages()
     
     def clear_conversation_history(self):
         """대화 히스토리를 초기화합니다."""
-        self.conversation_history = []
+        self.conversation_history.clear()
         logger.info("대화 히스토리가 초기화되었습니다.")
     
+    def close(self):
+        """검색/요약 스레드 풀을 종료하고 동기 OpenAI 클라이언트의 연결을 닫습니다.
+        
+        진행 중인 요약은 끝날 때까지 기다리므로 요약 결과가 대화 메모리에 반영됩니다.
+        """
+        self.retrieval_executor.shutdown(wait=True)
+        self.summary_executor.shutdown(wait=True)
+        if self._client is not None and hasattr(self._client, 'close'):
+            self._client.close()
+    
     def get_system_info(self) -> Dict:
         """시스템 정보를 반환합니다."""
         collection_info = self.embedding_manager.get_collection_info()
@@ -170,5 +636,112 @@ class RAGChatbot:
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
             "conversation_history_length": len(self.conversation_history),
-            "embedding_collection": collection_info
-        }
\ No newline at end of file
+            "embedding_collection": collection_info,
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else {}
+        }
+
+class ChatStream:
+    """답변을 토큰 단위로 전달하고, 스트림이 끝나면 대화 히스토리와 결과를 갱신하는 클래스"""
+    
+    def __init__(self,
+                 chatbot: RAGChatbot,
+                 question: str,
+                 relevant_documents: List[Dict],
+                 context: str,
+                 tokens: Iterator[str],
+                 started: float,
+                 from_cache: bool = False,
+                 cache_key: Optional[Tuple] = None,
+                 error: Optional[Exception] = None,
+                 history: Optional[ConversationMemory] = None,
+                 request: Optional["metrics.RequestMetrics"] = None):
+        
+        self.chatbot = chatbot
+        self.history = history
+        self.question = question
+        self.relevant_documents = relevant_documents
+        self.context = context
+        self.from_cache = from_cache
+        self.result: Optional[Dict] = None
+        self._tokens = tokens
+        self._started = started
+        self._cache_key = cache_key
+        self._error = error
+        self._request = request
+    
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        time_to_first_token = None
+        error = self._error
+        
+        if error is None:
+            try:
+                for token in self._tokens:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.monotonic() - self._started
+                    parts.append(token)
+                    yield token
+            except Exception as e:
+                logger.error(f"스트리밍 답변 생성 실패: {e}")
+                error = e
+        
+        if error is not None:
+            message = f"죄송합니다. 답변 생성 중 오류가 발생했습니다: {str(error)}"
+            parts.append(message)
+            yield message
+        
+        answer = "".join(parts)
+        if error is None:
+            # 스트림이 끝난 뒤 대화 히스토리와 답변 캐시 갱신
+            self.chatbot._remember_turn(self.question, answer, self.history)
+            if not self.from_cache:
+                self.chatbot._store_answer(self.question, self._cache_key, answer,
+                                           self.relevant_documents, self.context)
+        
+        self.result = {
+            "question": self.question,
+            "answer": answer,
+            "relevant_documents": self.relevant_documents,
+            "context_used": self.context,
+            "model_used": self.chatbot.model_name,
+            "from_cache": self.from_cache,
+            "time_to_first_token": time_to_first_token,
+            "total_time": time.monotonic() - self._started
+        }
+        if self._request is not None:
+            if error is not None:
+                self._request.outcome = "error"
+            elif self.from_cache:
+                self._request.outcome = "cache_hit"
+            self.chatbot._finish_request(self._request, self.result)
+        if time_to_first_token is not None:
+            logger.info(f"스트리밍 응답 완료: {len(answer)} 문자, 첫 토큰 {time_to_first_token:.3f}초")
+
+class ChatSession:
+    """사용자 한 명의 대화 상태를 담는 가벼운 세션 클래스
+
+    임베딩 모델, 벡터 저장소, OpenAI 클라이언트, 캐시는 RAGChatbot 하나를 모든 세션이 공유하고,
+    세션마다 대화 메모리만 따로 가지므로 동시에 대화해도 서로의 히스토리가 섞이지 않습니다.
+    공유 구성 요소는 스레드 안전하며 세션 간 전역 잠금이 없어 요청이 직렬화되지 않습니다.
+    """
+    
+    def __init__(self, chatbot: RAGChatbot, memory: ConversationMemory):
+        self.chatbot = chatbot
+        self.memory = memory
+    
+    def chat(self, question: str) -> Dict:
+        return self.chatbot.chat(question, conversation_history=self.memory)
+    
+    def chat_stream(self, question: str) -> ChatStream:
+        return self.chatbot.chat_stream(question, conversation_history=self.memory)
+    
+    async def achat(self, question: str) -> Dict:
+        return await self.chatbot.achat(question, conversation_history=self.memory)
+    
+    def get_conversation_history(self) -> List[Dict]:
+        """이 세션의 대화 히스토리를 반환합니다."""
+        return self.memory.get_messages()
+    
+    def clear_conversation_history(self):
+        """이 세션의 대화 히스토리를 초기화합니다."""
+        self.memory.clear()
@@ -11,7 +11,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from pdf_processor import PDFProcessor
 from embedding_manager import EmbeddingManager
 from rag_chatbot import RAGChatbot
+from answer_cache import create_answer_cache_from_env
 from data_collector import DataCollector
+from ingestion import IncrementalIngestor
+from ingestion_pipeline import IngestionPipeline
 
 # 페이지 설정
 st.set_page_config(
@@ -60,23 +63,33 @@ st.markdown("""
 
 @st.cache_resource
 def initialize_chatbot():
-    """챗봇을 초기화합니다."""
+    """모든 브라우저 세션이 공유하는 구성 요소(임베딩 모델, 벡터 저장소, 챗봇)를 초기화합니다."""
     try:
         pdf_processor = PDFProcessor()
         embedding_manager = EmbeddingManager()
-        chatbot = RAGChatbot(embedding_manager)
+        chatbot = RAGChatbot(embedding_manager, answer_cache=create_answer_cache_from_env())
         data_collector = DataCollector()
+        ingestor = IncrementalIngestor(pdf_processor, embedding_manager)
+        pipeline = IngestionPipeline(pdf_processor, embedding_manager, ingestor)
         
         return {
             'pdf_processor': pdf_processor,
             'embedding_manager': embedding_manager,
             'chatbot': chatbot,
-            'data_collector': data_collector
+            'data_collector': data_collector,
+            'ingestor': ingestor,
+            'pipeline': pipeline
         }
     except Exception as e:
         st.error(f"챗봇 초기화 실패: {e}")
         return None
 
+def get_chat_session(chatbot):
+    """브라우저 세션마다 대화 메모리를 따로 갖는 채팅 세션을 반환합니다."""
+    if "chat_session" not in st.session_state:
+        st.session_state.chat_session = chatbot.create_session()
+    return st.session_state.chat_session
+
 def main():
     """메인 애플리케이션"""
     
@@ -106,6 +119,7 @@ def main():
         
         chatbot = chatbot_components['chatbot']
         embedding_manager = chatbot_components['embedding_manager']
+        chat_session = get_chat_session(chatbot)
         
         # 컬렉션 정보
         collection_info = embedding_manager.get_collection_info()
@@ -136,7 +150,7 @@ def main():
         
         # 대화 히스토리 초기화
         if st.button("🗑️ 대화 히스토리 초기화"):
-            chatbot.clear_conversation_history()
+            chat_session.clear_conversation_history()
             st.success("대화 히스토리가 초기화되었습니다!")
             st.rerun()
         
@@ -184,31 +198,35 @@ def main():
             
             # 챗봇 응답
             with st.chat_message("assistant"):
-                with st.spinner("답변을 생성하는 중..."):
-                    try:
-                        result = chatbot.chat(prompt)
-                        response = result['answer']
-                        
-                        st.markdown(response)
-                        
-                        # 관련 문서 정보
-                        if result['relevant_documents']:
-                            with st.expander(f"📚 참고 문서 ({len(result['relevant_documents'])}개)"):
-                                for i, doc in enumerate(result['relevant_documents'][:3], 1):
-                                    similarity = doc.get('similarity', 0)
-                                    metadata = doc.get('metadata', {})
-                                    filename = metadata.get('filename', '알 수 없음')
-                                    st.write(f"**{i}. {filename}** (유사도: {similarity:.2f})")
-                                    st.text(doc.get('document', '')[:200] + "...")
-                        
-                        # 어시스턴트 메시지 추가
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        
-                    except Exception as e:
-                        error_msg = f"죄송합니다. 오류가 발생했습니다: {str(e)}"
-                        st.error(error_msg)
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
-    
+                with st.spinner("관련 문서를 검색하는 중..."):
+                    stream = chat_session.chat_stream(prompt)
+                try:
+                    # 토큰이 도착하는 대로 표시
+                    st.write_stream(stream)
+                    result = stream.result
+                    response = result['answer']
+                    
+                    if result['time_to_first_token'] is not None:
+                        st.caption(f"⏱️ 첫 토큰 {result['time_to_first_token']:.2f}초 · 전체 {result['total_time']:.2f}초")
+                    
+                    # 관련 문서 정보
+                    if result['relevant_documents']:
+                        with st.expander(f"📚 참고 문서 ({len(result['relevant_documents'])}개)"):
+                            for i, doc in enumerate(result['relevant_documents'][:3], 1):
+                                similarity = doc.get('similarity', 0)
+                                metadata = doc.get('metadata', {})
+                                filename = metadata.get('filename', '알 수 없음')
+                                st.write(f"**{i}. {filename}** (유사도: {similarity:.2f})")
+                                st.text(doc.get('document', '')[:200] + "...")
+                    
+                    # 어시스턴트 메시지 추가
+                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    
+                except Exception as e:
+                    error_msg = f"죄송합니다. 오류가 발생했습니다: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+
     with col2:
         st.subheader("💡 질문 예시")
         
@@ -237,41 +255,16 @@ def main():
 def setup_database(chatbot_components: Dict, pdf_urls: List[str]) -> bool:
     """데이터베이스를 구축합니다."""
     try:
-        pdf_processor = chatbot_components['pdf_processor']
-        embedding_manager = chatbot_components['embedding_manager']
+        pipeline = chatbot_components['pipeline']
         
-        processed_chunks = []
+        # 다운로드 → 추출/청킹 → 임베딩 파이프라인 실행
+        report = pipeline.run(pdf_urls)
         
-        for i, url in enumerate(pdf_urls):
-            try:
-                # PDF 다운로드
-                filename = f"housing_policy_{i+1}.pdf"
-                pdf_path = pdf_processor.download_pdf_from_url(url, filename)
-                
-                if pdf_path:
-                    # 텍스트 추출 및 청킹
-                    chunks = pdf_processor.process_pdf_file(pdf_path)
-                    
-                    # 메타데이터 추가
-                    metadata = pdf_processor.get_pdf_metadata(pdf_path)
-                    metadata['source_url'] = url
-                    metadata['filename'] = filename
-                    
-                    # 임베딩 데이터베이스에 추가
-                    if chunks:
-                        success = embedding_manager.add_documents(
-                            texts=chunks,
-                            metadata=[metadata] * len(chunks)
-                        )
-                        
-                        if success:
-                            processed_chunks.extend(chunks)
-                
-            except Exception as e:
-                st.error(f"PDF 처리 실패: {url} - {e}")
-                continue
+        for result in report['results']:
+            if result['status'] == 'failed':
+                st.error(f"PDF 처리 실패: {result['doc_key']}")
         
-        return len(processed_chunks) > 0
+        return report['summary']['chunks'] > 0
         
     except Exception as e:
         st.error(f"데이터베이스 구축 실패: {e}")
@@ -280,21 +273,12 @@ def setup_database(chatbot_components: Dict, pdf_urls: List[str]) -> bool:
 def process_uploaded_files(chatbot_components: Dict, uploaded_files) -> bool:
     """업로드된 파일들을 처리합니다."""
     try:
-        pdf_processor = chatbot_components['pdf_processor']
-        embedding_manager = chatbot_components['embedding_manager']
+        ingestor = chatbot_components['ingestor']
         
-        processed_chunks = []
+        processed_chunks = 0
         
         for uploaded_file in uploaded_files:
             try:
-                # 파일 저장
-                file_path = f"temp_{uploaded_file.name}"
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # 텍스트 추출 및 청킹
-                chunks = pdf_processor.process_pdf_file(file_path)
-                
                 # 메타데이터 추가
                 metadata = {
                     'filename': uploaded_file.name,
@@ -302,24 +286,21 @@ def process_uploaded_files(chatbot_components: Dict, uploaded_files) -> bool:
                     'upload_time': datetime.now().isoformat()
                 }
                 
-                # 임베딩 데이터베이스에 추가
-                if chunks:
-                    success = embedding_manager.add_documents(
-                        texts=chunks,
-                        metadata=[metadata] * len(chunks)
-                    )
-                    
-                    if success:
-                        processed_chunks.extend(chunks)
+                # 업로드된 버퍼를 그대로 파싱하여 변경된 청크만 반영 (임시 파일 없음)
+                result = ingestor.ingest_pdf(
+                    uploaded_file,
+                    doc_key=f"upload:{uploaded_file.name}",
+                    extra_metadata=metadata
+                )
                 
-                # 임시 파일 삭제
-                os.remove(file_path)
+                if result['status'] in ('ingested', 'skipped'):
+                    processed_chunks += result['num_chunks']
                 
             except Exception as e:
                 st.error(f"파일 처리 실패: {uploaded_file.name} - {e}")
                 continue
         
-        return len(processed_chunks) > 0
+        return processed_chunks > 0
         
     except Exception as e:
         st.error(f"파일 처리 실패: {e}")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 최상위 모듈(download_manager, pdf_processor 등)을 테스트에서 바로 가져올 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
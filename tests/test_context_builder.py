@@ -0,0 +1,48 @@
+from benchmark_e2e import HashingEncoder
+from context_builder import ContextBuilder
+from embedding_manager import EmbeddingManager
+
+TEXTS = [f"{topic} 관련 보도자료 {i}번 문단입니다." for i, topic in
+         enumerate(["청년 전세자금 대출", "청년 전세자금 대출 금리", "공공분양 사전청약", "임대차 신고제"])]
+
+
+def _search_results(tmp_path):
+    manager = EmbeddingManager(model_name="hashing", db_path=str(tmp_path / "db"), cache_dir=None,
+                               index_backend="compact")
+    manager.embedding_model = HashingEncoder(dim=64)
+    ids = [f"chunk-{i}" for i in range(len(TEXTS))]
+    manager.upsert_documents(TEXTS, [{"filename": f"{i}.pdf", "chunk_index": 0} for i in range(len(TEXTS))], ids)
+    return manager, manager.search_similar("청년 전세자금 대출", n_results=4, threshold=-1.0)
+
+
+class _RecordingEncoder:
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return self.encoder.encode(texts)
+
+
+def test_mmr_uses_stored_embeddings_instead_of_re_encoding(tmp_path):
+    manager, documents = _search_results(tmp_path)
+    embed_fn = _RecordingEncoder(manager.embedding_model)
+
+    builder = ContextBuilder(min_similarity=-1.0, embed_fn=embed_fn, embedding_lookup=manager.get_embeddings)
+    context = builder.build(documents)
+
+    assert embed_fn.calls == []
+    # 저장된 벡터로 고른 순서가 다시 임베딩해서 고른 순서와 같음
+    assert context == ContextBuilder(min_similarity=-1.0, embed_fn=embed_fn).build(documents)
+
+
+def test_only_chunks_without_stored_embeddings_are_encoded(tmp_path):
+    manager, documents = _search_results(tmp_path)
+    embed_fn = _RecordingEncoder(manager.embedding_model)
+    extra = {'id': None, 'document': "전세 사기 피해 지원 대책", 'metadata': {}, 'similarity': 0.9}
+
+    builder = ContextBuilder(min_similarity=-1.0, embed_fn=embed_fn, embedding_lookup=manager.get_embeddings)
+    builder.build(documents + [extra])
+
+    assert embed_fn.calls == [[extra['document']]]
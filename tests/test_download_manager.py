@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download_manager import DownloadManager
+from pdf_processor import PDFProcessor
+
+PDF_BYTES = b"%PDF-1.4\n" + bytes(range(256)) * 64 + b"\n%%EOF\n"
+ETAG = '"v1"'
+
+
+class _PDFHandler(BaseHTTPRequestHandler):
+    """ETag 조건부 GET과 Range 요청을 지원하는 테스트용 PDF 서버"""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body, status = PDF_BYTES, 200
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == ETAG:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            body, status = PDF_BYTES[start:], 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Disposition', 'attachment; filename="report.pdf"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def pdf_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PDFHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/files/report.pdf"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_then_not_modified(pdf_server, tmp_path):
+    manager = DownloadManager(str(tmp_path))
+    first = manager.download(pdf_server.url)
+    assert first['status'] == 'downloaded'
+    assert first['filename'] == 'report.pdf'
+    assert first['content_hash'] == hashlib.sha256(PDF_BYTES).hexdigest()
+    with open(first['path'], 'rb') as f:
+        assert f.read() == PDF_BYTES
+
+    # 상태 파일을 다시 읽은 새 관리자도 조건부 GET으로 변경 없음을 확인
+    second = DownloadManager(str(tmp_path)).download(pdf_server.url)
+    assert second['status'] == 'not_modified'
+    assert second['path'] == first['path']
+    assert pdf_server.requests[-1].get('If-None-Match') == ETAG
+
+
+def test_resume_partial_download(pdf_server, tmp_path):
+    manager = DownloadManager(str(tmp_path))
+    part_path, part_meta_path = manager._partial_paths(pdf_server.url)
+    with open(part_path, 'wb') as f:
+        f.write(PDF_BYTES[:1000])
+    manager._write_json(part_meta_path, {'etag': ETAG, 'last_modified': None})
+
+    result = manager.download(pdf_server.url)
+    assert result['status'] == 'resumed'
+    assert result['bytes_received'] == len(PDF_BYTES) - 1000
+    assert result['content_hash'] == hashlib.sha256(PDF_BYTES).hexdigest()
+    assert pdf_server.requests[-1].get('Range') == 'bytes=1000-'
+
+
+def test_download_many_deduplicates_urls(pdf_server, tmp_path):
+    manager = DownloadManager(str(tmp_path), max_workers=4)
+    results = manager.download_many([pdf_server.url] * 3)
+    assert [result['status'] for result in results] == ['downloaded'] * 3
+    assert len(pdf_server.requests) == 1
+
+
+def test_processor_shares_one_downloader_across_threads(pdf_server, tmp_path):
+    processor = PDFProcessor(download_dir=str(tmp_path), download_workers=3)
+    barrier = threading.Barrier(8)
+    managers = []
+
+    def worker(index):
+        barrier.wait()
+        managers.append(processor.downloader)
+        processor.downloader.download(f"{pdf_server.url}?copy={index}")
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(manager) for manager in managers}) == 1
+    assert processor.downloader.max_workers == 3
+    # 모든 다운로드 기록이 하나의 상태 파일에 남아야 함
+    assert len(DownloadManager(str(tmp_path)).state) == 8
@@ -0,0 +1,51 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def _vectors(texts):
+    return np.array([[float(len(text)), float(sum(map(ord, text)))] for text in texts], dtype=np.float32)
+
+
+def test_eviction_across_processes_never_returns_another_texts_vector(tmp_path):
+    first = EmbeddingCache("model", str(tmp_path), max_entries=8, evict_fraction=0.25)
+    second = EmbeddingCache("model", str(tmp_path), max_entries=8, evict_fraction=0.25)
+
+    for round_index in range(20):
+        texts = [f"text-{round_index}-{i}" for i in range(3)]
+        (first if round_index % 2 else second).put_many(texts, _vectors(texts))
+
+        probe = [f"text-{r}-{i}" for r in range(round_index + 1) for i in range(3)]
+        for cache in (first, second):
+            for text, vector in zip(probe, cache.get_many(probe)):
+                if vector is not None:
+                    assert vector.tolist() == _vectors([text])[0].tolist()
+
+    assert first.get_stats()['entries'] <= 8
+    slots = [slot for (slot,) in first.conn.execute("SELECT slot FROM entries")]
+    assert len(slots) == len(set(slots))
+    assert all(0 <= slot < 8 for slot in slots)
+
+
+def test_slot_reused_by_another_key_is_a_miss(tmp_path):
+    cache = EmbeddingCache("model", str(tmp_path), max_entries=4)
+    cache.put_many(["a"], _vectors(["a"]))
+    (slot,) = cache.conn.execute("SELECT slot FROM entries").fetchone()
+
+    # 'b'가 조회한 슬롯에 아직 'a'의 벡터와 태그가 남아 있는 상황 (다른 프로세스가 기록하는 중)
+    cache.conn.execute("DELETE FROM entries WHERE key = ?", (cache._key("a"),))
+    cache.conn.execute("INSERT INTO entries (key, slot, last_used) VALUES (?, ?, 0)", (cache._key("b"), slot))
+    cache.conn.commit()
+
+    assert cache.get_many(["b"]) == [None]
+
+
+def test_freed_slots_are_reused_after_clear(tmp_path):
+    cache = EmbeddingCache("model", str(tmp_path), max_entries=4)
+    cache.put_many(list("abcd"), _vectors(list("abcd")))
+    cache.put_many(["e"], _vectors(["e"]))
+    assert cache.get_stats()['entries'] == 4
+
+    cache.clear()
+    cache.put_many(list("wxyz"), _vectors(list("wxyz")))
+    assert [vector.tolist() for vector in cache.get_many(list("wxyz"))] == _vectors(list("wxyz")).tolist()
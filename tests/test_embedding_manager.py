@@ -0,0 +1,53 @@
+import pytest
+
+from answer_cache import SemanticAnswerCache
+from benchmark_e2e import HashingEncoder
+from embedding_manager import EmbeddingManager
+
+TEXTS = ["청년 전세자금 대출 금리 인하", "공공분양 주택 사전청약 일정", "임대차 신고제 과태료 유예"]
+
+
+def _manager(db_path, backend):
+    manager = EmbeddingManager(model_name="hashing", db_path=db_path, cache_dir=None, index_backend=backend)
+    manager.embedding_model = HashingEncoder(dim=64)
+    return manager
+
+
+@pytest.mark.parametrize("backend", ["compact", "faiss"])
+def test_collection_version_follows_changes_from_other_processes(tmp_path, backend):
+    # 같은 저장소를 여는 두 관리자 = 인덱싱 프로세스와 챗봇 프로세스
+    writer = _manager(str(tmp_path / "db"), backend)
+    writer.upsert_documents(TEXTS[:2], ids=["a", "b"])
+    reader = _manager(str(tmp_path / "db"), backend)
+    assert reader.collection_version == writer.collection_version
+
+    before = reader.collection_version
+    assert [d['id'] for d in reader.search_similar(TEXTS[2], n_results=3, threshold=-1.0)] != []
+    writer.upsert_documents(TEXTS[2:], ids=["c"])
+
+    assert reader.collection_version != before
+    # 다른 프로세스가 추가한 문서가 검색 결과 캐시에 가려지지 않음
+    assert "c" in [d['id'] for d in reader.search_similar(TEXTS[2], n_results=3, threshold=-1.0)]
+
+
+def test_answer_cache_misses_after_another_process_changes_the_collection(tmp_path):
+    writer = _manager(str(tmp_path / "db"), "compact")
+    writer.upsert_documents(TEXTS[:2], ids=["a", "b"])
+    reader = _manager(str(tmp_path / "db"), "compact")
+    cache = SemanticAnswerCache()
+    embedding = reader.encode_query("전세자금 대출")
+    cache.store("전세자금 대출", embedding, "답변", [], "", reader.collection_version)
+    assert cache.lookup(embedding, reader.collection_version) is not None
+
+    writer.delete_documents(["a"])
+
+    assert cache.lookup(embedding, reader.collection_version) is None
+
+
+def test_collection_version_survives_restart(tmp_path):
+    manager = _manager(str(tmp_path / "db"), "compact")
+    manager.upsert_documents(TEXTS, ids=["a", "b", "c"])
+    version = manager.collection_version
+
+    # 재시작해도 버전이 0으로 돌아가 이전 프로세스의 캐시 항목과 겹치지 않음
+    assert _manager(str(tmp_path / "db"), "compact").collection_version == version != 0
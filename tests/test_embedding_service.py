@@ -0,0 +1,117 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from embedding_service import EmbeddingClient, EmbeddingServer, MicroBatcher
+
+
+class _SlowEncoder:
+    """텍스트 길이를 첫 성분으로 갖는 벡터를 돌려주고, 호출마다 받은 배치 크기를 기록하는 인코더"""
+
+    def __init__(self, seconds: float = 0.0):
+        self.seconds = seconds
+        self.calls = []
+        self.started = threading.Event()
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        self.started.set()
+        time.sleep(self.seconds)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    def encode(self, texts, show_progress_bar=False):
+        return self(texts)
+
+
+@pytest.fixture
+def batcher_factory():
+    batchers = []
+
+    def create(encoder, **kwargs):
+        batcher = MicroBatcher(encoder, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield create
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_large_request_is_split_and_reassembled_in_order(batcher_factory):
+    encoder = _SlowEncoder()
+    batcher = batcher_factory(encoder, max_batch_size=16, max_wait=0)
+    texts = ["x" * (i + 1) for i in range(50)]
+
+    vectors = batcher.submit(texts).result(timeout=5)
+
+    assert vectors.shape == (50, 2)
+    assert vectors[:, 0].tolist() == [len(text) for text in texts]
+    assert max(len(call) for call in encoder.calls) <= 16
+    assert batcher.stats['requests'] == 1
+
+
+def test_query_is_not_blocked_behind_bulk_request(batcher_factory):
+    encoder = _SlowEncoder(seconds=0.05)
+    batcher = batcher_factory(encoder, max_batch_size=32, max_wait=0)
+
+    bulk = batcher.submit([f"문서 {i}" for i in range(256)])
+    assert encoder.started.wait(timeout=5)
+    query = batcher.submit(["청년 전세자금 대출 금리"])
+
+    query.result(timeout=5)
+    assert not bulk.done()
+    assert bulk.result(timeout=5).shape == (256, 2)
+    # 질의는 첫 조각 뒤, 나머지 조각보다 먼저 처리됨
+    assert ["청년 전세자금 대출 금리"] in encoder.calls[:3]
+
+
+def test_failed_slice_fails_the_whole_request(batcher_factory):
+    def encode(texts):
+        if "bad" in texts:
+            raise ValueError("encode failed")
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    batcher = batcher_factory(encode, max_batch_size=4, max_wait=0)
+    future = batcher.submit(["a", "b", "c", "d", "e", "bad"])
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+
+
+def test_unhashable_text_does_not_kill_the_batcher(batcher_factory):
+    batcher = batcher_factory(_SlowEncoder(), max_batch_size=8, max_wait=0)
+
+    with pytest.raises(TypeError):
+        batcher.submit([["x"]]).result(timeout=5)
+    assert batcher.submit(["ok"]).result(timeout=5).shape == (1, 2)
+
+
+def test_failing_request_does_not_fail_co_batched_requests(batcher_factory):
+    def encode(texts):
+        if "bad" in texts:
+            raise ValueError("encode failed")
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    # 대기 시간을 넉넉히 두어 세 요청이 한 배치로 묶이게 함
+    batcher = batcher_factory(encode, max_batch_size=8, max_wait=0.2)
+    good, bad, other = batcher.submit(["a"]), batcher.submit(["bad"]), batcher.submit(["ccc"])
+
+    assert good.result(timeout=5)[:, 0].tolist() == [1]
+    assert other.result(timeout=5)[:, 0].tolist() == [3]
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+
+def test_server_rejects_non_string_texts(tmp_path):
+    server = EmbeddingServer(_SlowEncoder(), str(tmp_path / "embedding.sock"), "stub", "stub", max_wait_ms=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = EmbeddingClient(server.socket_path)
+        with pytest.raises(RuntimeError, match="문자열"):
+            client._request({'texts': [["x"]]})
+        assert client.encode(["ok"]).shape == (1, 2)
+    finally:
+        server.shutdown()
+        server.server_close()
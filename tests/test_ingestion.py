@@ -0,0 +1,81 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from benchmark_e2e import HashingEncoder, write_text_pdf
+from chunker import TextChunker
+from embedding_manager import EmbeddingManager
+from ingestion import IncrementalIngestor, IngestionManifest
+from pdf_processor import PDFProcessor
+
+PAGES = [f"{i}번째 단락입니다. 청년 전세자금 대출과 주택 공급 대책에 관한 내용 {i}. " * 3 for i in range(4)]
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    manager = EmbeddingManager(model_name="hashing", db_path=str(tmp_path / "db"), cache_dir=None,
+                               index_backend="compact")
+    manager.embedding_model = HashingEncoder(dim=64)
+    # 페이지마다 청크가 따로 생기도록 청크 크기를 페이지 길이에 맞춤
+    processor = PDFProcessor(str(tmp_path / "pdf"), chunker=TextChunker(chunk_size=200, overlap=0))
+    return IncrementalIngestor(processor, manager)
+
+
+def _stored(ingestor, doc_key):
+    ids = ingestor.manifest.get_document(doc_key)['chunk_ids']
+    return ids, ingestor.embedding_manager.get_metadatas(ids)
+
+
+def test_reused_chunks_get_the_new_versions_metadata(ingestor):
+    ingestor.ingest_chunks("doc", "v1", PAGES, {'title': "1차", 'filename': "v1.pdf"})
+    _, before = _stored(ingestor, "doc")
+
+    # 앞에 단락이 하나 추가된 새 버전: 기존 청크는 재사용되지만 번호와 제목이 바뀜
+    result = ingestor.ingest_chunks("doc", "v2", ["새로 추가된 첫 단락입니다."] + PAGES,
+                                    {'title': "2차", 'filename': "v2.pdf"})
+    ids, after = _stored(ingestor, "doc")
+
+    assert result['embedded'] == 1
+    assert [after[chunk_id]['chunk_index'] for chunk_id in ids] == list(range(len(PAGES) + 1))
+    assert {meta['title'] for meta in after.values()} == {"2차"}
+    assert set(before) <= set(after)
+
+
+def test_streaming_ingest_updates_page_ranges_of_reused_chunks(ingestor, tmp_path):
+    pdf = str(tmp_path / "doc.pdf")
+    write_text_pdf(pdf, PAGES)
+    ingestor.ingest_pdf(pdf, "doc", {'filename': "doc.pdf"})
+
+    write_text_pdf(pdf, ["표지 " * 30] + PAGES)
+    result = ingestor.ingest_pdf(pdf, "doc", {'filename': "doc.pdf"})
+    ids, stored = _stored(ingestor, "doc")
+
+    assert result['status'] == 'ingested'
+    assert result['embedded'] < result['num_chunks']
+    assert [stored[chunk_id]['chunk_index'] for chunk_id in ids] == list(range(len(ids)))
+    assert stored[ids[-1]]['page_end'] == len(PAGES) + 1
+
+
+def test_manifest_survives_concurrent_record_and_save(tmp_path, caplog):
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+
+    def worker(index):
+        for j in range(200):
+            manifest.record_document(f"doc-{index}-{j}", "hash", [f"chunk-{j}"] * 20)
+            if j % 10 == 0:
+                manifest.save()
+
+    with caplog.at_level(logging.ERROR, logger="ingestion"):
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manifest.save()
+
+    assert "저장 실패" not in caplog.text
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        assert len(json.load(f)['documents']) == 6 * 200
+    assert [path.name for path in tmp_path.iterdir()] == ["manifest.json"]
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from ingestion_pipeline import ExtractionProcessPool, default_start_method
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Streamlit 앱처럼 main 보호 없이 최상위에서 추출 풀을 실행하는 스크립트
+SCRIPT = textwrap.dedent("""
+    import os, queue, sys
+    sys.path.insert(0, {root!r})
+    with open({log!r}, "a") as f:
+        f.write("run\\n")
+    from benchmark_e2e import make_press_release, write_text_pdf
+    from ingestion_pipeline import _SENTINEL, ExtractionProcessPool
+    tasks = queue.Queue()
+    for i in range(3):
+        path = os.path.join({workdir!r}, f"{{i}}.pdf")
+        write_text_pdf(path, make_press_release(i, 2))
+        tasks.put({{'pdf_path': path, 'content_hash': str(i), 'doc_key': path}})
+    tasks.put(_SENTINEL)
+    pool = ExtractionProcessPool(2, 60, {method!r})
+    print(sorted(status for _, status, _, _ in pool.run(tasks)))
+""")
+
+
+def test_default_start_method_does_not_fork():
+    assert default_start_method() in ("forkserver", "spawn")
+    assert ExtractionProcessPool(1, 10).context.get_start_method() == default_start_method()
+
+
+@pytest.mark.parametrize("method", ["forkserver", "spawn"])
+def test_workers_do_not_rerun_an_unguarded_main_script(tmp_path, method):
+    if method not in __import__("multiprocessing").get_all_start_methods():
+        pytest.skip(f"{method}를 지원하지 않는 플랫폼")
+    log = tmp_path / "runs.log"
+    script = tmp_path / "app.py"
+    script.write_text(SCRIPT.format(root=ROOT, log=str(log), workdir=str(tmp_path), method=method),
+                      encoding="utf-8")
+
+    completed = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120)
+
+    assert completed.stdout.strip() == "['ok', 'ok', 'ok']", completed.stderr[-2000:]
+    assert log.read_text().count("run") == 1
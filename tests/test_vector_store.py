@@ -0,0 +1,74 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from vector_store import CompactVectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CompactVectorStore(str(tmp_path), "docs", quantization="int8", persist_interval=3600)
+    vectors = np.random.default_rng(0).normal(size=(200, 16)).astype(np.float32)
+    store.upsert([f"doc-{i}" for i in range(200)], vectors, [f"text {i}" for i in range(200)],
+                 [{'i': i} for i in range(200)])
+    return store
+
+
+def _block_candidates(store, on_enter):
+    original = store._candidates
+
+    def candidates(queries, k):
+        on_enter()
+        return original(queries, k)
+
+    store._candidates = candidates
+
+
+def test_searches_run_concurrently(store):
+    # 두 검색이 동시에 검색 구간 안에 있어야 장벽을 통과함 (검색이 직렬화되면 시간 초과)
+    barrier = threading.Barrier(2, timeout=5)
+    _block_candidates(store, barrier.wait)
+    query = np.ones((1, 16), dtype=np.float32)
+    results, errors = [], []
+
+    def search():
+        try:
+            results.append(store.query(query, 3))
+        except threading.BrokenBarrierError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(results) == 2 and results[0] == results[1]
+
+
+def test_upsert_waits_for_running_search(store):
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        entered.set()
+        release.wait(5)
+
+    _block_candidates(store, hold)
+    search = threading.Thread(target=store.query, args=(np.ones((1, 16), dtype=np.float32), 3))
+    search.start()
+    assert entered.wait(5)
+
+    writer = threading.Thread(target=store.upsert,
+                              args=(["new"], np.ones((1, 16), dtype=np.float32), ["new"], [{}]))
+    writer.start()
+    time.sleep(0.2)
+    assert writer.is_alive()
+
+    release.set()
+    search.join(5)
+    writer.join(5)
+    assert not writer.is_alive()
+    assert store.count() == 201
@@ -0,0 +1,1018 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ChromaVectorStore:
+    """ChromaDB 컬렉션을 사용하는 벡터 저장소 백엔드
+
+    ChromaDB는 컬렉션 변경 번호를 제공하지 않으므로, 변경할 때마다 db_path의
+    <컬렉션 이름>.generation 파일에 새 세대 값을 기록해 다른 프로세스의 변경도 알 수 있게 합니다.
+    """
+
+    backend_name = "chroma"
+
+    def __init__(self, db_path: str, collection_name: str):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.generation_path = os.path.join(db_path, f"{collection_name}.generation")
+
+        # ChromaDB 클라이언트 초기화
+        self.client = chromadb.PersistentClient(
+            path=db_path,
+            settings=Settings(anonymized_telemetry=False)
+        )
+
+        # 컬렉션 가져오기 또는 생성
+        try:
+            self.collection = self.client.get_collection(name=collection_name)
+            logger.info(f"기존 컬렉션 로드: {collection_name}")
+        except:
+            self.collection = self.client.create_collection(
+                name=collection_name,
+                metadata={"description": "주택정책 보도자료 임베딩"}
+            )
+            logger.info(f"새 컬렉션 생성: {collection_name}")
+
+    def generation(self) -> int:
+        """컬렉션의 현재 세대 값을 반환합니다. 어느 프로세스에서든 컬렉션을 바꾸면 값이 달라집니다."""
+        try:
+            with open(self.generation_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_generation(self):
+        # 여러 프로세스가 동시에 바꿔도 이전 값과 겹치지 않도록 카운터 대신 시각을 기록
+        tmp_path = f"{self.generation_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(max(time.time_ns(), self.generation() + 1)))
+        os.replace(tmp_path, self.generation_path)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict]):
+        """문서들을 추가하거나 갱신합니다."""
+        self.collection.upsert(
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+        self._bump_generation()
+
+    def update(self, doc_id: str, embedding, document: str, metadata: Optional[Dict] = None):
+        """기존 문서 하나를 갱신합니다. metadata가 없으면 기존 메타데이터를 유지합니다."""
+        self.collection.update(
+            ids=[doc_id],
+            embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+            documents=[document],
+            metadatas=[metadata] if metadata else None
+        )
+        self._bump_generation()
+
+    def get_existing_ids(self, ids: List[str]) -> set:
+        """주어진 ID 중 저장소에 존재하는 ID 집합을 반환합니다."""
+        results = self.collection.get(ids=ids, include=[])
+        return set(results['ids'])
+
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        """주어진 ID 중 저장소에 존재하는 문서의 메타데이터를 ID별로 반환합니다."""
+        results = self.collection.get(ids=ids, include=["metadatas"])
+        return {doc_id: metadata or {} for doc_id, metadata in zip(results['ids'], results['metadatas'])}
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """주어진 ID 중 저장소에 존재하는 문서의 임베딩을 ID별로 반환합니다."""
+        results = self.collection.get(ids=ids, include=["embeddings"])
+        return {doc_id: np.asarray(embedding, dtype=np.float32)
+                for doc_id, embedding in zip(results['ids'], results['embeddings'])}
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        """문서들의 메타데이터만 바꿉니다. 임베딩은 그대로 둡니다."""
+        self.collection.update(ids=ids, metadatas=metadatas)
+        self._bump_generation()
+
+    def delete(self, ids: List[str]):
+        """주어진 ID의 문서들을 삭제합니다."""
+        self.collection.delete(ids=ids)
+        self._bump_generation()
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def query(self, embeddings, n_results: int) -> List[List[Tuple[str, str, Dict, float]]]:
+        """쿼리 임베딩마다 (ID, 문서, 메타데이터, 유사도) 목록을 반환합니다."""
+        results = self.collection.query(
+            query_embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        hits = []
+        for j in range(len(embeddings)):
+            ids = results['ids'][j] if results['ids'] else []
+            documents = results['documents'][j] if results['documents'] else []
+            metadatas = results['metadatas'][j] if results['metadatas'] else []
+            distances = results['distances'][j] if results['distances'] else []
+            # 거리를 유사도로 변환 (ChromaDB는 거리를 반환하므로)
+            hits.append([(doc_id, doc, meta, 1 - distance)
+                         for doc_id, doc, meta, distance in zip(ids, documents, metadatas, distances)])
+        return hits
+
+    def get_by_ids(self, ids: List[str], query_embedding) -> Dict[str, Tuple[str, Dict, float]]:
+        """ID별 (문서, 메타데이터, 쿼리와의 유사도)를 반환합니다. 유사도는 query()와 같은 기준입니다."""
+        results = self.collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        query = np.asarray(query_embedding, dtype=np.float32)
+        found = {}
+        for doc_id, doc, meta, embedding in zip(results['ids'], results['documents'],
+                                                results['metadatas'], results['embeddings']):
+            # ChromaDB 기본 거리(제곱 L2)와 같은 방식으로 계산
+            distance = float(np.sum((query - np.asarray(embedding, dtype=np.float32)) ** 2))
+            found[doc_id] = (doc, meta, 1 - distance)
+        return found
+
+    def iter_documents(self, batch_size: int = 1000):
+        """저장된 모든 (ID 목록, 문서 목록)을 배치 단위로 반환합니다."""
+        offset = 0
+        while True:
+            results = self.collection.get(include=["documents"], limit=batch_size, offset=offset)
+            if not results['ids']:
+                break
+            yield results['ids'], results['documents']
+            offset += len(results['ids'])
+
+    def reset(self):
+        """컬렉션을 삭제합니다."""
+        self.client.delete_collection(name=self.collection_name)
+        self._bump_generation()
+
+def _l2_normalize(embeddings) -> np.ndarray:
+    vectors = np.array(embeddings, dtype=np.float32, ndmin=2, order="C")
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+class _ReadWriteLock:
+    """여러 스레드가 동시에 읽고, 쓰기는 한 스레드만 하도록 하는 잠금
+
+    쓰기 잠금을 가진 스레드는 읽기/쓰기 잠금을 다시 얻을 수 있고, 읽기 잠금은 같은 스레드에서 중첩할 수 있습니다.
+    쓰기를 기다리는 스레드가 있으면 새 읽기는 기다리므로 쓰기가 굶지 않습니다.
+    읽기 잠금을 가진 채 쓰기 잠금을 얻을 수는 없습니다.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer: Optional[int] = None
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, 'read_depth', 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth = depth
+            return
+
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+        if getattr(self._local, 'read_depth', 0):
+            raise RuntimeError("읽기 잠금을 가진 채 쓰기 잠금을 얻을 수 없습니다.")
+
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+class _DocStoreVectorStore:
+    """SQLite 문서 저장소를 원본으로 두고 메모리 인덱스를 파생 데이터로 유지하는 벡터 저장소의 공통 부분
+
+    문서, 메타데이터, L2 정규화한 float32 벡터는 SQLite에 트랜잭션으로 저장하고, 변경할 때마다
+    meta 테이블의 세대 번호를 올립니다. 메모리 인덱스가 반영한 세대(_index_generation)를 따로 기록하므로,
+    다른 프로세스가 문서를 바꾸면 다음 검색이나 변경 때 다시 로드하고, 오래된 인덱스를 최신 세대로
+    저장하지 않습니다.
+    검색과 조회는 읽기 잠금을 함께 쓰고, 문서 변경과 인덱스 재구성만 쓰기 잠금으로 혼자 수행하므로
+    여러 세션의 검색이 서로를 기다리지 않습니다.
+
+    하위 클래스는 인덱스에 관한 부분만 구현합니다:
+      - _load_or_rebuild(), rebuild(): 저장된 인덱스 로드 / 문서 저장소에서 다시 만들기
+      - _index_add(int_ids, vectors), _index_remove(int_ids): 커밋한 변경분 반영
+      - _has_index(), _write_index(), _clear_index(): 인덱스 유무 확인, 파일 저장, 초기화
+      - query()
+    """
+
+    # 로그에 쓰는 인덱스 이름
+    index_description = "인덱스"
+
+    def _open_docstore(self, store_dir: str, persist_interval: float):
+        """문서 저장소를 열고 공통 상태를 초기화합니다. 하위 클래스의 __init__에서 먼저 호출합니다."""
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.persist_interval = persist_interval
+        self._last_persist = 0.0
+
+        self._lock = _ReadWriteLock()
+        self.conn = sqlite3.connect(os.path.join(store_dir, "docstore.sqlite"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "int_id INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT UNIQUE NOT NULL, "
+            "document TEXT, metadata TEXT, embedding BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+        self.dim = self._get_meta('dim', int)
+        # 메모리의 인덱스가 반영한 문서 저장소 세대
+        self._index_generation = None
+        self._dirty = False
+
+    def _get_meta(self, key: str, cast=str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return cast(row[0]) if row else None
+
+    def _set_meta(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _generation(self) -> int:
+        return self._get_meta('generation', int) or 0
+
+    def generation(self) -> int:
+        """문서 저장소의 현재 세대 번호를 반환합니다. 어느 프로세스에서든 문서를 바꾸면 올라갑니다."""
+        return self._generation()
+
+    def _bump_generation(self) -> int:
+        """세대 번호를 올리고 이전 세대를 반환합니다. 쓰기 트랜잭션 안에서 호출해야 합니다."""
+        previous = self._generation()
+        self._set_meta('generation', previous + 1)
+        return previous
+
+    def _sync(self):
+        """다른 프로세스가 문서 저장소를 바꿨으면 인덱스를 다시 로드하거나 만듭니다.
+
+        검색 전에 읽기 잠금 밖에서 호출하며, 다시 만들어야 할 때만 쓰기 잠금을 잡습니다.
+        """
+        if self._generation() == self._index_generation:
+            return
+        with self._lock.write():
+            if self._generation() != self._index_generation:
+                if self.dim is None:
+                    self.dim = self._get_meta('dim', int)
+                self._load_or_rebuild()
+
+    def _normalize(self, embeddings) -> np.ndarray:
+        return _l2_normalize(embeddings)
+
+    def _has_index(self) -> bool:
+        raise NotImplementedError
+
+    def _after_change(self):
+        """변경분을 인덱스에 반영한 뒤 호출됩니다. 기본 동작은 저장 주기 확인입니다."""
+        self._maybe_persist()
+
+    def _apply_change(self, previous: int, removed: List[int], added: List[int], vectors: Optional[np.ndarray]):
+        """커밋한 변경분을 메모리 인덱스에 반영합니다.
+
+        인덱스가 직전 세대를 반영하고 있을 때만 변경분을 그대로 적용하고, 아니면 다시 만듭니다.
+        """
+        if not self._has_index() or previous != self._index_generation:
+            self.rebuild()
+            return
+        self._index_remove(removed)
+        if added:
+            self._index_add(added, vectors)
+        self._index_generation = previous + 1
+        self._after_change()
+
+    def persist(self):
+        """인덱스를 디스크에 저장하고 인덱스가 반영한 세대 번호를 기록합니다.
+
+        다른 프로세스가 문서 저장소를 바꿔 메모리의 인덱스가 오래되었으면 저장하지 않습니다
+        (그 프로세스가 저장한 최신 인덱스를 덮어쓰지 않도록).
+        """
+        with self._lock.write():
+            if not self._dirty or not self._has_index():
+                return
+            if self._index_generation != self._generation():
+                logger.info(f"문서 저장소가 다른 프로세스에서 변경되어 오래된 {self.index_description}를 저장하지 않습니다.")
+                return
+            self._write_index()
+            self._dirty = False
+            self._last_persist = time.monotonic()
+
+    def _maybe_persist(self):
+        """마지막 저장 후 persist_interval이 지났으면 인덱스를 저장합니다."""
+        self._dirty = True
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict]):
+        """문서들을 추가하거나 갱신합니다."""
+        vectors = self._normalize(embeddings)
+        with self._lock.write():
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._set_meta('dim', self.dim)
+
+            old_int_ids = self._lookup_int_ids(ids)
+            if old_int_ids:
+                self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(i,) for i in old_int_ids])
+
+            new_int_ids = []
+            for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+                cursor = self.conn.execute(
+                    "INSERT INTO documents (doc_id, document, metadata, embedding) VALUES (?, ?, ?, ?)",
+                    (doc_id, document, json.dumps(metadata or {}, ensure_ascii=False), vector.tobytes())
+                )
+                new_int_ids.append(cursor.lastrowid)
+            previous = self._bump_generation()
+            self.conn.commit()
+            self._apply_change(previous, list(old_int_ids.values()), new_int_ids, vectors)
+
+    def update(self, doc_id: str, embedding, document: str, metadata: Optional[Dict] = None):
+        """기존 문서 하나를 갱신합니다. metadata가 없으면 기존 메타데이터를 유지합니다."""
+        with self._lock.write():
+            row = self.conn.execute("SELECT metadata FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"문서를 찾을 수 없습니다: {doc_id}")
+            self.upsert([doc_id], [embedding], [document], [metadata if metadata else json.loads(row[0])])
+
+    def _lookup_int_ids(self, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for doc_id, int_id in self.conn.execute(
+                f"SELECT doc_id, int_id FROM documents WHERE doc_id IN ({placeholders})", batch
+            ):
+                found[doc_id] = int_id
+        return found
+
+    def get_existing_ids(self, ids: List[str]) -> set:
+        """주어진 ID 중 저장소에 존재하는 ID 집합을 반환합니다."""
+        with self._lock.read():
+            return set(self._lookup_int_ids(ids).keys())
+
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        """주어진 ID 중 저장소에 존재하는 문서의 메타데이터를 ID별로 반환합니다."""
+        found = {}
+        with self._lock.read():
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for doc_id, metadata in self.conn.execute(
+                    f"SELECT doc_id, metadata FROM documents WHERE doc_id IN ({placeholders})", batch
+                ):
+                    found[doc_id] = json.loads(metadata)
+        return found
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """주어진 ID 중 저장소에 존재하는 문서의 L2 정규화된 float32 벡터를 ID별로 반환합니다."""
+        found = {}
+        with self._lock.read():
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for doc_id, embedding in self.conn.execute(
+                    f"SELECT doc_id, embedding FROM documents WHERE doc_id IN ({placeholders})", batch
+                ):
+                    found[doc_id] = np.frombuffer(embedding, dtype=np.float32)
+        return found
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        """문서들의 메타데이터만 바꿉니다. 벡터와 인덱스는 그대로 두고 세대 번호만 올립니다."""
+        with self._lock.write():
+            self.conn.executemany(
+                "UPDATE documents SET metadata = ? WHERE doc_id = ?",
+                [(json.dumps(metadata or {}, ensure_ascii=False), doc_id) for doc_id, metadata in zip(ids, metadatas)]
+            )
+            previous = self._bump_generation()
+            self.conn.commit()
+            self._apply_change(previous, [], [], None)
+
+    def delete(self, ids: List[str]):
+        """주어진 ID의 문서들을 삭제합니다."""
+        with self._lock.write():
+            int_ids = self._lookup_int_ids(ids)
+            if not int_ids:
+                return
+            self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(i,) for i in int_ids])
+            previous = self._bump_generation()
+            self.conn.commit()
+            self._apply_change(previous, list(int_ids.values()), [], None)
+
+    def count(self) -> int:
+        with self._lock.read():
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _fetch_rows(self, int_ids, with_embeddings: bool = False) -> Dict[int, Tuple]:
+        """int_id별 (doc_id, 문서, 메타데이터[, float32 벡터])를 반환합니다. 음수 int_id는 건너뜁니다."""
+        wanted = sorted({int(i) for i in np.asarray(int_ids).flatten() if i >= 0})
+        columns = "int_id, doc_id, document, metadata" + (", embedding" if with_embeddings else "")
+        rows = {}
+        for start in range(0, len(wanted), 500):
+            batch = wanted[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row in self.conn.execute(
+                f"SELECT {columns} FROM documents WHERE int_id IN ({placeholders})", batch
+            ):
+                rows[row[0]] = (row[1], row[2], json.loads(row[3])) + (
+                    (np.frombuffer(row[4], dtype=np.float32),) if with_embeddings else ())
+        return rows
+
+    def get_by_ids(self, ids: List[str], query_embedding) -> Dict[str, Tuple[str, Dict, float]]:
+        """ID별 (문서, 메타데이터, 쿼리와의 코사인 유사도)를 반환합니다."""
+        query = self._normalize(query_embedding)[0]
+        found = {}
+        with self._lock.read():
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for doc_id, document, metadata, embedding in self.conn.execute(
+                    f"SELECT doc_id, document, metadata, embedding FROM documents WHERE doc_id IN ({placeholders})",
+                    batch
+                ):
+                    similarity = float(np.dot(query, np.frombuffer(embedding, dtype=np.float32)))
+                    found[doc_id] = (document, json.loads(metadata), similarity)
+        return found
+
+    def iter_documents(self, batch_size: int = 1000):
+        """저장된 모든 (ID 목록, 문서 목록)을 배치 단위로 반환합니다."""
+        last_int_id = 0
+        while True:
+            with self._lock.read():
+                rows = self.conn.execute(
+                    "SELECT int_id, doc_id, document FROM documents WHERE int_id > ? ORDER BY int_id LIMIT ?",
+                    (last_int_id, batch_size)
+                ).fetchall()
+            if not rows:
+                break
+            last_int_id = rows[-1][0]
+            yield [row[1] for row in rows], [row[2] for row in rows]
+
+    def reset(self):
+        """모든 문서와 인덱스를 삭제합니다."""
+        with self._lock.write():
+            self.conn.execute("DELETE FROM documents")
+            self._index_generation = self._bump_generation() + 1
+            self.conn.commit()
+            self._dirty = False
+            self._clear_index()
+
+class FaissVectorStore(_DocStoreVectorStore):
+    """FAISS 인덱스와 SQLite 문서 저장소를 사용하는 벡터 저장소 백엔드
+
+    임베딩은 L2 정규화되어 내적이 곧 코사인 유사도가 됩니다. 문서, 메타데이터, 벡터의
+    원본은 SQLite에 트랜잭션으로 저장되고, FAISS 인덱스는 그로부터 만들어지는 파생 데이터입니다.
+    인덱스 파일의 세대 번호가 문서 저장소와 다르면 시작 시 저장소에서 다시 만듭니다.
+    따라서 인덱스는 persist_interval 간격과 프로세스 종료 시에만 디스크에 기록합니다.
+
+    index_type:
+      - "flat": 정확한 내적 검색 (작은 코퍼스)
+      - "ivf":  IVF 역색인 근사 검색 (큰 코퍼스, nlist/nprobe로 조정).
+                문서가 늘어 적정 리스트 수가 학습 당시의 ivf_retrain_factor배가 되면 다시 학습
+      - "hnsw": HNSW 그래프 근사 검색 (큰 코퍼스, 삭제는 검색 시 걸러냄).
+                삭제된 항목 비율이 hnsw_max_deleted_ratio를 넘으면 다시 만듦
+      - "auto": 문서 수가 auto_threshold 미만이면 flat, 이상이면 hnsw
+    """
+
+    backend_name = "faiss"
+    index_description = "FAISS 인덱스"
+
+    def __init__(self,
+                 db_path: str,
+                 collection_name: str,
+                 index_type: str = "flat",
+                 nlist: int = 1024,
+                 nprobe: int = 16,
+                 hnsw_m: int = 32,
+                 ef_search: int = 64,
+                 auto_threshold: int = 50000,
+                 ivf_retrain_factor: float = 2.0,
+                 hnsw_max_deleted_ratio: float = 0.2,
+                 persist_interval: float = 30.0):
+        try:
+            import faiss
+        except ImportError:
+            raise ImportError("FAISS 백엔드를 사용하려면 faiss-cpu를 설치해야 합니다.")
+
+        self.faiss = faiss
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.requested_index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.auto_threshold = auto_threshold
+        self.ivf_retrain_factor = ivf_retrain_factor
+        self.hnsw_max_deleted_ratio = hnsw_max_deleted_ratio
+
+        self._open_docstore(os.path.join(db_path, "faiss", collection_name), persist_interval)
+        self.index_path = os.path.join(self.store_dir, "index.faiss")
+        self.generation_path = os.path.join(self.store_dir, "index.generation")
+
+        self.index = None
+        self.index_type = None
+        self._load_or_rebuild()
+        atexit.register(self.persist)
+
+    def _normalize(self, embeddings) -> np.ndarray:
+        # normalize_L2는 제자리에서 정규화하므로 호출자의 배열을 바꾸지 않도록 복사본을 사용
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2, order="C")
+        self.faiss.normalize_L2(vectors)
+        return vectors
+
+    def _resolve_index_type(self, count: int) -> str:
+        if self.requested_index_type == "auto":
+            return "hnsw" if count >= self.auto_threshold else "flat"
+        return self.requested_index_type
+
+    def _target_nlist(self, count: int) -> int:
+        # 학습 데이터가 적으면 리스트 수를 줄임 (리스트당 최소 39개 권장)
+        return max(1, min(self.nlist, count // 39))
+
+    def _deleted_count(self) -> int:
+        """HNSW 인덱스에 남아 있는 삭제된 항목 수 (다른 인덱스는 삭제를 바로 반영하므로 0)"""
+        if self.index is None or self.index_type != "hnsw":
+            return 0
+        return max(0, self.index.ntotal - self.count())
+
+    def _needs_rebuild(self) -> bool:
+        """변경분을 반영한 뒤 인덱스를 다시 만들어야 하는지 확인합니다."""
+        count = self.count()
+        if self._resolve_index_type(count) != self.index_type:
+            return True
+        if self.index_type == "ivf":
+            # 처음 학습한 적은 문서로 정한 리스트 수가 커진 코퍼스에 비해 너무 작아짐
+            target = self._target_nlist(count)
+            return target > self.index.nlist and target >= min(self.nlist, self.ivf_retrain_factor * self.index.nlist)
+        if self.index_type == "hnsw" and self.index.ntotal:
+            return self._deleted_count() / self.index.ntotal > self.hnsw_max_deleted_ratio
+        return False
+
+    def _new_index(self, index_type: str, training_vectors: np.ndarray):
+        """지정한 종류의 빈 인덱스를 만듭니다. IVF는 주어진 벡터로 학습합니다."""
+        faiss = self.faiss
+        if index_type == "hnsw":
+            base = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efSearch = self.ef_search
+        elif index_type == "ivf":
+            nlist = self._target_nlist(len(training_vectors))
+            quantizer = faiss.IndexFlatIP(self.dim)
+            base = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            base.train(training_vectors)
+            base.nprobe = min(self.nprobe, nlist)
+            # IVF는 자체적으로 외부 ID를 저장하므로 IDMap으로 감싸지 않음
+            return base
+        else:
+            base = faiss.IndexFlatIP(self.dim)
+        return faiss.IndexIDMap2(base)
+
+    def _load_or_rebuild(self):
+        """저장된 인덱스가 문서 저장소와 같은 세대이면 로드하고, 아니면 다시 만듭니다."""
+        saved_generation = None
+        if os.path.exists(self.generation_path):
+            with open(self.generation_path, 'r') as f:
+                saved_generation = int(f.read().strip() or -1)
+
+        if self.dim is not None and saved_generation == self._generation() and os.path.exists(self.index_path):
+            self.index = self.faiss.read_index(self.index_path)
+            self.index_type = self._get_meta('index_type') or "flat"
+            self._index_generation = saved_generation
+            self._dirty = False
+            logger.info(f"FAISS 인덱스 로드: {self.index.ntotal}개 벡터 ({self.index_type})")
+            return
+
+        self.rebuild()
+
+    def rebuild(self, index_type: Optional[str] = None):
+        """문서 저장소의 벡터로 인덱스를 다시 만듭니다."""
+        with self._lock.write():
+            if index_type:
+                self.requested_index_type = index_type
+            if self.dim is None:
+                self.index = None
+                self._index_generation = self._generation()
+                return
+
+            # 세대 번호와 벡터를 같은 읽기 트랜잭션에서 읽어 인덱스가 반영한 세대를 정확히 기록
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+            generation = self._generation()
+            rows = self.conn.execute("SELECT int_id, embedding FROM documents").fetchall()
+            self._index_generation = generation
+            int_ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = (np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                       if rows else np.empty((0, self.dim), dtype=np.float32))
+
+            self.index_type = self._resolve_index_type(len(rows))
+            if self.index_type == "ivf" and len(rows) == 0:
+                self.conn.commit()
+                self.index = None
+                return
+
+            self.index = self._new_index(self.index_type, vectors)
+            if len(rows):
+                self.index.add_with_ids(vectors, int_ids)
+            self._set_meta('index_type', self.index_type)
+            self.conn.commit()
+            self._dirty = True
+            self.persist()
+            logger.info(f"FAISS 인덱스 재구성: {len(rows)}개 벡터 ({self.index_type})")
+
+    def _has_index(self) -> bool:
+        return self.index is not None
+
+    def _write_index(self):
+        tmp_path = self.index_path + ".tmp"
+        self.faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        with open(self.generation_path + ".tmp", 'w') as f:
+            f.write(str(self._index_generation))
+        os.replace(self.generation_path + ".tmp", self.generation_path)
+
+    def _clear_index(self):
+        self.index = None
+        for path in (self.index_path, self.generation_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _index_add(self, int_ids: List[int], vectors: np.ndarray):
+        self.index.add_with_ids(vectors, np.array(int_ids, dtype=np.int64))
+
+    def _index_remove(self, int_ids: List[int]):
+        if not int_ids or self.index is None:
+            return
+        # HNSW는 삭제를 지원하지 않으므로 문서 저장소에서만 제거하고 검색 시 걸러냄
+        if self.index_type != "hnsw":
+            self.index.remove_ids(np.array(int_ids, dtype=np.int64))
+
+    def _after_change(self):
+        if self._needs_rebuild():
+            self.rebuild()
+        else:
+            self._maybe_persist()
+
+    def query(self, embeddings, n_results: int) -> List[List[Tuple[str, str, Dict, float]]]:
+        """쿼리 임베딩마다 (ID, 문서, 메타데이터, 코사인 유사도) 목록을 반환합니다."""
+        queries = self._normalize(embeddings)
+        self._sync()
+        with self._lock.read():
+            if self.index is None or self.index.ntotal == 0:
+                return [[] for _ in range(len(queries))]
+
+            # HNSW는 삭제된 항목이 섞여 있으므로 그 비율만큼 더 조회하고,
+            # 그래도 살아 있는 결과가 모자란 쿼리가 있으면 조회 수를 늘려 다시 검색
+            total = self.index.ntotal
+            live = max(1, total - self._deleted_count())
+            k = min(total, int(np.ceil(n_results * total / live)) + (n_results if live < total else 0))
+            while True:
+                scores, int_ids = self.index.search(queries, k)
+                rows = self._fetch_rows(int_ids)
+                found = [sum(1 for int_id in query_ids if int_id >= 0 and int(int_id) in rows)
+                         for query_ids in int_ids]
+                if self.index_type != "hnsw" or k >= total or min(found) >= min(n_results, live):
+                    break
+                k = min(total, k * 2)
+
+        hits = []
+        for query_scores, query_ids in zip(scores, int_ids):
+            query_hits = []
+            for score, int_id in zip(query_scores, query_ids):
+                if int_id >= 0 and int(int_id) in rows:
+                    doc_id, document, metadata = rows[int(int_id)]
+                    query_hits.append((doc_id, document, metadata, float(score)))
+                if len(query_hits) >= n_results:
+                    break
+            hits.append(query_hits)
+        return hits
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """벡터들을 (코드, 벡터별 스케일)로 양자화합니다. 스케일은 int8에서만 사용합니다.
+
+    int8은 벡터마다 절댓값 최대 성분이 127이 되도록 스케일을 정하는 대칭 스칼라 양자화이며,
+    원래 벡터는 codes * scale로 근사됩니다.
+    """
+    if quantization == "none":
+        return np.ascontiguousarray(vectors, dtype=np.float32), None
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12).astype(np.float32) / 127
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"지원하지 않는 양자화 방식입니다: {quantization}")
+
+class CompactVectorStore(_DocStoreVectorStore):
+    """양자화한 임베딩을 연속된 NumPy 배열 하나로 메모리에 두고 검색하는 벡터 저장소 백엔드
+
+    문서, 메타데이터, float32 원본 벡터는 FaissVectorStore와 같은 형식으로 SQLite에 저장하고,
+    메모리에는 quantization에 따라 float32/float16/int8 코드만 (N, dim) 배열로 유지합니다.
+    행은 int_id 오름차순으로 정렬해 두므로 int_id → 행 번호는 별도 사전 없이 이진 탐색으로 찾습니다.
+    검색은 코드로 상위 n_results * rescore_factor개 후보를 고른 뒤, 후보의 float32 원본을
+    SQLite에서 읽어 정확한 코사인 유사도로 다시 순위를 매깁니다.
+    양자화로 줄어드는 것은 메모리뿐이며, 디스크에는 재채점용 float32 원본(SQLite)과 코드 배열
+    파일이 함께 저장되므로 float32만 저장할 때보다 오히려 커집니다 (disk_usage 참고).
+    코드 배열은 문서 저장소에서 만들어지는 파생 데이터로, 세대 번호가 다르면 시작 시 다시 만듭니다.
+    다른 프로세스가 문서를 바꾸면 다음 검색이나 변경 때 다시 로드하고, 오래된 코드 배열은 저장하지 않습니다.
+
+    quantization (행마다 int64 ID 8바이트가 추가됨):
+      - "none":    float32 그대로 (정확한 검색, 원본 크기)
+      - "float16": 절반 크기
+      - "int8":    약 1/4 크기 (벡터별 float32 스케일 포함)
+    """
+
+    backend_name = "compact"
+    index_description = "압축 벡터"
+
+    def __init__(self,
+                 db_path: str,
+                 collection_name: str,
+                 quantization: str = "int8",
+                 rescore_factor: int = 4,
+                 block_size: int = 4096,
+                 persist_interval: float = 30.0):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"지원하지 않는 양자화 방식입니다: {quantization}")
+
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self.block_size = block_size
+
+        self._open_docstore(os.path.join(db_path, "compact", collection_name), persist_interval)
+        self.codes_path = os.path.join(self.store_dir, f"codes.{quantization}.npz")
+
+        self._size = 0
+        self._codes = None
+        self._scales = None
+        self._int_ids = np.empty(0, dtype=np.int64)
+        self._load_or_rebuild()
+        atexit.register(self.persist)
+
+    def _allocate(self, capacity: int):
+        """코드/스케일/ID 배열을 capacity 크기로 새로 할당하고 기존 내용을 복사합니다."""
+        code_dtype = np.float32 if self.quantization == "none" else (
+            np.float16 if self.quantization == "float16" else np.int8)
+        codes = np.empty((capacity, self.dim), dtype=code_dtype)
+        int_ids = np.empty(capacity, dtype=np.int64)
+        scales = np.empty(capacity, dtype=np.float32) if self.quantization == "int8" else None
+        if self._codes is not None and self._size:
+            codes[:self._size] = self._codes[:self._size]
+            int_ids[:self._size] = self._int_ids[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+        self._codes, self._scales, self._int_ids = codes, scales, int_ids
+
+    def _index_add(self, int_ids: List[int], vectors: np.ndarray):
+        if self._codes is None or self._size + len(int_ids) > len(self._codes):
+            # 여유 공간을 두 배씩 늘려 추가 비용을 분할 상환
+            self._allocate(max(self._size + len(int_ids), 2 * self._size, 1024))
+        codes, scales = quantize(vectors, self.quantization)
+        end = self._size + len(int_ids)
+        self._codes[self._size:end] = codes
+        if scales is not None:
+            self._scales[self._size:end] = scales
+        sorted_append = self._size == 0 or int_ids[0] > self._int_ids[self._size - 1]
+        self._int_ids[self._size:end] = int_ids
+        self._size = end
+        # AUTOINCREMENT int_id는 항상 커지므로 보통은 정렬이 유지됨
+        if not sorted_append or np.any(np.diff(self._int_ids[self._size - len(int_ids):end]) <= 0):
+            self._sort_rows()
+
+    def _arrays(self) -> List[np.ndarray]:
+        return [array for array in (self._codes, self._int_ids, self._scales) if array is not None]
+
+    def _sort_rows(self):
+        """행을 int_id 오름차순으로 다시 정렬합니다."""
+        order = np.argsort(self._int_ids[:self._size], kind="stable")
+        for array in self._arrays():
+            array[:self._size] = array[:self._size][order]
+
+    def _find_rows(self, int_ids: List[int]) -> np.ndarray:
+        """int_id들이 있는 행 번호를 오름차순으로 반환합니다. 없는 int_id는 건너뜁니다."""
+        if not self._size or not len(int_ids):
+            return np.empty(0, dtype=np.int64)
+        live = self._int_ids[:self._size]
+        targets = np.asarray(int_ids, dtype=np.int64)
+        rows = np.searchsorted(live, targets)
+        found = rows < self._size
+        found[found] = live[rows[found]] == targets[found]
+        return np.unique(rows[found])
+
+    def _index_remove(self, int_ids: List[int]):
+        """삭제된 행 사이의 구간을 앞으로 당겨 int_id 정렬 순서를 유지하며 삭제합니다."""
+        rows = self._find_rows(int_ids)
+        if not len(rows):
+            return
+        write = int(rows[0])
+        bounds = np.append(rows, self._size)
+        for row, next_row in zip(bounds[:-1], bounds[1:]):
+            start, end = int(row) + 1, int(next_row)
+            if end > start:
+                for array in self._arrays():
+                    array[write:write + end - start] = array[start:end]
+                write += end - start
+        self._size = write
+
+    def _load_or_rebuild(self):
+        """저장된 코드 배열이 문서 저장소와 같은 세대이면 로드하고, 아니면 다시 만듭니다."""
+        if self.dim is not None and os.path.exists(self.codes_path):
+            try:
+                with np.load(self.codes_path) as saved:
+                    generation = int(saved['generation'])
+                    if generation == self._generation():
+                        self._codes = saved['codes']
+                        self._int_ids = saved['int_ids']
+                        self._scales = saved['scales'] if self.quantization == "int8" else None
+                        self._size = len(self._int_ids)
+                        if np.any(np.diff(self._int_ids) <= 0):
+                            # 이전 형식(삭제 시 마지막 행을 옮기던 방식)의 파일
+                            self._sort_rows()
+                        self._index_generation = generation
+                        self._dirty = False
+                        logger.info(f"압축 벡터 로드: {self._size}개 벡터 ({self.quantization})")
+                        return
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"압축 벡터 파일을 읽을 수 없어 다시 만듭니다: {e}")
+        self.rebuild()
+
+    def rebuild(self):
+        """문서 저장소의 float32 벡터로 코드 배열을 다시 만듭니다."""
+        with self._lock.write():
+            self._codes, self._scales, self._size = None, None, 0
+            self._int_ids = np.empty(0, dtype=np.int64)
+            if self.dim is None:
+                self._index_generation = self._generation()
+                return
+
+            # 세대 번호와 벡터를 같은 읽기 트랜잭션에서 읽어 코드 배열이 반영한 세대를 정확히 기록
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+            self._index_generation = self._generation()
+            self._allocate(max(self.count(), 1024))
+            cursor = self.conn.execute("SELECT int_id, embedding FROM documents ORDER BY int_id")
+            while True:
+                # 원본 전체를 한 번에 메모리에 올리지 않도록 나누어 양자화
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                self._index_add([row[0] for row in rows], vectors)
+            self.conn.commit()
+            self._dirty = True
+            self.persist()
+            logger.info(f"압축 벡터 재구성: {self._size}개 벡터 ({self.quantization})")
+
+    def _has_index(self) -> bool:
+        return self._codes is not None
+
+    def _write_index(self):
+        tmp_path = self.codes_path + ".tmp"
+        arrays = {'codes': self._codes[:self._size], 'int_ids': self._int_ids[:self._size],
+                  'generation': np.int64(self._index_generation)}
+        if self._scales is not None:
+            arrays['scales'] = self._scales[:self._size]
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.codes_path)
+
+    def _clear_index(self):
+        self._codes, self._scales, self._size = None, None, 0
+        self._int_ids = np.empty(0, dtype=np.int64)
+        if os.path.exists(self.codes_path):
+            os.remove(self.codes_path)
+
+    def memory_usage(self) -> Dict:
+        """메모리에 있는 배열(코드, 스케일, int64 ID)의 크기와 float32 대비 압축률을 반환합니다.
+
+        bytes는 저장된 벡터가 차지하는 크기, allocated_bytes는 증가용 여유 공간을 포함해
+        실제로 할당된 크기입니다. 비교 기준(float32_bytes)도 같은 int64 ID 배열을 포함합니다.
+        """
+        with self._lock.read():
+            dim = self.dim or 0
+            row_bytes = sum(array.itemsize * (array.shape[1] if array.ndim == 2 else 1)
+                            for array in self._arrays())
+            used = self._size * row_bytes
+            allocated = sum(array.nbytes for array in self._arrays())
+            float32_bytes = self._size * (dim * 4 + 8)
+            return {
+                'vectors': self._size,
+                'dim': dim,
+                'quantization': self.quantization,
+                'bytes': used,
+                'allocated_bytes': allocated,
+                'float32_bytes': float32_bytes,
+                'compression': round(float32_bytes / used, 2) if used else 1.0
+            }
+
+    def disk_usage(self) -> Dict:
+        """문서 저장소(SQLite, float32 원본 포함)와 코드 배열 파일의 디스크 크기를 반환합니다."""
+        with self._lock.read():
+            docstore = sum(os.path.getsize(os.path.join(self.store_dir, name))
+                           for name in os.listdir(self.store_dir) if name.startswith("docstore.sqlite"))
+            codes = os.path.getsize(self.codes_path) if os.path.exists(self.codes_path) else 0
+            return {'docstore_bytes': docstore, 'codes_bytes': codes, 'bytes': docstore + codes}
+
+    def _candidates(self, queries: np.ndarray, k: int) -> np.ndarray:
+        """코드 배열로 근사 점수를 계산해 쿼리마다 상위 k개 행 번호를 반환합니다.
+
+        block_size 행씩 점수를 계산해 지금까지의 상위 k개와 합치므로, 코퍼스 크기와 관계없이
+        추가 메모리는 (쿼리 수 × (block_size + k)) 점수와 float32로 변환한 블록 하나뿐입니다.
+        """
+        if k >= self._size:
+            return np.tile(np.arange(self._size), (len(queries), 1))
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        block_scores = np.empty((len(queries), min(self.block_size, self._size)), dtype=np.float32)
+        for start in range(0, self._size, self.block_size):
+            end = min(start + self.block_size, self._size)
+            block = block_scores[:, :end - start]
+            np.matmul(queries, self._codes[start:end].T.astype(np.float32, copy=False), out=block)
+            if self._scales is not None:
+                block *= self._scales[start:end]
+            merged_scores = np.concatenate([best_scores, block], axis=1)
+            merged_rows = np.concatenate(
+                [best_rows, np.broadcast_to(np.arange(start, end), (len(queries), end - start))], axis=1)
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_rows = np.take_along_axis(merged_rows, top, axis=1)
+        return best_rows
+
+    def query(self, embeddings, n_results: int) -> List[List[Tuple[str, str, Dict, float]]]:
+        """쿼리 임베딩마다 (ID, 문서, 메타데이터, 코사인 유사도) 목록을 반환합니다."""
+        queries = _l2_normalize(embeddings)
+        self._sync()
+        with self._lock.read():
+            if self._size == 0:
+                return [[] for _ in range(len(queries))]
+
+            k = n_results if self.quantization == "none" else n_results * self.rescore_factor
+            candidate_rows = self._candidates(queries, min(k, self._size))
+            candidate_ids = self._int_ids[candidate_rows]
+
+            # 후보의 float32 원본으로 정확한 유사도를 다시 계산
+            rows = self._fetch_rows(candidate_ids, with_embeddings=True)
+
+        hits = []
+        for query, query_ids in zip(queries, candidate_ids):
+            found = [rows[int(int_id)] for int_id in query_ids if int(int_id) in rows]
+            if not found:
+                hits.append([])
+                continue
+            exact = np.vstack([row[3] for row in found]) @ query
+            order = np.argsort(-exact, kind="stable")[:n_results]
+            hits.append([(found[i][0], found[i][1], found[i][2], float(exact[i])) for i in order])
+        return hits
+
+def create_vector_store(backend: str, db_path: str, collection_name: str, **options):
+    """설정에 맞는 벡터 저장소 백엔드를 생성합니다."""
+    if backend == "faiss":
+        return FaissVectorStore(db_path, collection_name, **options)
+    if backend == "compact":
+        return CompactVectorStore(db_path, collection_name, **options)
+    if backend == "chroma":
+        return ChromaVectorStore(db_path, collection_name)
+    raise ValueError(f"지원하지 않는 벡터 저장소 백엔드입니다: {backend}")